@@ -0,0 +1,163 @@
+# --- ANALYTICS ROLLUPS ---
+# Materialised counts behind the Stats page, kept next to the shared lead store
+# instead of group-bys over an exported sheet:
+#   - leads:  (created day, source, assignee, status) -> count
+#   - calls:  (Last Call day, assignee) -> count
+# Like the search / assignment indexes it follows the store's change log: a
+# modal save, bulk action or CSV chunk only moves the touched rows from their
+# old cell to their new one. Full loads and deletes (which shift positions)
+# recount with one group-by. Page queries read the cells, never the leads, so
+# their cost depends on how many distinct days / sources / users / statuses
+# there are, not on how big the sheet is; a date range just filters cells.
+# Bucket and funnel stage are derived per distinct status at query time.
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from pipeline import BUCKETS, status_info
+
+VISIT_RE = re.compile("Visit", re.I)
+BOOKED_RE = re.compile("Sale Closed|Booking|Booked", re.I)
+FUNNEL = ["Naya Lead", "Site Visit Scheduled", "Sale Closed (Booking)"]
+_DAY_RE = r'^\d{4}-\d{2}-\d{2}'
+FIELDS = ('day', 'source', 'assign', 'status', 'call')
+
+
+def stage(status):
+    # Funnel stage the lead's current status has reached: 0 lead, 1 site visit, 2 booking
+    s = str(status)
+    return 2 if BOOKED_RE.search(s) else 1 if VISIT_RE.search(s) else 0
+
+
+def days_of(s):
+    # "YYYY-MM-DD ..." -> "YYYY-MM-DD", anything else -> ""
+    txt = s.astype(str).str.strip()
+    return txt.str[:10].where(txt.str.contains(_DAY_RE, regex=True), '')
+
+
+class Rollups:
+    def __init__(self):
+        self.version = -1
+        self.cols = None
+        self.rows = {f: np.zeros(0, dtype=object) for f in FIELDS}  # position -> that row's cell coordinates
+        self.leads = Counter()  # (day, source, assign, status) -> leads
+        self.calls = Counter()  # (call day, assign) -> leads last called that day
+        self._memo = {}  # query -> result, for the current version
+        self._lock = threading.Lock()
+        self.builds = self.moves = 0
+
+    # --- BUILD / SYNC ---
+    def sync(self, store):
+        if store.version == self.version or store.df is None: return
+        with self._lock:
+            df, version = store.df, store.version
+            cols = (next((c for c in df.columns if c == "Date"), None), store.find_col("Source"),
+                    store.find_col("Assign"), store.find_col("Status"), store.find_col("Last Call"))
+            touched = store.changes_since(self.version)
+            if touched is None or cols != self.cols: self._build(df, cols)
+            elif touched: self._move(df, sorted(touched))
+            self.version, self._memo = version, {}
+
+    def _coords(self, df, pos=None):
+        sub = df if pos is None else df.iloc[pos]
+        out = {}
+        for f, c in zip(FIELDS, self.cols):
+            if c is None: out[f] = np.full(len(sub), '', dtype=object)
+            elif f in ('day', 'call'): out[f] = days_of(sub[c]).to_numpy(dtype=object)
+            else: out[f] = sub[c].astype(str).str.strip().to_numpy(dtype=object)
+        return out
+
+    def _count(self, rows):
+        # (lead cells, call cells) for a batch of coordinates; group-by for a full build, zip for a few rows
+        if len(rows['day']) > 1000:
+            leads = Counter(dict(pd.DataFrame({f: rows[f] for f in FIELDS[:4]}).value_counts().items()))
+            calls = Counter(dict(pd.DataFrame({f: rows[f] for f in ('call', 'assign')}).value_counts().items()))
+        else:
+            leads = Counter(zip(*(rows[f] for f in FIELDS[:4])))
+            calls = Counter(zip(rows['call'], rows['assign']))
+        calls = Counter({k: v for k, v in calls.items() if k[0]})
+        return leads, calls
+
+    def _build(self, df, cols):
+        self.cols = cols
+        self.rows = self._coords(df)
+        self.leads, self.calls = self._count(self.rows)
+        self.builds += 1
+
+    def _move(self, df, positions):
+        pos = np.asarray(positions, np.int64)
+        n = len(df)
+        old_n = len(self.rows['day'])
+        new = self._coords(df, pos)
+        existed = pos < old_n
+        old = {f: self.rows[f][pos[existed]] for f in FIELDS}
+        old_leads, old_calls = self._count(old)
+        new_leads, new_calls = self._count(new)
+        for cells, old_c, new_c in ((self.leads, old_leads, new_leads), (self.calls, old_calls, new_calls)):
+            cells.subtract(old_c); cells.update(new_c)
+            for k in old_c:
+                if cells[k] <= 0: del cells[k]  # drop emptied cells
+        rows = {}
+        for f in FIELDS:
+            a = self.rows[f] if n <= old_n else np.concatenate([self.rows[f], np.full(n - old_n, '', dtype=object)])
+            a = a.copy(); a[pos] = new[f]
+            rows[f] = a
+        self.rows = rows
+        self.moves += len(pos)
+
+    # --- QUERY ---
+    def _cells(self, start=None, end=None, owners=None):
+        # Lead cells in [start, end] (datetime.date or None; leads without a Date only when unbounded)
+        lo, hi = str(start) if start else None, str(end) if end else None
+        own = {str(o).strip() for o in owners} if owners else None
+        with self._lock: items = list(self.leads.items())
+        return [(k, n) for k, n in items
+                if (lo is None or (k[0] and k[0] >= lo)) and (hi is None or (k[0] and k[0] <= hi))
+                and (own is None or k[2] in own)]
+
+    def _memoized(fn):
+        # Stats reruns with the same range on the same data version reuse the last answer
+        def wrapper(self, start=None, end=None, owners=None):
+            key = (fn.__name__, self.version, start, end, tuple(sorted(map(str, owners))) if owners else None)
+            if key not in self._memo: self._memo[key] = fn(self, start, end, owners)
+            return self._memo[key]
+        return wrapper
+
+    @_memoized
+    def summary(self, start=None, end=None, owners=None):
+        cells = self._cells(start, end, owners)
+        status = Counter()
+        for (_, _, _, s), n in cells: status[s] += n
+        info = {s: (status_info(s)[0], stage(s)) for s in status}
+        buckets = Counter({b: 0 for b in BUCKETS})
+        reached = [0, 0, 0]
+        for s, n in status.items():
+            buckets[info[s][0]] += n
+            for i in range(info[s][1] + 1): reached[i] += n
+        src = {}
+        for (_, so, _, s), n in cells:
+            row = src.setdefault(so or "(blank)", [0, 0, 0])
+            for i in range(info[s][1] + 1): row[i] += n
+        total = sum(status.values())
+        return {
+            'total': total,
+            'buckets': dict(buckets),
+            'status': dict(status.most_common()),
+            'funnel': [{'Stage': f, 'Leads': r, '%': round(100 * r / total, 1) if total else 0.0} for f, r in zip(FUNNEL, reached)],
+            'sources': sorted(({'Source': so, 'Leads': a, 'Visit': v, 'Booking': b,
+                                'Yield %': round(100 * b / a, 1) if a else 0.0} for so, (a, v, b) in src.items()),
+                              key=lambda r: -r['Leads']),
+        }
+
+    @_memoized
+    def daily_calls(self, start=None, end=None, owners=None):
+        # [{'Day', 'Assign', 'Calls'}] from Last Call: leads whose latest call fell on that day
+        lo, hi = str(start) if start else None, str(end) if end else None
+        own = {str(o).strip() for o in owners} if owners else None
+        with self._lock: items = list(self.calls.items())
+        return sorted(({'Day': d, 'Assign': a or "(blank)", 'Calls': n} for (d, a), n in items
+                       if (lo is None or d >= lo) and (hi is None or d <= hi) and (own is None or a in own)),
+                      key=lambda r: (r['Day'], r['Assign']))
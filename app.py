@@ -2,13 +2,34 @@ import streamlit as st
 import pandas as pd
 import gspread
 from google.oauth2.service_account import Credentials
-from datetime import datetime, date, timedelta
+from datetime import timedelta
 import hashlib
+from html import escape
 import time
-import re
 import random
-import itertools
-import pytz
+import uuid
+import numpy as np
+from common import get_ist_time, get_ist_date, PIPELINE_OPTS, is_quota_error
+from storage import open_storage, STORAGE_BACKEND
+from lead_store import LeadStore, FETCH_WORKERS
+from snapshot import SharedSnapshot, SNAPSHOT_PATH
+from bulk_ops import bulk_set, bulk_delete
+from csv_import import ImportJob
+from cards import generate_cards_html, PAGE_SIZE
+from pipeline import classify
+from search_index import SearchIndex
+from partitions import AssignIndex
+from scheduler import FollowUpSchedule, tab_positions
+from lead_detail import LeadDetails, PREFETCH
+from analytics import Rollups
+from archive import Archive, COLD_DAYS
+from change_feed import ChangeFeed
+from notes_log import NotesLog, log_worksheet, summary, LEGACY_AUTHOR, PAGE_SIZE as LOG_PAGE
+from write_queue import WriteQueue
+from sync_daemon import SyncService
+from bootstrap import Bootstrap
+from instrument import Recorder
+from quota import QuotaGovernor, BULK
 
 # --- IMPORT CLICK DETECTOR ---
 try:
@@ -67,41 +88,48 @@ custom_css = """
 """
 st.markdown(custom_css, unsafe_allow_html=True)
 
-# --- TIMEZONE ---
-IST = pytz.timezone('Asia/Kolkata')
-def get_ist_time(): return datetime.now(IST).strftime("%Y-%m-%d %H:%M")
-def get_ist_date(): return datetime.now(IST).date()
-
 if 'current_page' not in st.session_state: st.session_state['current_page'] = "CRM"
 
-# --- HELPER: DATE FORMATTING ---
-def format_datetime(val_str):
-    if not val_str or len(str(val_str)) < 5: return "-"
-    try:
-        dt = datetime.strptime(str(val_str).strip(), "%Y-%m-%d %H:%M")
-        return dt.strftime("%d-%b %H:%M")
-    except: return "-"
-
-def format_date_only(val_str):
-    if not val_str or len(str(val_str)) < 5: return "-"
-    try:
-        d = datetime.strptime(str(val_str).strip(), "%Y-%m-%d").date()
-        if d == get_ist_date(): return "Aaj" # Hinglish
-        return d.strftime("%d-%b")
-    except: return "-"
+# --- INSTRUMENTATION ---
+# Every storage call goes through recorder-wrapped handles; the panel is on the Stats page
+@st.cache_resource
+def get_recorder(): return Recorder()
+
+recorder = get_recorder()
+
+@st.cache_resource
+def get_governor(): return QuotaGovernor()
+
+governor = get_governor()
+
+def governed(sh):
+    # Google Sheets quota is shared by every caller in this process (quota.py); SQLite has none
+    return governor.wrap(sh) if STORAGE_BACKEND == "sheets" else sh
+
+def show_error(e):
+    if is_quota_error(e): st.warning("⏳ Google Sheets abhi busy hai (quota). Thodi der me dobara try karo.")
+    else: st.error(str(e))
+_rerun_t0 = time.perf_counter()
 
 # --- DATABASE ---
 @st.cache_resource
-def connect_db():
+def connect_sheets():
     scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
     if "gcp_service_account" not in st.secrets: st.error("❌ Secrets missing."); st.stop()
     creds_dict = dict(st.secrets["gcp_service_account"])
     if "private_key" in creds_dict: creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
     creds = Credentials.from_service_account_info(creds_dict, scopes=scopes)
     client = gspread.authorize(creds)
-    files = client.list_spreadsheet_files()
-    if not files: st.error("❌ No Sheet found."); st.stop()
-    return client.open_by_key(files[0]['id'])
+    sh = open_storage("sheets", client=client)
+    if not sh: st.error("❌ No Sheet found."); st.stop()
+    return sh
+
+@st.cache_resource
+def connect_db():
+    # CRM_STORAGE=sqlite serves everything from a local SQLite file (no Google credentials needed);
+    # CRM_STORAGE=mirror does too, with sync_daemon keeping that file in step with the Google sheet
+    if STORAGE_BACKEND in ("sqlite", "mirror"): return open_storage(STORAGE_BACKEND)
+    return connect_sheets()
 
 def hash_pass(password): return hashlib.sha256(str.encode(password)).hexdigest()
 
@@ -113,6 +141,68 @@ def init_auth_system(sh):
         ws.append_row(["admin", hash_pass("admin123"), "Manager", "System Admin"])
     return ws
 
+@st.cache_resource
+def get_bootstrap(): return Bootstrap(lambda: governed(recorder.wrap(connect_db())), init_auth_system)
+
+@st.cache_resource
+def get_snapshot():
+    # Server processes behind a load balancer share one Leads refresh through a snapshot file (snapshot.py).
+    # SQLite backends read a local file already; CRM_SNAPSHOT_PATH="" turns it off.
+    # Write journals stay per process (CRM_WRITE_JOURNAL + ".<pid>", write_queue.py): a restarted worker adopts
+    # the journals of dead ones, never a live one's. Without flock (Windows) run a single server process.
+    return SharedSnapshot(SNAPSHOT_PATH) if STORAGE_BACKEND == "sheets" and SNAPSHOT_PATH else None
+
+@st.cache_resource
+def get_lead_store(_ws):
+    # Parallel ranged full loads only pay off over the network; SQLite reads the table in one go
+    workers = FETCH_WORKERS if STORAGE_BACKEND == "sheets" else 1
+    return LeadStore(_ws, prepare=classify, snapshot=get_snapshot(), fetch_workers=workers)
+
+@st.cache_resource
+def get_search_index(): return SearchIndex()
+
+@st.cache_resource
+def get_assign_index(): return AssignIndex()
+
+@st.cache_resource
+def get_schedule(): return FollowUpSchedule()
+
+@st.cache_resource
+def get_rollups(): return Rollups()
+
+@st.cache_resource
+def get_notes_log(_boot): return NotesLog(lambda: log_worksheet(_boot.sh))
+
+@st.cache_resource
+def get_write_queue(_store, _log):
+    q = WriteQueue(_store, log=_log); _store.hold = q.busy
+    return q
+
+@st.cache_resource
+def get_change_feed(_store): return ChangeFeed(_store)
+
+@st.cache_resource
+def get_archive(_boot, _store, _queue):
+    # Cold leads move to "Archive YYYY-MM" tabs in the background (archive.py). Not in mirror mode:
+    # the sync daemon only carries the Leads / Users / Notes Log tabs, so archived rows would leave the Google sheet.
+    # With a shared snapshot only the elected writer process archives.
+    a = Archive(_boot.sh, prepare=classify)
+    snap = get_snapshot()
+    def hold(): return _queue.busy() or (snap is not None and not snap.is_writer())
+    if STORAGE_BACKEND != "mirror": a.start(_store, get_ist_date, hold=hold)
+    return a
+
+@st.cache_resource
+def get_archive_index(): return SearchIndex()
+
+@st.cache_resource
+def get_sync_service(_boot, _store):
+    # Upstream edits make the store / users table reload from SQLite on the next rerun
+    def on_pull(tab):
+        if tab == "Leads": _store.invalidate(full=True)
+        else: _boot.invalidate_users()
+    return SyncService(governor.wrap(recorder.wrap(connect_sheets())), _boot.sh, on_pull=on_pull)
+
 def generate_lead_id(prefix="L"):
     ts = str(int(time.time()))[-6:] 
     rand = str(random.randint(10, 99))
@@ -120,16 +210,19 @@ def generate_lead_id(prefix="L"):
 
 # --- LOGIN ---
 if 'logged_in' not in st.session_state: st.session_state['logged_in'] = False
+recorder.set_page(st.session_state['current_page'] if st.session_state['logged_in'] else "Login")
 
 try:
-    sh = connect_db()
-    users_sheet = init_auth_system(sh)
-    users_data = users_sheet.get_all_records()
-    users_df = pd.DataFrame(users_data)
-    found_sheet = None
-    for ws in sh.worksheets():
-        if "lead" in ws.title.lower(): found_sheet = ws; break
-    leads_sheet = found_sheet if found_sheet else sh.get_worksheet(0)
+    # Spreadsheet, worksheet handles and the users table are shared across reruns (see bootstrap.py)
+    boot = get_bootstrap()
+    users_sheet, leads_sheet = boot.users_ws, boot.leads_ws
+    users_df = boot.users()
+    lead_store = get_lead_store(leads_sheet)
+    notes_log = get_notes_log(boot)
+    write_queue = get_write_queue(lead_store, notes_log)
+    change_feed = get_change_feed(lead_store)
+    archive = get_archive(boot, lead_store, write_queue)
+    sync_service = get_sync_service(boot, lead_store) if STORAGE_BACKEND == "mirror" else None
 except Exception as e: st.error(f"Connection Error: {e}"); st.stop()
 
 if not st.session_state['logged_in']:
@@ -174,27 +267,6 @@ OFFICE_DATA = {
     "Unnao Office": "https://goo.gl/maps/dZC3py4mDLFQpB6t8?g_st=aw"
 }
 
-# --- PIPELINE (HINGLISH) ---
-PIPELINE_OPTS = [
-    "Naya Lead", "Ringing (Phone nahi uthaya)", "Switch Off / Network Issue", "Call Back (Busy tha)",
-    "Interested (Details Bheji)", "Follow-up (Baat chal rahi hai)", "RNR (Phone uthana band)",
-    "Site Visit Scheduled (Date Fix)", "Visit Done (Rate ki baat)", "Visit Done (Pasand nahi aaya)",
-    "Visit No-Show (Gadi gayi par aaya nahi)", "Sale Closed (Booking)", "Lost (Mehenga / Location issue)", "Junk / Broker / Bekar"
-]
-
-def get_status_icon(status):
-    s = str(status).lower().strip()
-    if "naya" in s: return "⚡"
-    if "switch" in s: return "📴"
-    if "visit scheduled" in s: return "🗓️"
-    if "visit done" in s: return "✅"
-    if "no-show" in s: return "🚫"
-    if "rnr" in s or "uthana band" in s: return "😶"
-    if "lost" in s or "mehenga" in s: return "📉"
-    if "interest" in s or "baat" in s: return "🔥"
-    if "junk" in s or "bekar" in s: return "🗑️"
-    return "📞"
-
 # --- MENU ---
 @st.dialog("🍔 Menu")
 def open_main_menu():
@@ -215,21 +287,44 @@ def open_main_menu():
                 try:
                     ts = get_ist_time(); new_id = generate_lead_id()
                     row = [new_id, ts, name, phone, src, "", st.session_state['username'], "Naya Lead", "", ts, "", notes, "", "", ""]
-                    leads_sheet.append_row(row); st.success("Added!"); time.sleep(1); st.rerun()
-                except Exception as e: st.error(str(e))
+                    write_queue.append(row); lead_store.append([row]); st.toast("Added!"); st.rerun()
+                except Exception as e: show_error(e)
     st.divider()
     if st.button("🚪 Logout", use_container_width=True): st.session_state['logged_in'] = False; st.rerun()
 
+def log_line(e):
+    head = " · ".join(escape(x) for x in (e['Time'], e['Author']) if x)
+    move = f" · {escape(e['From Status'])} → {escape(e['To Status'])}" if e['To Status'] and e['From Status'] != e['To Status'] else ""
+    note = escape(e['Note']).replace("\n", "<br>")
+    return f"<b>{head}</b>{move}" + (f"<br>{note}" if note else "")
+
+# --- WHATSAPP TEMPLATES ---
+WA_OPTS = ["Intro / Greeting", "Follow-up (FOMO)", "Ghost / RNR (Stop Calling)"] + list(OFFICE_DATA.keys()) + list(PROJECT_DATA.keys())
+
+def wa_templates(name):
+    # Every template's text for one client name (cached per name by LeadDetails)
+    msgs = {
+        "Intro / Greeting": f"Namaste {name} ji, TerraTip se baat kar raha hu. Kya aap Lucknow/Unnao me property dekh rahe hain?",
+        "Follow-up (FOMO)": f"Namaste {name} ji, 'Rustle Court' me kuch plots hold par gaye hain. Manager list finalize kar rahe hain. Kya main aapka naam Visitor List me daal du Sunday ke liye? - TerraTip",
+        "Ghost / RNR (Stop Calling)": f"Namaste {name} ji, TerraTip se call kar rahe thay. Aapne interest dikhaya tha par baat nahi ho pa rahi. Hum aapki file close kar rahe hain. Agar future me interest ho toh bataiyega.",
+    }
+    for project, link in PROJECT_DATA.items():
+        msgs[project] = f"Namaste {name} ji, *{project}* project ki photos aur videos is link par hain: {link}. Batayein kab visit plan karein?"
+    for office, link in OFFICE_DATA.items():  # an office wins over a project of the same name, as before
+        msgs[office] = f"Namaste {name} ji, Site visit ke liye humara {office} yahan hai: {link}. Aane se pehle call kar lijiyega. Family ke saath aayiye."
+    return msgs
+
+@st.cache_resource
+def get_lead_details(): return LeadDetails(wa_templates)
+
+lead_details = get_lead_details()
+
 # --- LEAD MODAL (UPDATED WITH COPY-PASTE) ---
 @st.dialog("📋 Lead Details")
-def open_lead_modal(row_dict, users_df):
-    phone = str(row_dict.get('Phone', '')).replace(',', '').replace('.', '')
-    name = row_dict.get('Client Name', 'Unknown')
-    status = row_dict.get('Status', 'Naya Lead')
-    notes = row_dict.get('Notes', '')
-    
-    tag_col = next((k for k in row_dict.keys() if "Tag" in k or "Label" in k), None)
-    curr_tag = str(row_dict.get(tag_col, '')) if tag_col else ""
+def open_lead_modal(vm, users_df):
+    # vm: view model from lead_detail.LeadDetails (row, cleaned phone, status index, templates, ...)
+    row_dict, phone, name, status, notes = vm['row'], vm['phone'], vm['name'], vm['status'], vm['notes']
+    curr_tag = vm['tag']
     
     # POLICY ALERT
     st.warning("🚨 **POLICY: NO HOME PICKUP.** (Client Office aayega -> Site Jayega -> Office wapas aayega)")
@@ -242,42 +337,17 @@ def open_lead_modal(row_dict, users_df):
     
     with c2:
         st.write("💬 **WhatsApp Templates**")
-        # Template Selector with BOTH Offices
-        wa_opts = ["Intro / Greeting", "Follow-up (FOMO)", "Ghost / RNR (Stop Calling)"] + list(OFFICE_DATA.keys()) + list(PROJECT_DATA.keys())
-        msg_choice = st.selectbox("Message Select Karo:", wa_opts, label_visibility="collapsed")
+        # Template Selector with BOTH Offices (texts are prepared in the view model)
+        msg_choice = st.selectbox("Message Select Karo:", WA_OPTS, label_visibility="collapsed")
         
-        # Logic to generate message
-        msg_text = ""
-        if msg_choice == "Intro / Greeting":
-            msg_text = f"Namaste {name} ji, TerraTip se baat kar raha hu. Kya aap Lucknow/Unnao me property dekh rahe hain?"
-        elif msg_choice == "Follow-up (FOMO)":
-            msg_text = f"Namaste {name} ji, 'Rustle Court' me kuch plots hold par gaye hain. Manager list finalize kar rahe hain. Kya main aapka naam Visitor List me daal du Sunday ke liye? - TerraTip"
-        elif msg_choice == "Ghost / RNR (Stop Calling)":
-             msg_text = f"Namaste {name} ji, TerraTip se call kar rahe thay. Aapne interest dikhaya tha par baat nahi ho pa rahi. Hum aapki file close kar rahe hain. Agar future me interest ho toh bataiyega."
-        elif msg_choice in OFFICE_DATA:
-            link = OFFICE_DATA[msg_choice]
-            msg_text = f"Namaste {name} ji, Site visit ke liye humara {msg_choice} yahan hai: {link}. Aane se pehle call kar lijiyega. Family ke saath aayiye."
-        elif msg_choice in PROJECT_DATA:
-            link = PROJECT_DATA[msg_choice]
-            msg_text = f"Namaste {name} ji, *{msg_choice}* project ki photos aur videos is link par hain: {link}. Batayein kab visit plan karein?"
-            
         # COPY BUTTON
-        st.code(msg_text, language='text')
+        st.code(vm['templates'][msg_choice], language='text')
         st.caption("👆 Upar copy button se copy karein")
 
     st.divider()
 
     # 2. STATUS & UPDATE FORM
-    def get_index(val, opts):
-        val = str(val).lower().strip()
-        for i, x in enumerate(opts):
-            if x.lower() == val: return i
-        if "visit" in val and "schedule" in val: return next((i for i, x in enumerate(opts) if "Site Visit Scheduled" in x), 0)
-        if "no-show" in val: return next((i for i, x in enumerate(opts) if "No-Show" in x), 0)
-        if "ringing" in val: return next((i for i, x in enumerate(opts) if "Ringing" in x), 0)
-        return 0
-
-    new_status = st.selectbox("Status (Kya hua?)", PIPELINE_OPTS, index=get_index(status, PIPELINE_OPTS))
+    new_status = st.selectbox("Status (Kya hua?)", PIPELINE_OPTS, index=vm['status_idx'])
     
     # --- SOP PROTOCOL REMINDERS (DYNAMIC) ---
     if "Switch Off" in new_status:
@@ -293,7 +363,17 @@ def open_lead_modal(row_dict, users_df):
 
     new_tag = st.text_input("🏷️ Label (e.g. VIP, Hot)", value=curr_tag)
     
-    if len(str(notes)) > 2: st.markdown(f"<div class='note-history'>{notes}</div>", unsafe_allow_html=True)
+    # History comes from the notes log, newest first, a page at a time; a Notes cell from before the log shows as-is
+    lead_key = row_dict.get(lead_store.id_col) or phone
+    log_key = f"log_win_{lead_key}"
+    try: entries, total = notes_log.recent(lead_key, st.session_state.get(log_key, LOG_PAGE))
+    except Exception as e: entries, total = [], 0; st.caption(f"⚠️ Notes log nahi khula: {e}")
+    if entries:
+        st.markdown("<div class='note-history'>" + "<br>".join(map(log_line, entries)) + "</div>", unsafe_allow_html=True)
+        if total > len(entries):
+            st.button(f"⬆️ Purane notes ({len(entries)}/{total})", key=f"more_{log_key}",
+                      on_click=lambda: st.session_state.update({log_key: len(entries) + LOG_PAGE}))
+    elif len(str(notes)) > 2: st.markdown(f"<div class='note-history'>{notes}</div>", unsafe_allow_html=True)
     new_note = st.text_input("New Note (Likho kya baat hui)")
     
     today = get_ist_date()
@@ -307,180 +387,99 @@ def open_lead_modal(row_dict, users_df):
     
     new_assign = None
     if st.session_state['role'] == "Manager":
-        try: u_idx = users_df['Username'].tolist().index(row_dict.get('Assign', ''))
-        except: u_idx = 0
-        new_assign = st.selectbox("Assign Kisko?", users_df['Username'].tolist(), index=u_idx)
+        u_opts, u_idx = lead_details.user_opts(users_df, boot.users_version)
+        new_assign = st.selectbox("Assign Kisko?", u_opts, index=u_idx.get(row_dict.get('Assign', ''), 0))
 
     if st.button("✅ Save Karo", type="primary", use_container_width=True):
         try:
-            cell = leads_sheet.find(phone)
-            if not cell: st.error("Not found")
+            # Row + header positions come from the store's index; the sheet write itself is queued
+            lead_id = row_dict.get(lead_store.id_col)
+            r = lead_store.row_for(phone, lead_id)
+            if not r: st.error("Not found")
             else:
-                r = cell.row; h = leads_sheet.row_values(1)
-                def get_idx(n): return next((i+1 for i,v in enumerate(h) if n.lower() in v.lower()), None)
-                updates = []
-                updates.append({'range': gspread.utils.rowcol_to_a1(r, get_idx("Status") or 8), 'values': [[new_status]]})
-                tag_idx = get_idx("Tag") or get_idx("Label")
-                if tag_idx: updates.append({'range': gspread.utils.rowcol_to_a1(r, tag_idx), 'values': [[new_tag]]})
-                if new_note:
-                    full_note = f"[{datetime.now(IST).strftime('%d-%b')}] {new_note}\n{notes}"
-                    updates.append({'range': gspread.utils.rowcol_to_a1(r, get_idx("Notes") or 12), 'values': [[full_note]]})
-                if final_date:
-                    updates.append({'range': gspread.utils.rowcol_to_a1(r, get_idx("Follow") or 15), 'values': [[str(final_date)]]})
+                h = lead_store.header; get_idx = lead_store.col_num
+                patched = {}
+                def put(c, val):
+                    if c <= len(h): patched[h[c-1]] = val
+                put(get_idx("Status") or 8, new_status)
+                tag_idx = get_idx("Tag", "Label")
+                if tag_idx: put(tag_idx, new_tag)
+                # Each save with a note or a status change is one notes log entry; the Notes cell keeps a summary
+                if new_note or new_status != status:
+                    ts = get_ist_time()
+                    if str(notes).strip() and not notes_log.count(lead_key):  # first logged save keeps the old cell as history
+                        write_queue.log_entry(notes_log.entry(lead_key, LEGACY_AUTHOR, "", "", notes, ts=""))
+                    write_queue.log_entry(notes_log.entry(lead_key, st.session_state['username'], status, new_status, new_note, ts=ts))
+                if new_note: put(get_idx("Notes") or 12, summary(new_note))
+                if final_date: put(get_idx("Follow") or 15, str(final_date))
                 t_idx = get_idx("Last Call")
-                if t_idx: updates.append({'range': gspread.utils.rowcol_to_a1(r, t_idx), 'values': [[get_ist_time()]]})
-                if new_assign:
-                    updates.append({'range': gspread.utils.rowcol_to_a1(r, get_idx("Assign") or 7), 'values': [[new_assign]]})
-                leads_sheet.batch_update(updates); st.rerun()
-        except Exception as e: st.error(str(e))
-
-# --- 2. CARD DESIGN ---
-CARD_STYLE = """
-<style>
-    body { margin: 0; padding: 0; font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; }
-    a.card-link { text-decoration: none; color: inherit; display: block; }
-    
-    .lead-card {
-        background-color: var(--secondary-background-color);
-        border: 1px solid rgba(128, 128, 128, 0.2);
-        border-radius: 12px;
-        padding: 16px;
-        padding-left: 24px;
-        margin-bottom: 14px;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-        position: relative;
-        transition: transform 0.2s, box-shadow 0.2s;
-        overflow: hidden;
-    }
-    .lead-card:hover {
-        transform: translateY(-3px);
-        box-shadow: 0 6px 12px rgba(0,0,0,0.15);
-        border-color: rgba(128, 128, 128, 0.4);
-    }
-    
-    .status-strip {
-        position: absolute; left: 0; top: 0; bottom: 0; width: 6px;
-        border-top-left-radius: 12px; border-bottom-left-radius: 12px;
-    }
-    .strip-red { background-color: #FF5252; }
-    .strip-orange { background-color: #FFA726; }
-    .strip-green { background-color: #66BB6A; }
-    .strip-grey { background-color: #9E9E9E; }
-
-    .card-top { display: flex; justify-content: space-between; align-items: flex-start; margin-bottom: 6px; }
-    .card-name { font-size: 1.15rem; font-weight: 700; color: var(--text-color); line-height: 1.2; }
-    .card-subtext { font-size: 0.85rem; color: var(--text-color); opacity: 0.7; margin-top: 2px; display: flex; align-items: center; gap: 6px; }
-    
-    .pill-badge { font-size: 0.75rem; font-weight: 600; text-transform: uppercase; padding: 3px 8px; border-radius: 6px; background-color: rgba(255, 255, 255, 0.1); border: 1px solid rgba(128, 128, 128, 0.3); color: var(--text-color); white-space: nowrap; }
-    .source-badge { background-color: rgba(0, 123, 255, 0.1); color: #4287f5; border: none; }
-
-    .card-body { margin: 12px 0; display: flex; align-items: center; gap: 10px; }
-    .status-text { font-size: 1rem; color: var(--text-color); font-weight: 500; }
-
-    .card-footer { display: flex; justify-content: space-between; align-items: center; border-top: 1px solid rgba(128, 128, 128, 0.2); padding-top: 10px; font-size: 0.8rem; color: var(--text-color); opacity: 0.8; }
-    .footer-highlight { font-weight: 600; opacity: 1; display: flex; align-items: center; gap: 5px; }
-    
-    .txt-red { color: #FF5252; }
-    .txt-green { color: #66BB6A; }
-    .txt-orange { color: #FFA726; }
-    .txt-blue { color: #42A5F5; }
-</style>
-"""
-
-def generate_cards_html(dframe, context):
-    html = CARD_STYLE 
-    today = get_ist_date()
-    
-    for i, row in dframe.iterrows():
-        # DATA PREP
-        phone = str(row.get('Phone', '')).replace(',', '').replace('.', '')
-        display_phone = phone if len(phone) < 11 else f"+91 {phone[-10:]}"
-        name = str(row.get('Client Name', 'Unknown'))
-        raw_status = str(row.get('Status', ''))
-        source = str(row.get('Source', '')).strip() 
-        
-        tag_col = next((c for c in row.index if "Tag" in c or "Label" in c), None)
-        tag_val = str(row.get(tag_col, '')).strip() if tag_col else ""
-        
-        f_val = str(row.get(next((c for c in row.index if "Follow" in c), 'Follow'), '')).strip()
-        t_val = str(row.get(next((c for c in row.index if "Last Call" in c), 'Last'), '')).strip()
-        last_update = format_datetime(t_val)
-        
-        strip_class = "strip-grey"
-        footer_html = ""
-        
-        if context == "Action":
-            strip_class = "strip-red"
-            try:
-                d = datetime.strptime(str(f_val).strip(), "%Y-%m-%d").date()
-                if d < today: footer_html = "<span class='footer-highlight txt-red'>⚠️ Overdue</span>"
-                elif d == today: footer_html = "<span class='footer-highlight txt-orange'>🔥 Aaj Karo</span>"
-                else: footer_html = "<span class='footer-highlight txt-green'>⚡ Action</span>"
-            except: footer_html = "<span class='footer-highlight txt-green'>⚡ Action</span>"
-            
-        elif context == "Future":
-            strip_class = "strip-green"
-            footer_html = f"<span class='footer-highlight txt-blue'>📅 {format_date_only(f_val)}</span>"
-            
-        elif context == "Recycle":
-            strip_class = "strip-orange"
-            footer_html = "<span class='footer-highlight'>♻️ Recycle</span>"
-            
-        else: 
-            strip_class = "strip-grey"
-            footer_html = "<span>🔒 Closed</span>"
-
-        icon = get_status_icon(raw_status)
-        display_status = "Lost" if "Lost" in raw_status else raw_status.split(" /")[0]
-        
-        tag_html = f"<span class='pill-badge'>{tag_val}</span>" if tag_val and tag_val.lower() != "nan" else ""
-        src_html = f"<span class='pill-badge source-badge'>{source}</span>" if source and source.lower() != "nan" else ""
-
-        card = f"""
-        <a href='#' id='{phone}' class='card-link'>
-            <div class='lead-card'>
-                <div class='status-strip {strip_class}'></div>
-                <div class='card-top'>
-                    <div>
-                        <div class='card-name'>{name}</div>
-                        <div class='card-subtext'>
-                            {src_html} <span>📞 {display_phone}</span>
-                        </div>
-                    </div>
-                    {tag_html}
-                </div>
-                <div class='card-body'>
-                    <span style='font-size:1.4rem;'>{icon}</span>
-                    <span class='status-text'>{display_status}</span>
-                </div>
-                <div class='card-footer'>
-                    {footer_html}
-                    <span>🕒 {last_update}</span>
-                </div>
-            </div>
-        </a>
-        """
-        html += card
-    return html
+                if t_idx: put(t_idx, get_ist_time())
+                if new_assign: put(get_idx("Assign") or 7, new_assign)
+                # Optimistic: every session sees the edit now, the worker writes it to the sheet
+                write_queue.update(lead_id, phone, patched)
+                lead_store.patch_row(r, patched)
+                st.rerun()
+        except Exception as e: show_error(e)
 
 # --- LIVE FEED ---
-@st.fragment(run_every=30)
+# Cards render PAGE_SIZE at a time; "Aur dikhao" grows the window (kept per tab in session_state)
+WATCH_SECS = 1  # how quickly other sessions' edits show up
+
+def card_window(key_prefix): return st.session_state.get(f"win_{key_prefix}", PAGE_SIZE)
+
+def show_more_btn(total, key_prefix):
+    lim = card_window(key_prefix)
+    if total > lim:
+        st.button(f"⬇️ Aur dikhao ({lim}/{total})", key=f"more_{key_prefix}", use_container_width=True,
+                  on_click=lambda: st.session_state.update({f"win_{key_prefix}": lim + PAGE_SIZE}))
+
+def cards_html(dframe, ctx, limit):
+    with recorder.timer("generate_cards_html", rows=min(limit, len(dframe))):
+        return generate_cards_html(dframe, ctx, limit=limit)
+
+def note_session_memory(held):
+    # Per-session bytes: index arrays and rendered windows; the shared table is counted once, on the Stats page
+    sid = st.session_state.setdefault('sid', uuid.uuid4().hex[:8])
+    nbytes = sum(x.nbytes if isinstance(x, np.ndarray) else int(x.memory_usage(deep=True, index=False).sum()) for x in held)
+    recorder.note_session(sid, user=st.session_state['username'], bytes=nbytes)
+
+# No timer: the feed reruns when watch_changes sees a new data version (change_feed.py)
+@st.fragment
+@recorder.scoped("show_crm")
 def show_crm(users_df, search_q):
-    try: data = leads_sheet.get_all_records(); df = pd.DataFrame(data)
+    seen = change_feed.version  # read before the frame: a swap in between costs one extra rerun, never a missed one
+    try: df = lead_store.get()
     except: return
-    df.columns = df.columns.astype(str).str.strip()
+    if df is None: return
+    st.session_state['crm_version'] = seen
 
+    # Sessions share the store frame read-only and hold row positions into it, never filtered copies
+    view = owners = None
     if st.session_state['role'] == "Telecaller":
-        ac = next((c for c in df.columns if "assign" in c.lower()), None)
-        if ac: df = df[(df[ac] == st.session_state['username']) | (df[ac] == st.session_state['name']) | (df[ac] == "TC1")]
+        # The telecaller's own partition (username, full name or the shared TC1 pool)
+        owners = (st.session_state['username'], st.session_state['name'], "TC1")
+        with recorder.timer("filter_role"):
+            parts = get_assign_index(); parts.sync(lead_store)
+            view = parts.positions(*owners)
+            view = view[view < len(df)]
 
     if search_q:
-        res = df[df.astype(str).apply(lambda x: x.str.contains(search_q, case=False)).any(axis=1)]
+        search_index = get_search_index(); search_index.sync(lead_store)
+        hits = search_index.query(search_q, within=view)
+        res = df.iloc[[p for p in hits if p < len(df)]]
         st.info(f"🔍 Found {len(res)}")
-        clicked = click_detector(generate_cards_html(res, "Search"), key="search_click")
+        clicked = click_detector(cards_html(res, "Search", card_window("search")), key="search_click")
+        show_more_btn(len(res), "search")
+        note_session_memory([a for a in (view,) if a is not None] + [res])
         if clicked:
-            r = df[df['Phone'].astype(str).str.replace(r'\D','',regex=True) == clicked].iloc[0]
-            open_lead_modal(r.to_dict(), users_df)
+            vm = lead_details.view(lead_store, clicked)
+            if vm: open_lead_modal(vm, users_df)
+        # Archived leads are searched too; the archive tabs are only downloaded on the first search
+        try:
+            arch_index = get_archive_index(); archive.get(); arch_index.sync(archive)
+            a_hits = arch_index.query(search_q, within=archive.positions(owners) if owners else None)
+        except Exception: a_hits = []
+        if len(a_hits): show_archive_cards(a_hits, "arch_search", f"📦 Archive me {len(a_hits)}")
         return
 
     today = get_ist_date()
@@ -494,83 +493,100 @@ def show_crm(users_df, search_q):
     
     if is_bulk:
         st.info("Select leads")
+        def selected(): return {k.split("_")[-1] for k, v in st.session_state.items() if k.startswith("sel_") and v}
+        def report(res):
+            if res.done: st.success(f"Done! ({res.summary()})")
+            if res.failed:
+                st.warning(f"⚠️ {len(res.failed)} fail hue")
+                st.dataframe(pd.DataFrame(list(res.failed.items()), columns=['Phone', 'Error']), hide_index=True)
+            else: time.sleep(1); st.rerun()
         c1, c2, c3 = st.columns([1.5, 1.5, 1])
         with c1:
             assign_target = st.selectbox("Assign", users_df['Username'].tolist(), label_visibility="collapsed", placeholder="User")
             if st.button("Assign Karo"):
-                phones = [k.split("_")[-1] for k, v in st.session_state.items() if k.startswith("sel_") and v]
-                if phones:
-                    try:
-                        h = leads_sheet.row_values(1)
-                        col_idx = next((i+1 for i,v in enumerate(h) if "Assign" in v), None)
-                        if col_idx:
-                            all_v = leads_sheet.get_all_values(); updates = []
-                            for i, r in enumerate(all_v):
-                                if len(r)>3 and str(r[3]).replace(',','').replace('.','') in phones:
-                                    updates.append({'range': gspread.utils.rowcol_to_a1(i+1, col_idx), 'values': [[assign_target]]})
-                            if updates: leads_sheet.batch_update(updates); st.success("Done!"); time.sleep(1); st.rerun()
-                    except: st.error("Error")
+                phones = selected()
+                if phones: report(bulk_set(lead_store, phones, assign_target, "Assign"))
         with c2:
             label_text = st.text_input("Label", placeholder="Tag", label_visibility="collapsed")
             if st.button("Tag Karo"):
-                phones = [k.split("_")[-1] for k, v in st.session_state.items() if k.startswith("sel_") and v]
-                if phones and label_text:
-                    try:
-                        h = leads_sheet.row_values(1)
-                        col_idx = next((i+1 for i,v in enumerate(h) if "Tag" in v or "Label" in v), None)
-                        if col_idx:
-                            all_v = leads_sheet.get_all_values(); updates = []
-                            for i, r in enumerate(all_v):
-                                if len(r)>3 and str(r[3]).replace(',','').replace('.','') in phones:
-                                    updates.append({'range': gspread.utils.rowcol_to_a1(i+1, col_idx), 'values': [[label_text]]})
-                            if updates: leads_sheet.batch_update(updates); st.success("Done!"); time.sleep(1); st.rerun()
-                    except: st.error("Error")
+                phones = selected()
+                if phones and label_text: report(bulk_set(lead_store, phones, label_text, "Tag", "Label"))
         with c3:
             if st.button("🗑️"):
-                phones = [k.split("_")[-1] for k, v in st.session_state.items() if k.startswith("sel_") and v]
-                if phones:
-                    try:
-                        all_v = leads_sheet.get_all_values()
-                        to_del = [i+1 for i,r in enumerate(all_v) if len(r)>3 and str(r[3]).replace(',','').replace('.','') in phones]
-                        for r in sorted(to_del, reverse=True): leads_sheet.delete_rows(r)
-                        st.success("Deleted"); time.sleep(1); st.rerun()
-                    except: st.error("Error")
-
-    def parse_date(v):
-        try: return datetime.strptime(str(v).strip(), "%Y-%m-%d").date()
-        except: return None
-    
-    f_col = next((c for c in df.columns if "Follow" in c), None)
-    df['PD'] = df[f_col].apply(parse_date) if f_col else None
-    
-    dead = df['Status'].str.contains("Closed|Booked|Junk|Invalid|Agent", case=False, na=False)
-    recycle = df['Status'].str.contains("Lost|Price|Location|Not Interest", case=False, na=False)
-    action_cond = (df['PD'].notna() & (df['PD'] <= today)) | df['Status'].str.contains("Naya|New", case=False, na=False)
-    future_cond = (df['PD'].notna() & (df['PD'] > today))
+                phones = selected()
+                if phones: report(bulk_delete(lead_store, phones))
+
+    # Action/Future are slices of the day's follow-up queues (scheduler.py); Recycle/Closed read the precomputed Bucket
+    with recorder.timer("filter_tabs"):
+        sched = get_schedule(); sched.sync(lead_store)
+        tabs = tab_positions(sched, df, today, owners, view)
+    held = [a for a in (view,) if a is not None] + list(tabs.values())
+    # The first Action cards are the likeliest clicks: their modal data is ready before the tap
+    lead_details.prefetch(lead_store, tabs["Action"][:PREFETCH])
     
     # HINGLISH TABS
     t1, t2, t3, t4 = st.tabs([f"🔥 Action (Aaj ka)", f"📅 Future (Aage ka)", f"♻️ Recycle", f"❌ Closed"])
     
-    def render_tab_content(dframe, ctx, key_prefix):
-        if dframe.empty: st.info("Koi lead nahi hai.")
+    def render_tab_content(pos, ctx, key_prefix):
+        if not len(pos): st.info("Koi lead nahi hai.")
         else:
-            if ctx == "Future": dframe = dframe.sort_values(by='PD')
+            # Only the visible window is materialised (Future positions come sorted by PD)
+            lim = card_window(key_prefix)
+            dframe = df.iloc[pos[:lim]]
+            held.append(dframe)
             if is_bulk:
                 for i, row in dframe.iterrows():
                     c1, c2 = st.columns([0.15, 0.85])
                     c1.checkbox("", key=f"sel_{key_prefix}_{row['Phone']}")
                     c2.button(f"{row['Client Name']}", key=f"btn_{key_prefix}_{row['Phone']}", use_container_width=True)
+                show_more_btn(len(pos), key_prefix)
             else:
-                html = generate_cards_html(dframe, ctx)
+                html = cards_html(dframe, ctx, lim)
                 clicked = click_detector(html, key=f"click_{key_prefix}")
+                show_more_btn(len(pos), key_prefix)
                 if clicked:
-                    r = df[df['Phone'].astype(str).str.replace(r'\D','',regex=True) == clicked]
-                    if not r.empty: open_lead_modal(r.iloc[0].to_dict(), users_df)
+                    vm = lead_details.view(lead_store, clicked)
+                    if vm: open_lead_modal(vm, users_df)
+
+    with t1: render_tab_content(tabs["Action"], "Action", "act")
+    with t2: render_tab_content(tabs["Future"], "Future", "fut")
+    with t3: render_tab_content(tabs["Recycle"], "Recycle", "rec")
+    with t4:
+        render_tab_content(tabs["History"], "History", "hist")
+        if not is_bulk and st.toggle("📦 Purane (Archive) bhi dikhao", key="arch_hist"):
+            try: show_archive_cards(archive.positions(owners), "arch", "📦 Archive")
+            except Exception as e: show_error(e)
+    note_session_memory(held)
+
+def show_archive_cards(pos, key_prefix, title):
+    if not len(pos): st.info("Archive me koi lead nahi hai."); return
+    st.caption(title)
+    lim = card_window(key_prefix)
+    clicked = click_detector(cards_html(archive.df.iloc[pos[:lim]], "Archive", lim), key=f"click_{key_prefix}")
+    show_more_btn(len(pos), key_prefix)
+    if clicked:
+        rec = archive.record(clicked)
+        if rec: open_archive_modal(rec)
+
+@st.dialog("📦 Archived Lead")
+def open_archive_modal(rec):
+    phone = str(rec.get('Phone', ''))
+    st.caption(f"**{rec.get('Client Name', 'Unknown')}** | {phone}")
+    st.write(f"{rec.get('Status', '')} · Last Call: {rec.get('Last Call', '-')} · {rec.get('Assign', '')}")
+    notes = rec.get('Notes', '')
+    if len(str(notes)) > 2: st.markdown(f"<div class='note-history'>{escape(str(notes))}</div>", unsafe_allow_html=True)
+    if st.button("♻️ Wapas Live karo", type="primary", use_container_width=True):
+        def put_back(row): write_queue.append(row); lead_store.append([row])
+        try:
+            if archive.restore(phone, lead_store.header, put_back, get_ist_time()): st.success("Live me wapas aa gayi!"); st.rerun()
+            else: st.error("Archive me nahi mili (shayad pehle hi wapas aa chuki hai)")
+        except Exception as e: show_error(e)
 
-    with t1: render_tab_content(df[action_cond & ~dead & ~recycle], "Action", "act")
-    with t2: render_tab_content(df[future_cond & ~dead & ~recycle], "Future", "fut")
-    with t3: render_tab_content(df[recycle & ~dead], "Recycle", "rec")
-    with t4: render_tab_content(df[dead], "History", "hist")
+@st.fragment(run_every=WATCH_SECS)
+def watch_changes():
+    # Renders nothing; an idle screen costs one version compare per tick
+    seen = st.session_state.get('crm_version')
+    if seen is not None and change_feed.version != seen: st.rerun()
 
 # --- ADMIN PANEL ---
 def show_admin(users_df):
@@ -581,40 +597,159 @@ def show_admin(users_df):
             u = st.text_input("Username"); p = st.text_input("Password", type="password")
             n = st.text_input("Naam (Full Name)"); r = st.selectbox("Role", ["Telecaller", "Sales Specialist", "Manager"])
             if st.form_submit_button("Create User"):
-                users_sheet.append_row([u, hash_pass(p), r, n]); st.success("Created!"); st.rerun()
+                users_sheet.append_row([u, hash_pass(p), r, n]); boot.invalidate_users(); st.success("Created!"); st.rerun()
         st.divider()
         st.subheader("📥 Upload CSV")
         ag = st.multiselect("Assign To", users_df['Username'].tolist())
         up = st.file_uploader("CSV File Chuno", type=['csv'])
+        # A failed upload keeps its job in session_state so "Upload" resumes from the last committed chunk
+        job_key = f"csv_job_{up.name}_{up.size}" if up else None
+        job = st.session_state.get(job_key)
+        if job and job.error: st.warning(f"⚠️ Pichla upload {job.chunks_done} chunk ke baad ruka: {job.error}. Upload dabao to wahi se shuru hoga.")
         if up and st.button("Upload"):
             if not ag: st.error("Agent Select Karo!")
             else:
                 try:
-                    try: df_up = pd.read_csv(up, encoding='utf-8')
-                    except: df_up = pd.read_csv(up, encoding='ISO-8859-1')
-                    cols = [c.lower() for c in df_up.columns]
-                    n_i = next((i for i, c in enumerate(cols) if "name" in c), -1)
-                    p_i = next((i for i, c in enumerate(cols) if "phone" in c or "mobile" in c), -1)
-                    if n_i == -1 or p_i == -1: st.error("Name ya Phone column nahi mila")
-                    else:
-                        nc = df_up.columns[n_i]; pc = df_up.columns[p_i]
-                        ex_phones = set(re.sub(r'\D', '', str(p))[-10:] for p in leads_sheet.col_values(4))
-                        rows = []; cyc = itertools.cycle(ag); ts = get_ist_time()
-                        for _, r in df_up.iterrows():
-                            p_clean = re.sub(r'\D', '', str(r[pc]))[-10:]
-                            if len(p_clean)==10 and p_clean not in ex_phones:
-                                rows.append([generate_lead_id(), ts, r[nc], p_clean, "Upload", "", next(cyc), "Naya Lead", "", ts, "", "", "", "", ""])
-                                ex_phones.add(p_clean)
-                        if rows: leads_sheet.append_rows(rows); st.success(f"Added {len(rows)} leads"); time.sleep(1); st.rerun()
-                except Exception as e: st.error(str(e))
+                    if not job or job.finished:
+                        job = ImportJob(ag); st.session_state[job_key] = job
+                        if not job.prepare(up): raise ValueError("Name ya Phone column nahi mila")
+                    ts = get_ist_time(); bar = st.progress(0.0, text="Upload ho raha hai...")
+                    def make_row(n, p, a): return [generate_lead_id(), ts, n, p, "Upload", "", a, "Naya Lead", "", ts, "", "", "", "", ""]
+                    def on_progress(frac, j): bar.progress(frac, text=f"{j.added} leads add hue · {j.rows_per_sec:,.0f} rows/sec")
+                    # The upload appends straight to the sheet: queued adds land first and the store re-reads the
+                    # sheet before and after, so its rows keep the sheet's order (queued edits address rows by it)
+                    write_queue.drain(); lead_store.invalidate(full=True); lead_store.get()
+                    with governor.priority(BULK): job.run(up, leads_sheet, make_row, on_commit=lead_store.append, on_progress=on_progress)
+                    write_queue.drain(); lead_store.invalidate(full=True)
+                    st.caption(" · ".join(f"{k}: {v}" for k, v in job.stats().items()))
+                    if job.error: st.error(f"Upload ruka: {job.error}")
+                    else: st.success(f"Added {job.added} leads"); time.sleep(1); st.rerun()
+                except Exception as e: show_error(e)
     with c2:
         st.subheader("Team")
         st.dataframe(users_df[['Name','Role']], hide_index=True)
+        st.caption("⏱️ Startup: " + " · ".join(f"{k} {v}s" for k, v in boot.timings.items()))
         opts = [x for x in users_df['Username'].unique() if x != st.session_state['username']]
         if opts:
             d_u = st.selectbox("Delete User", opts)
             if st.button("❌ Delete User"):
-                cell = users_sheet.find(d_u); users_sheet.delete_rows(cell.row); st.success("Deleted"); st.rerun()
+                cell = users_sheet.find(d_u); users_sheet.delete_rows(cell.row); boot.invalidate_users(); st.success("Deleted"); st.rerun()
+        st.divider()
+        st.subheader("📦 Archive")
+        a = archive.stats
+        st.caption(f"{COLD_DAYS} din se bina call ki Closed/Recycle leads archive hoti hain · "
+                   + " · ".join(f"{k}: {v}" for k, v in a.items()))
+        if archive.last_error: st.warning(f"⚠️ Archive error: {archive.last_error}")
+        if STORAGE_BACKEND != "mirror" and st.button("📦 Archive Now"):
+            try: st.success(f"{archive.run(lead_store, get_ist_date(), hold=write_queue.busy)} leads archive hui"); st.rerun()
+            except Exception as e: show_error(e)
+        if sync_service:
+            st.divider()
+            st.subheader("🔄 Sheet Sync")
+            met = sync_service.metrics()
+            last = met['last_cycle'] or {}
+            s1, s2, s3 = st.columns(3)
+            s1.metric("Lag (sec)", met['lag_secs'] if met['lag_secs'] is not None else "-")
+            s2.metric("Rows (last cycle)", last.get('pulled', 0) + last.get('pushed', 0))
+            s3.metric("API calls", met['api_calls'])
+            st.caption(" · ".join(f"{k}: {met[k]}" for k in ('cycles', 'pulled', 'pushed', 'conflicts', 'errors')))
+            if met['last_error']: st.warning(f"⚠️ Sync error: {met['last_error']}")
+            if st.button("Sync Now"):
+                try: sync_service.cycle(); st.rerun()
+                except Exception as e: show_error(e)
+            conflicts = sync_service.conflicts()
+            if conflicts:
+                with st.expander(f"⚠️ Conflicts ({met['conflicts']})"):
+                    st.dataframe(pd.DataFrame(conflicts), hide_index=True)
+
+# --- STATS ---
+# Everything here reads the materialised rollups (analytics.py), never the leads themselves
+def show_stats():
+    try: lead_store.get()
+    except Exception as e: show_error(e); return
+    roll = get_rollups(); roll.sync(lead_store)
+    sched = get_schedule(); sched.sync(lead_store)
+    today = get_ist_date()
+    owners = None if st.session_state['role'] == "Manager" else (st.session_state['username'], st.session_state['name'], "TC1")
+    c1, c2 = st.columns([0.7, 0.3])
+    rng = c1.date_input("Tareekh (Lead aane ki)", value=(today - timedelta(days=30), today), label_visibility="collapsed")
+    if c2.toggle("Sab time"): start = end = None
+    else: start, end = (tuple(rng) * 2)[:2] if rng else (None, None)
+    sm = roll.summary(start, end, owners)
+    m1, m2, m3, m4, m5 = st.columns(5)
+    m1.metric("Leads", sm['total'])
+    m2.metric("🔥 Live", sm['buckets']['Live'])
+    m3.metric("♻️ Recycle", sm['buckets']['Recycle'])
+    m4.metric("❌ Closed", sm['buckets']['Closed'])
+    m5.metric("⏰ Overdue", len(sched.queues(today, owners)['Overdue']))
+    f1, f2 = st.columns(2)
+    with f1:
+        st.markdown("**🪜 Funnel**")
+        st.dataframe(pd.DataFrame(sm['funnel']), hide_index=True)
+        st.markdown("**📌 Status**")
+        if sm['status']: st.bar_chart(pd.Series(sm['status'], name="Leads"), horizontal=True)
+    with f2:
+        st.markdown("**📣 Source Yield**")
+        if sm['sources']: st.dataframe(pd.DataFrame(sm['sources']), hide_index=True)
+    st.markdown("**📞 Daily Calls (Last Call)**")
+    calls = roll.daily_calls(start, end, owners)
+    if calls: st.bar_chart(pd.DataFrame(calls).pivot_table(index='Day', columns='Assign', values='Calls', fill_value=0))
+    else: st.info("Is range me koi call nahi.")
+
+# --- FOLLOW-UP CAPACITY (MANAGER) ---
+def show_capacity():
+    st.subheader("📆 Follow-up Load")
+    sched = get_schedule(); sched.sync(lead_store)
+    cap = sched.capacity(get_ist_date())
+    if not cap: st.info("Koi follow-up nahi hai."); return
+    st.dataframe(pd.DataFrame(cap), hide_index=True)
+
+# --- PERFORMANCE PANEL (MANAGER) ---
+def show_perf_panel():
+    st.subheader("⚡ Performance")
+    rows = recorder.summary()
+    if not rows: st.info("Abhi koi data nahi hai."); return
+    perf = pd.DataFrame(rows)
+    pages = ["Sab"] + sorted(perf['page'].unique())
+    pick = st.selectbox("Page / Fragment", pages)
+    if pick != "Sab": perf = perf[perf['page'] == pick]
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Calls", int(perf['count'].sum()))
+    c2.metric("Errors", int(perf['errors'].sum()))
+    c3.metric("429 (Quota)", int(perf['quota_errors'].sum()))
+    st.dataframe(perf.drop(columns=['hist']).sort_values('max_ms', ascending=False), hide_index=True)
+    fs = change_feed.stats
+    st.caption(f"🔔 Data version {change_feed.version} · polls {fs['polls']} · changes {fs['changes']} · errors {fs['errors']}"
+               + (f" · last: {change_feed.last_error}" if change_feed.last_error else ""))
+    gm = governor.metrics()
+    if STORAGE_BACKEND != "sqlite":
+        st.markdown("**🚦 Sheets Quota**")
+        k1, k2, k3 = st.columns(3)
+        k1.metric("Read tokens", f"{gm['kinds']['read']['tokens']:g} / {gm['kinds']['read']['per_min']}")
+        k2.metric("Write tokens", f"{gm['kinds']['write']['tokens']:g} / {gm['kinds']['write']['per_min']}")
+        k3.metric("429 (API)", gm['quota_errors'])
+        st.dataframe(pd.DataFrame(gm['lanes']), hide_index=True)
+    if lead_store.last_fetch:
+        with st.expander(f"📥 Last full load: {len(lead_store.last_fetch)} block(s), "
+                         f"{max(b['ms'] for b in lead_store.last_fetch):.0f} ms slowest"):
+            st.dataframe(pd.DataFrame(lead_store.last_fetch), hide_index=True)
+    snap = get_snapshot()
+    if snap:
+        ss = snap.stats
+        st.caption(f"🗂️ Snapshot: {'writer' if snap.is_writer() else 'reader'} · published {ss['published']} ({ss['publish_ms']} ms)"
+                   f" · loaded {ss['loaded']} ({ss['load_ms']} ms)")
+    st.markdown("**🧠 Memory**")
+    mem = lead_store.memory_report()
+    sessions = recorder.sessions_report()
+    m1, m2 = st.columns(2)
+    m1.metric("Shared lead table (MB)", round(sum(mem.values()) / 2**20, 1))
+    m2.metric("Sessions (MB)", round(sum(x['bytes'] for x in sessions) / 2**20, 2))
+    with st.expander("Per column / per session"):
+        st.dataframe(pd.DataFrame([{'column': k, 'MB': round(v / 2**20, 2)} for k, v in mem.items()]), hide_index=True)
+        if sessions: st.dataframe(pd.DataFrame(sessions), hide_index=True)
+    d1, d2 = st.columns(2)
+    d1.download_button("📤 Export JSON", recorder.to_json(), file_name="crm_perf.json", mime="application/json", use_container_width=True)
+    if d2.button("♻️ Reset", use_container_width=True): recorder.reset(); st.rerun()
 
 # --- ROUTER ---
 c_search, c_menu = st.columns([0.85, 0.15])
@@ -631,8 +766,12 @@ st.divider()
 if st.session_state['current_page'] == "CRM":
     q = search_query if 'search_query' in locals() and search_query else None
     show_crm(users_df, q)
+    watch_changes()
 elif st.session_state['current_page'] == "Insights":
-    st.title("📊 Stats"); st.info("Jaldi Aayega")
+    st.title("📊 Stats"); show_stats()
+    if st.session_state['role'] == "Manager": show_capacity(); show_perf_panel()
 elif st.session_state['current_page'] == "Admin":
     if st.session_state['role'] == "Manager": show_admin(users_df)
     else: st.error("⛔ Access Denied")
+
+recorder.record("rerun", time.perf_counter() - _rerun_t0)
@@ -0,0 +1,248 @@
+# --- HOT / COLD ARCHIVE ---
+# The Leads tab only keeps the working set. Leads that left the Live bucket
+# (Closed / Booked / Junk / Lost / ...) and haven't been called for COLD_DAYS
+# are moved to month-partitioned "Archive YYYY-MM" tabs (by Last Call month),
+# so every refresh, classification and index build scales with active leads,
+# not all-time history.
+#   - move out: rows are appended to their archive tabs first, then deleted
+#     from the Leads tab by row position (bottom-up, one batch), after checking
+#     the sheet still has the expected phone at each row. A crash in between
+#     leaves a lead in both places, never in neither.
+#     The delete and the store's drop_rows run under store.row_lock, which the
+#     write-behind worker and bulk actions also hold while they address rows.
+#     Under that lock the leads are found again by Lead ID / phone (rows may
+#     have moved while the archive tabs were written) and the sheet re-checked;
+#     if any lead changed meanwhile nothing is deleted.
+#   - reads are lazy: the archive tabs are only downloaded when someone opens
+#     the Closed tab's archive view or searches, then kept for REFRESH_SECS
+#     (our own moves and restores invalidate it). The frame is classified like
+#     the store's, so it renders with the same cards and search index.
+#   - restore puts a lead back on the Leads tab (Last Call set to now, so it
+#     isn't archived again straight away) and removes its archive row.
+import os
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from analytics import days_of
+from compact import side_col
+from lead_store import col_letter, merge_runs, phone_key
+from pipeline import BUCKETS
+
+ARCHIVE_PREFIX = "Archive "
+COLD_DAYS = int(os.environ.get("CRM_COLD_DAYS", 30))
+ARCHIVE_BATCH = 500          # leads moved per run
+ARCHIVE_EVERY_SECS = 6 * 3600
+FIRST_RUN_SECS = 120         # after process start
+REFRESH_SECS = 3600
+
+
+def cold_positions(store, today, days=COLD_DAYS):
+    # Store positions of leads outside the Live bucket whose Last Call (else Date) is older than `days`
+    df = store.df
+    t_col = store.find_col("Last Call")
+    blank = pd.Series('', index=df.index)
+    last = days_of(df[t_col]) if t_col else blank
+    created = days_of(df['Date']) if 'Date' in df.columns else blank
+    seen = last.where(last != '', created).to_numpy(dtype=object)
+    cutoff = str(today - timedelta(days=days))
+    dead = df['Bucket'].cat.codes.to_numpy() != BUCKETS.index("Live")
+    return np.flatnonzero(dead & (seen != '') & (seen < cutoff))
+
+
+class Archive:
+    def __init__(self, sh, prepare=None, refresh_secs=REFRESH_SECS):
+        # prepare(df) -> df: same derived columns as the lead store (pipeline.classify)
+        self.sh = sh
+        self.prepare = prepare
+        self.refresh_secs = refresh_secs
+        self.df = None
+        self.notes = None
+        self.notes_col = None
+        self.header = None
+        self.where = []          # position -> (archive tab title, sheet row)
+        self.row_of_phone = {}   # 10-digit phone -> position
+        self.version = 0
+        self.loaded_at = 0.0
+        self.stats = {'loads': 0, 'runs': 0, 'skipped': 0, 'archived': 0, 'restored': 0}
+        self.last_run = None
+        self.last_error = None
+        self._lock = threading.RLock()
+        self._worker = None
+
+    # --- READ (same surface the search index uses on the lead store) ---
+    def get(self):
+        with self._lock:
+            if self.df is None or time.time() - self.loaded_at >= self.refresh_secs: self._load()
+            return self.df
+
+    def invalidate(self): self.loaded_at = 0.0
+
+    def changes_since(self, version): return set() if version == self.version else None
+
+    def find_col(self, *needles):
+        cols = [] if self.df is None else self.df.columns
+        return next((c for n in needles for c in cols if n.lower() in c.lower()), None)
+
+    def tabs(self):
+        return sorted((ws for ws in self.sh.worksheets() if ws.title.startswith(ARCHIVE_PREFIX)),
+                      key=lambda ws: ws.title, reverse=True)  # newest month first
+
+    def _load(self):
+        frames, where, header = [], [], None
+        for ws in self.tabs():
+            vals = ws.get_all_values()
+            if not vals: continue
+            h = [str(x).strip() for x in vals[0]]
+            header = header or h
+            frames.append(pd.DataFrame([(list(r) + [''] * len(h))[:len(h)] for r in vals[1:]], columns=h))
+            where += [(ws.title, r) for r in range(2, len(vals) + 1)]
+        # Tabs written under an older Leads header line up by column name
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=header or [])
+        self.header = [str(c) for c in df.columns]
+        self.notes_col = side_col(self.header)
+        if self.notes_col in df.columns:
+            self.notes = df[self.notes_col].fillna('').to_numpy(dtype=object)
+            df = df.drop(columns=[self.notes_col])
+        else: self.notes = np.full(len(df), '', dtype=object)
+        df = df.fillna('')
+        if self.prepare: df = self.prepare(df)
+        keys = df['Phone'].astype(str).str.replace(r'\D', '', regex=True).str[-10:] if 'Phone' in df.columns else []
+        self.row_of_phone = {}
+        for pos, k in enumerate(keys):
+            if k: self.row_of_phone.setdefault(k, pos)
+        self.df, self.where = df, where
+        self.version += 1
+        self.loaded_at = time.time()
+        self.stats['loads'] += 1
+
+    def positions(self, owners=None):
+        # All archive positions, or those assigned to any of owners
+        df = self.get()
+        col = self.find_col("Assign")
+        if owners is None or col is None: return np.arange(len(df))
+        return np.flatnonzero(df[col].astype(str).str.strip().isin({str(o).strip() for o in owners}).to_numpy())
+
+    def record(self, phone):
+        with self._lock:
+            self.get()
+            pos = self.row_of_phone.get(phone_key(phone))
+            if pos is None: return None
+            rec = self.df.iloc[pos].to_dict()
+            if self.notes_col: rec[self.notes_col] = self.notes[pos]
+            return rec
+
+    # --- MOVE OUT (Leads -> archive) ---
+    def _tab(self, existing, title, header):
+        # (archive tab, its header or None when just created); widened when the Leads tab gained columns
+        ws = existing.get(title)
+        if ws is None: return self.sh.add_worksheet(title=title, rows=1000, cols=len(header)), None
+        tab_h = [str(x).strip() for x in ws.row_values(1)]
+        missing = [h for h in header if h not in tab_h]
+        if missing:
+            tab_h += missing
+            ws.batch_update([{'range': 'A1', 'values': [tab_h]}])
+        return ws, tab_h
+
+    @staticmethod
+    def _locate(store, rows, header):
+        # Current store positions of the leads in `rows` (by Lead ID, else phone), None when one of them was
+        # edited meanwhile; a lead deleted meanwhile has nothing left to delete
+        if store.df is None or list(store.header) != header: return None
+        p_i, i_i = (header.index(c) if c in header else None for c in ('Phone', store.id_col))
+        at = lambda row, i: row[i] if i is not None else None
+        pos = [r - 2 for r in (store.row_for(at(row, p_i), at(row, i_i)) for row in rows) if r]
+        if len(set(pos)) != len(pos) or not set(map(tuple, store.sheet_rows(pos))) <= set(map(tuple, rows)): return None
+        return pos
+
+    @staticmethod
+    def _on_sheet(store, pos, rows, header):
+        # True when the sheet's Phone column still holds rows' phones at pos
+        if 'Phone' not in header: return True
+        p_i = header.index('Phone')
+        col = col_letter(p_i + 1)
+        live = [str(r[0]) if r else '' for r in store.ws.batch_get([f"{col}2:{col}"])[0]]
+        return all(p < len(live) and live[p] == row[p_i] for p, row in zip(pos, rows))
+
+    def run(self, store, today, hold=None, days=COLD_DAYS, limit=ARCHIVE_BATCH):
+        # Moves up to `limit` cold leads off the Leads tab; returns how many moved
+        with self._lock:
+            self.stats['runs'] += 1
+            self.last_run = time.time()
+            if store.df is None or (hold and hold()):  # let queued lead writes land first
+                self.stats['skipped'] += 1
+                return 0
+            pos = cold_positions(store, today, days)[:limit]
+            if not len(pos): return 0
+            header = list(store.header)
+            rows = store.sheet_rows(pos)
+            if not self._on_sheet(store, pos, rows, header):
+                store.invalidate(full=True)  # the sheet moved under us; try again after a resync
+                self.stats['skipped'] += 1
+                return 0
+            t_i = next((i for i, h in enumerate(header) if "last call" in h.lower()), None)
+            d_i = header.index('Date') if 'Date' in header else None
+            months = {}
+            for row in rows:
+                day = next((row[i][:7] for i in (t_i, d_i) if i is not None and row[i][:4].isdigit()), str(today)[:7])
+                months.setdefault(day, []).append(row)
+            existing = {ws.title: ws for ws in self.sh.worksheets()}
+            for month, part in sorted(months.items()):
+                ws, tab_h = self._tab(existing, ARCHIVE_PREFIX + month, header)
+                if tab_h is None: part = [header] + part  # new tab: header goes in with the rows
+                elif tab_h != header: part = [[dict(zip(header, row)).get(h, '') for h in tab_h] for row in part]
+                ws.append_rows(part)
+            with store.row_lock:  # queued edits resolve their rows before the delete or after drop_rows, never between
+                # Rows may have shifted while the archive tabs were written (a bulk delete, a resync): find the
+                # leads again and re-check the sheet, else leave them on Leads (copied, never lost)
+                pos = self._locate(store, rows, header)
+                if pos is None or not self._on_sheet(store, pos, store.sheet_rows(pos), header):
+                    store.invalidate(full=True)
+                    self.stats['skipped'] += 1
+                    return 0
+                reqs = [{'deleteDimension': {'range': {'sheetId': store.ws.id, 'dimension': 'ROWS', 'startIndex': a + 1, 'endIndex': b + 2}}}
+                        for a, b in merge_runs(sorted(pos))[::-1]]
+                if reqs: store.ws.spreadsheet.batch_update({'requests': reqs})
+                store.drop_rows(pos)
+            self.invalidate()
+            self.stats['archived'] += len(pos)
+            return len(pos)
+
+    def start(self, store, today, hold=None, every=ARCHIVE_EVERY_SECS):
+        # Background archiving: first run FIRST_RUN_SECS after start, then every `every` seconds
+        def loop():
+            delay = FIRST_RUN_SECS
+            while True:
+                time.sleep(delay)
+                delay = every
+                try:
+                    self.run(store, today(), hold)
+                    self.last_error = None
+                except Exception as e: self.last_error = str(e)
+        if self._worker is None:
+            self._worker = threading.Thread(target=loop, name="crm-archive", daemon=True)
+            self._worker.start()
+
+    # --- RESTORE (archive -> Leads) ---
+    def restore(self, phone, header, append, now):
+        # append(row) puts the row (in `header` order, the Leads tab's) back on the Leads tab;
+        # now: Last Call value for the restored lead
+        with self._lock:
+            self.get()
+            pos = self.row_of_phone.get(phone_key(phone))
+            if pos is None: return False
+            tab, r = self.where[pos]
+            ws = self.sh.worksheet(tab)
+            got = dict(zip([str(x).strip() for x in ws.row_values(1)], [str(x) for x in ws.row_values(r)]))
+            if phone_key(got.get('Phone', '')) != phone_key(phone):
+                self.invalidate()  # tab changed since we loaded it
+                return False
+            row = [now if "last call" in h.lower() else got.get(h, '') for h in header]
+            append(row)
+            ws.delete_rows(r)
+            self.invalidate()
+            self.stats['restored'] += 1
+            return True
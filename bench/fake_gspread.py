@@ -0,0 +1,170 @@
+# --- FAKE GSPREAD ---
+# In-memory stand-in for gspread.Spreadsheet / gspread.Worksheet covering the
+# storage API slice documented in storage.py, with the same call signatures and
+# return shapes (strings in, trailing empties trimmed by batch_get/row_values).
+# Every call is counted per method and can be slowed down (latency_ms, plus
+# row_latency_us per row a read returns, like a real download) or fail
+# with a 429 (quota_rate, or the next `fail_next` calls), so benchmarks can
+# count API calls and exercise retry paths without touching Google.
+import random
+import time
+from collections import Counter
+
+import gspread
+from gspread.cell import Cell
+from gspread.utils import a1_range_to_grid_range
+
+
+class QuotaError(Exception):
+    # Quacks like gspread.exceptions.APIError for a 429, which is all common.is_quota_error looks at
+    def __init__(self, method):
+        super().__init__(f"APIError: [429]: Quota exceeded for quota metric 'Read requests' ({method})")
+        self.response = type("Response", (), {"status_code": 429})()
+
+
+class FakeSpreadsheet:
+    def __init__(self, latency_ms=0.0, quota_rate=0.0, seed=0, row_latency_us=0.0):
+        self.latency_ms, self.quota_rate = latency_ms, quota_rate
+        self.row_latency_us = row_latency_us
+        self.fail_next = 0
+        self.calls = Counter()
+        self._rng = random.Random(seed)
+        self._sheets = []
+        self._next_id = 0
+
+    def _api(self, method):
+        self.calls[method] += 1
+        if self.latency_ms: time.sleep(self.latency_ms / 1000)
+        if self.fail_next > 0:
+            self.fail_next -= 1; raise QuotaError(method)
+        if self.quota_rate and self._rng.random() < self.quota_rate: raise QuotaError(method)
+
+    def _transfer(self, rows):
+        if self.row_latency_us: time.sleep(rows * self.row_latency_us / 1e6)
+
+    @property
+    def api_calls(self): return sum(self.calls.values())
+
+    def reset_calls(self): self.calls.clear()
+
+    # --- SPREADSHEET API ---
+    def worksheets(self):
+        self._api("worksheets")
+        return list(self._sheets)
+
+    def worksheet(self, title):
+        self._api("worksheet")
+        ws = next((w for w in self._sheets if w.title == title), None)
+        if ws is None: raise gspread.WorksheetNotFound(title)
+        return ws
+
+    def get_worksheet(self, index):
+        self._api("get_worksheet")
+        return self._sheets[index] if index < len(self._sheets) else None
+
+    def add_worksheet(self, title, rows=1000, cols=26, **kwargs):
+        self._api("add_worksheet")
+        ws = FakeWorksheet(self, self._next_id, title)
+        self._next_id += 1
+        self._sheets.append(ws)
+        return ws
+
+    def batch_update(self, body):
+        self._api("spreadsheet.batch_update")
+        for req in body.get('requests', []):
+            rng = req['deleteDimension']['range']
+            ws = next(w for w in self._sheets if w.id == rng['sheetId'])
+            del ws.rows[rng['startIndex']:rng['endIndex']]
+        return {}
+
+
+def _trim(row):
+    row = list(row)
+    while row and row[-1] == '': row.pop()
+    return row
+
+
+class FakeWorksheet:
+    def __init__(self, sh, sheet_id, title):
+        self.spreadsheet, self.id, self.title = sh, sheet_id, title
+        self.rows = []  # list of lists of str, row 1 = header
+        self.row_count = 0  # grid size as of when the handle was read; like gspread's, appends don't update it
+
+    def load(self, rows):
+        # Seed data without counting API calls
+        self.rows = [[str(v) for v in r] for r in rows]
+        self.row_count = len(self.rows)
+        return self
+
+    # --- READS ---
+    def get_all_values(self, **kwargs):
+        self.spreadsheet._api("get_all_values")
+        self.spreadsheet._transfer(len(self.rows))
+        w = max((len(r) for r in self.rows), default=0)
+        return [list(r) + [''] * (w - len(r)) for r in self.rows]
+
+    def get_all_records(self, **kwargs):
+        self.spreadsheet._api("get_all_records")
+        if not self.rows: return []
+        self.spreadsheet._transfer(len(self.rows))
+        head = self.rows[0]
+        return [dict(zip(head, list(r) + [''] * (len(head) - len(r)))) for r in self.rows[1:]]
+
+    def row_values(self, r, **kwargs):
+        self.spreadsheet._api("row_values")
+        return _trim(self.rows[r - 1]) if r <= len(self.rows) else []
+
+    def col_values(self, c, **kwargs):
+        self.spreadsheet._api("col_values")
+        vals = [r[c - 1] if c <= len(r) else '' for r in self.rows]
+        while vals and vals[-1] == '': vals.pop()
+        return vals
+
+    def batch_get(self, ranges, **kwargs):
+        self.spreadsheet._api("batch_get")
+        out = []
+        for rng in ranges:
+            g = a1_range_to_grid_range(rng)
+            r0, r1 = g.get('startRowIndex', 0), g.get('endRowIndex', len(self.rows))
+            c0, c1 = g.get('startColumnIndex', 0), g.get('endColumnIndex')
+            rows = [_trim(r[c0:c1]) for r in self.rows[r0:r1]]
+            while rows and not rows[-1]: rows.pop()
+            out.append(rows)
+        self.spreadsheet._transfer(sum(len(vr) for vr in out))
+        return out
+
+    def find(self, query, **kwargs):
+        self.spreadsheet._api("find")
+        q = str(query)
+        for r, row in enumerate(self.rows, 1):
+            for c, v in enumerate(row, 1):
+                if v == q: return Cell(r, c, q)
+        return None
+
+    # --- WRITES ---
+    def batch_update(self, data, **kwargs):
+        self.spreadsheet._api("batch_update")
+        for item in data:
+            g = a1_range_to_grid_range(item['range'])
+            r0, c0 = g.get('startRowIndex', 0), g.get('startColumnIndex', 0)
+            for dr, vals in enumerate(item['values']):
+                while len(self.rows) <= r0 + dr: self.rows.append([])
+                row = self.rows[r0 + dr]
+                if len(row) < c0 + len(vals): row.extend([''] * (c0 + len(vals) - len(row)))
+                row[c0:c0 + len(vals)] = [str(v) for v in vals]
+        return {}
+
+    def append_rows(self, values, **kwargs):
+        self.spreadsheet._api("append_rows")
+        self.rows.extend([str(v) for v in r] for r in values)
+        return {}
+
+    def append_row(self, values, **kwargs):
+        self.spreadsheet._api("append_row")
+        self.rows.append([str(v) for v in values])
+        return {}
+
+    def delete_rows(self, start_index, end_index=None):
+        self.spreadsheet._api("delete_rows")
+        del self.rows[start_index - 1:end_index or start_index]
+        return {}
@@ -0,0 +1,369 @@
+# --- BENCHMARK RUNNER ---
+# Offline benchmarks for the CRM's data paths on a FakeSpreadsheet seeded with
+# synthetic leads. Each scenario gets a fresh sheet/store (setup, not measured),
+# then its body is measured for wall time and API calls; a second pass under
+# tracemalloc measures peak Python memory (skip with --no-mem).
+#
+#   python -m bench.run                        # 1k / 10k / 100k, every scenario
+#   python -m bench.run --sizes 10000 --only search_query,cards_cold
+#   python -m bench.run --latency-ms 80 --json bench.json
+#   python -m bench.run --sizes 100000 --only feed_cold,feed_cold_serial --row-latency-us 50
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+
+import cards
+from analytics import Rollups
+from archive import Archive
+from bench.fake_gspread import FakeSpreadsheet
+from bench.synth import lead_rows, leads_sheet, vendor_csv
+from bulk_ops import bulk_delete, bulk_set
+from cards import PAGE_SIZE, generate_cards_html
+from common import get_ist_date, get_ist_time
+from csv_import import ImportJob
+from lead_detail import PREFETCH, LeadDetails
+from lead_store import LeadStore
+from notes_log import NotesLog, log_worksheet, summary
+from pipeline import classify
+from partitions import AssignIndex
+from scheduler import FollowUpSchedule, tab_positions
+from search_index import SearchIndex
+from snapshot import SharedSnapshot
+from write_queue import WriteQueue
+
+SIZES = (1000, 10000, 100000)
+DELTA_FRACTION = 0.01  # rows edited upstream before a delta refresh
+SAVES = 50             # modal saves per run
+BULK = 200             # leads selected for bulk actions
+QUERIES = ["ramesh", "kumar", "sharma pooja", "98", "9876", "VIP", "Meta", "L-000123", "anita verma", "00"]
+
+
+class Ctx:
+    def __init__(self, n, latency_ms, quota_rate, row_latency_us=0.0):
+        self.n = n
+        self.sh = FakeSpreadsheet(latency_ms=latency_ms, quota_rate=quota_rate, row_latency_us=row_latency_us)
+        self.ws = leads_sheet(self.sh, n)
+        self.store = LeadStore(self.ws, prepare=classify)
+        self.scheds = {}  # store id -> its FollowUpSchedule (show_crm's get_schedule)
+
+    def tabs(self, store=None, owners=None, view=None):
+        # show_crm's tab split: schedule catch-up, then follow-up queue slices + Bucket positions
+        store = store or self.store
+        sched = self.scheds.setdefault(id(store), FollowUpSchedule())
+        sched.sync(store)
+        return tab_positions(sched, store.df, get_ist_date(), owners, view)
+
+    def loaded(self):
+        self.store.get()
+        self.sh.reset_calls()
+        return self
+
+    def phones(self, k, seed=3):
+        col = self.store.df['Phone'].astype(str).tolist()
+        return random.Random(seed).sample(col, min(k, len(col)))
+
+
+# --- SCENARIOS ---
+# name -> (setup(ctx) -> state, body(ctx, state)); setup runs on a fresh Ctx
+def _feed_cold_setup(c): return None
+
+
+def _feed_cold(c, _):
+    c.store.get()
+    c.tabs()
+
+
+def _feed_cold_serial_setup(c):
+    # One get_all_values instead of the parallel ranged blocks
+    c.store = LeadStore(c.ws, prepare=classify, fetch_workers=1)
+
+
+def _feed_delta_setup(c):
+    c.loaded()
+    c.tabs()  # the schedule follows the store from here, like in a running app
+    rng, rows = random.Random(4), c.ws.rows
+    now = get_ist_time()
+    for r in rng.sample(range(1, len(rows)), max(1, int(c.n * DELTA_FRACTION))):
+        rows[r][7], rows[r][9] = "Call Back (Busy tha)", now
+    rows.extend(lead_rows(10, seed=5))
+    c.store.invalidate()
+
+
+def _feed_delta(c, _):
+    c.store.get()
+    c.tabs()
+
+
+def _writer(c):
+    # c.store becomes the elected writer, publishing to a fresh snapshot file; returns a second worker's store
+    path = os.path.join(tempfile.mkdtemp(prefix="crm-bench-"), "leads_snapshot.pkl")
+    c.store = LeadStore(c.ws, prepare=classify, snapshot=SharedSnapshot(path))
+    c.loaded()
+    return LeadStore(c.ws, prepare=classify, snapshot=SharedSnapshot(path))
+
+
+def _feed_warm(c, worker):
+    # Another server process (or a restart) starting from the writer's snapshot instead of the sheet
+    worker.get()
+    c.tabs(worker)
+
+
+def _feed_follow_setup(c):
+    worker = _writer(c)
+    worker.get(); c.tabs(worker)
+    _feed_delta_setup(c)
+    c.store.get()  # the writer picks up the upstream edits and publishes
+    worker.invalidate()
+    return worker
+
+
+def _feed_follow(c, worker):
+    worker.get()
+    c.tabs(worker)
+
+
+def _feed_telecaller_setup(c):
+    c.loaded()
+    parts = AssignIndex()
+    parts.sync(c.store); c.tabs()
+    c.store.patch_row(2, {"Assign": "tc2"})  # one reassignment to catch up on
+    return parts
+
+
+def _feed_telecaller(c, state):
+    # show_crm for one telecaller: partition + schedule catch-up, then tabs over their rows only
+    owners = ("tc1", "TC1")
+    state.sync(c.store)
+    c.tabs(owners=owners, view=state.positions(*owners))
+
+
+def _followup_setup(c):
+    c.loaded()
+    sched = FollowUpSchedule(); sched.sync(c.store); sched.queues(get_ist_date())
+    return sched, c.phones(SAVES)
+
+
+def _followup(c, state):
+    # "Kal (Tom)" saves from the modal, each followed by the manager's Action/Future tabs
+    sched, phones = state
+    kal = str(get_ist_date() + timedelta(days=1))
+    for p in phones:
+        c.store.patch_row(c.store.row_for(p), {"Follow-up Date": kal, "Last Call": get_ist_time()})
+        sched.sync(c.store); sched.queues(get_ist_date())
+
+
+def _search_build_setup(c):
+    c.loaded()
+    return SearchIndex()
+
+
+def _search_build(c, idx): idx.sync(c.store)
+
+
+def _search_query_setup(c):
+    idx = _search_build_setup(c)
+    idx.sync(c.store)
+    return idx
+
+
+def _search_query(c, idx):
+    for q in QUERIES: c.store.df.loc[idx.query(q)]
+
+
+def _cards_setup(c, warm):
+    c.loaded()
+    cards._cache.clear()
+    tabs = c.tabs()
+    if warm: _cards(c, tabs)
+    return tabs
+
+
+def _cards(c, tabs):
+    # Same as show_crm: only the visible window of each tab is materialised
+    for ctx, pos in tabs.items():
+        generate_cards_html(c.store.df.iloc[pos[:PAGE_SIZE]], ctx)
+
+
+def _modal_save_setup(c):
+    c.loaded()
+    log = NotesLog(lambda: log_worksheet(c.sh))
+    log.ws; c.sh.reset_calls()
+    return WriteQueue(c.store, journal_path=None, start=False, log=log), c.phones(SAVES)
+
+
+def _modal_save(c, state):
+    # open_lead_modal: page of history, then save (log entry + Notes summary)
+    q, phones = state
+    store, log = c.store, q.log
+    for p in phones:
+        rec = store.record(p)
+        lead_id = rec.get(store.id_col)
+        log.recent(lead_id)
+        r = store.row_for(p, lead_id)
+        q.log_entry(log.entry(lead_id, "tc1", rec.get("Status", ""), "Interested (Details Bheji)", "Baat hui"))
+        patched = {"Status": "Interested (Details Bheji)", "Last Call": get_ist_time(), "Notes": summary("Baat hui")}
+        q.update(lead_id, p, patched)
+        store.patch_row(r, patched)
+    q.flush()
+
+
+def _modal_open_setup(c):
+    c.loaded()
+    details = LeadDetails(lambda name: {"Intro / Greeting": f"Namaste {name} ji"})
+    action = c.tabs()["Action"]
+    details.prefetch(c.store, action[:PREFETCH])
+    phones = c.store.df['Phone'].astype(str).to_numpy()
+    return details, [phones[p] for p in action[:PREFETCH]] + c.phones(SAVES)
+
+
+def _modal_open(c, state):
+    # Card clicks: prefetched Action leads plus random ones from anywhere in the store
+    details, phones = state
+    for p in phones: details.view(c.store, p)
+
+
+def _stats_setup(c):
+    c.loaded()
+    roll = Rollups(); roll.sync(c.store)
+    bulk_set(c.store, c.phones(BULK), "Site Visit Scheduled (Date Fix)", "Status")  # changes to roll up
+    return roll
+
+
+def _stats(c, roll):
+    # Stats page: catch up on the bulk edit, then a 30-day and an all-time view
+    roll.sync(c.store)
+    today = get_ist_date()
+    for start in (today - timedelta(days=30), None):
+        roll.summary(start, today if start else None); roll.daily_calls(start, today if start else None)
+
+
+def _archive_setup(c):
+    c.loaded()
+    return Archive(c.sh, prepare=classify)
+
+
+def _archive(c, archive):
+    # One archiving pass (every cold lead), then the next full refresh of the slimmer Leads tab
+    archive.run(c.store, get_ist_date(), limit=c.n)
+    c.store.invalidate(full=True); c.store.get()
+
+
+def _bulk_setup(c):
+    c.loaded()
+    return c.phones(BULK)
+
+
+def _bulk_assign(c, phones): bulk_set(c.store, phones, "tc2", "Assign")
+
+
+def _bulk_tag(c, phones): bulk_set(c.store, phones, "Hot", "Tag", "Label")
+
+
+def _bulk_delete(c, phones): bulk_delete(c.store, phones)
+
+
+def _csv_setup(c):
+    c.loaded()
+    f = vendor_csv(c.n, dupes_from=c.phones(max(1, c.n // 20)))
+    job = ImportJob(["tc1", "tc2", "tc3"])
+    job.prepare(f)
+    return job, f
+
+
+def _csv_upload(c, state):
+    job, f = state
+    ts = get_ist_time()
+    def make_row(n, p, a): return [f"L-{p[-8:]}", ts, n, p, "Upload", "", a, "Naya Lead", "", ts, "", "", "", "", ""]
+    job.run(f, c.ws, make_row, on_commit=c.store.append)
+    if job.error: raise RuntimeError(job.error)
+
+
+SCENARIOS = {
+    'feed_cold': (_feed_cold_setup, _feed_cold),
+    'feed_cold_serial': (_feed_cold_serial_setup, _feed_cold),
+    'feed_delta': (_feed_delta_setup, _feed_delta),
+    'feed_warm': (_writer, _feed_warm),
+    'feed_follow': (_feed_follow_setup, _feed_follow),
+    'feed_telecaller': (_feed_telecaller_setup, _feed_telecaller),
+    'followup_save': (_followup_setup, _followup),
+    'search_build': (_search_build_setup, _search_build),
+    'search_query': (_search_query_setup, _search_query),
+    'cards_cold': (lambda c: _cards_setup(c, warm=False), _cards),
+    'cards_warm': (lambda c: _cards_setup(c, warm=True), _cards),
+    'modal_open': (_modal_open_setup, _modal_open),
+    'modal_save': (_modal_save_setup, _modal_save),
+    'stats_page': (_stats_setup, _stats),
+    'archive_run': (_archive_setup, _archive),
+    'bulk_assign': (_bulk_setup, _bulk_assign),
+    'bulk_tag': (_bulk_setup, _bulk_tag),
+    'bulk_delete': (_bulk_setup, _bulk_delete),
+    'csv_upload': (_csv_setup, _csv_upload),
+}
+
+
+# --- RUNNER ---
+def _pass(name, n, latency_ms, quota_rate, mem, row_latency_us=0.0):
+    setup, body = SCENARIOS[name]
+    c = Ctx(n, latency_ms, quota_rate, row_latency_us)
+    state = setup(c)
+    c.sh.reset_calls()
+    gc.collect()
+    if mem: tracemalloc.start()
+    t0 = time.perf_counter()
+    try: body(c, state)
+    finally:
+        secs = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1] if mem else None
+        if mem: tracemalloc.stop()
+    return secs, dict(c.sh.calls), peak
+
+
+def run(sizes=SIZES, only=None, latency_ms=0.0, quota_rate=0.0, mem=True, row_latency_us=0.0):
+    for n in sizes:
+        for name in only or SCENARIOS:
+            res = {'scenario': name, 'leads': n, 'wall_ms': None, 'api_calls': None, 'calls': {}, 'peak_mb': None, 'error': None}
+            try:
+                secs, calls, _ = _pass(name, n, latency_ms, quota_rate, False, row_latency_us)
+                res.update(wall_ms=round(secs * 1000, 1), api_calls=sum(calls.values()), calls=calls)
+                if mem: res['peak_mb'] = round(_pass(name, n, latency_ms, quota_rate, True, row_latency_us)[2] / 2**20, 2)
+            except Exception as e: res['error'] = f"{type(e).__name__}: {e}"
+            yield res
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Offline CRM benchmarks on a fake spreadsheet")
+    ap.add_argument("--sizes", default=",".join(map(str, SIZES)), help="comma-separated lead counts")
+    ap.add_argument("--only", default="", help="comma-separated scenarios: " + ", ".join(SCENARIOS))
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="added latency per API call")
+    ap.add_argument("--row-latency-us", type=float, default=0.0, help="added latency per row a read returns")
+    ap.add_argument("--quota-rate", type=float, default=0.0, help="probability of a 429 per API call")
+    ap.add_argument("--no-mem", action="store_true", help="skip the tracemalloc pass")
+    ap.add_argument("--json", help="also write results to this file")
+    a = ap.parse_args(argv)
+    only = [s for s in a.only.split(",") if s] or None
+    unknown = set(only or ()) - set(SCENARIOS)
+    if unknown: ap.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    print(f"{'scenario':<16}{'leads':>8}{'wall ms':>11}{'api':>6}{'peak MB':>10}  calls")
+    out = []
+    for r in run([int(s) for s in a.sizes.split(",")], only, a.latency_ms, a.quota_rate, not a.no_mem, a.row_latency_us):
+        out.append(r)
+        if r['error']: print(f"{r['scenario']:<16}{r['leads']:>8}  ERROR {r['error']}")
+        else:
+            calls = " ".join(f"{k}={v}" for k, v in sorted(r['calls'].items()))
+            peak = f"{r['peak_mb']:.2f}" if r['peak_mb'] is not None else "-"
+            print(f"{r['scenario']:<16}{r['leads']:>8}{r['wall_ms']:>11.1f}{r['api_calls']:>6}{peak:>10}  {calls}")
+        sys.stdout.flush()
+    if a.json:
+        with open(a.json, "w") as f: json.dump(out, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
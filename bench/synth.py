@@ -0,0 +1,67 @@
+# --- SYNTHETIC LEADS ---
+# Deterministic (seeded) lead rows in the LEADS_HEADER layout that the menu add
+# and CSV upload write: L-xxxxxxnn ids, 10-digit mobiles, status drawn from
+# PIPELINE_OPTS with a realistic skew, and follow-up dates bunched around today
+# (overdue / today / the next few days) with a long tail and many blanks.
+import io
+import random
+from datetime import datetime, timedelta
+
+from common import LEADS_HEADER, PIPELINE_OPTS, get_ist_date
+
+FIRST = ["Ramesh", "Suresh", "Anita", "Pooja", "Amit", "Rahul", "Neha", "Vikas", "Sunita", "Arjun",
+         "Priya", "Deepak", "Kavita", "Manoj", "Sanjay", "Rekha", "Alok", "Shweta", "Imran", "Farah"]
+LAST = ["Kumar", "Sharma", "Verma", "Singh", "Gupta", "Yadav", "Mishra", "Srivastava", "Khan", "Tiwari"]
+SOURCES = ["Meta Ads", "Canopy", "Agent", "Referral", "Cold Call", "Upload"]
+PROJECTS = ["", "Unnao Ajgain Plots", "Deewan Estate", "Rustle Court", "Vedic Village", "Ramayana Enclave"]
+TAGS = ["", "", "", "", "VIP", "Hot", "NRI", "Callback"]
+AGENTS = ["admin", "tc1", "tc2", "tc3", "tc4", "sales1"]
+# Most leads sit at the top of the funnel
+STATUS_WEIGHTS = [30, 14, 6, 8, 9, 9, 6, 3, 2, 2, 1, 1, 5, 4]
+# Follow-up offset in days from today (None = no follow-up set)
+FOLLOW_OFFSETS = [None, -30, -7, -3, -1, 0, 1, 2, 3, 7, 14, 45]
+FOLLOW_WEIGHTS = [35, 3, 5, 6, 8, 14, 10, 6, 5, 4, 2, 2]
+
+
+def lead_rows(n, seed=1, agents=AGENTS):
+    rng = random.Random(seed)
+    today, now = get_ist_date(), datetime.now()
+    rows, used = [], set()
+    for i in range(n):
+        phone = str(rng.randint(6000000000, 9999999999))
+        while phone in used: phone = str(rng.randint(6000000000, 9999999999))
+        used.add(phone)
+        created = now - timedelta(days=rng.randint(0, 180), minutes=rng.randint(0, 1439))
+        last = created + timedelta(days=rng.randint(0, 30), minutes=rng.randint(0, 600))
+        off = rng.choices(FOLLOW_OFFSETS, FOLLOW_WEIGHTS)[0]
+        rows.append([
+            f"L-{i:06d}{rng.randint(10, 99)}", created.strftime("%Y-%m-%d %H:%M"),
+            f"{rng.choice(FIRST)} {rng.choice(LAST)}", phone, rng.choice(SOURCES), rng.choice(PROJECTS),
+            rng.choice(agents), rng.choices(PIPELINE_OPTS, STATUS_WEIGHTS)[0], "",
+            last.strftime("%Y-%m-%d %H:%M"), "", f"[{created.strftime('%d-%b')}] Pehli baat hui" if rng.random() < 0.4 else "",
+            "", rng.choice(TAGS), str(today + timedelta(days=off)) if off is not None else "",
+        ])
+    return rows
+
+
+def leads_sheet(sh, n, seed=1):
+    # Leads worksheet on a FakeSpreadsheet with header + n synthetic rows
+    ws = sh.add_worksheet("Leads")
+    ws.load([LEADS_HEADER] + lead_rows(n, seed))
+    sh.reset_calls()
+    return ws
+
+
+def vendor_csv(n, seed=2, dupes_from=(), dupe_rate=0.05, junk_rate=0.02):
+    # Meta Ads style export as a bytes buffer; some phones repeat existing leads, some are junk
+    rng = random.Random(seed)
+    dupes_from = list(dupes_from)
+    out = io.StringIO()
+    out.write("full_name,phone_number,email,campaign\n")
+    for i in range(n):
+        r = rng.random()
+        if dupes_from and r < dupe_rate: phone = "+91 " + rng.choice(dupes_from)
+        elif r < dupe_rate + junk_rate: phone = str(rng.randint(1000, 99999))
+        else: phone = "+91" + str(rng.randint(6000000000, 9999999999))
+        out.write(f"{rng.choice(FIRST)} {rng.choice(LAST)},{phone},lead{i}@example.com,Campaign {i % 7}\n")
+    return io.BytesIO(out.getvalue().encode("utf-8"))
@@ -0,0 +1,52 @@
+# --- STARTUP BOOTSTRAP ---
+# Streamlit reruns the whole script on every widget interaction. Everything the
+# module-level login block needs (spreadsheet, Users/Leads worksheet handles,
+# users table) is resolved once here and shared across reruns and sessions, so
+# a click on an already-logged-in page costs no Sheets API calls before render.
+#   - worksheet handles: looked up once, when the bootstrap is built
+#   - users table: re-read at most every USERS_TTL_SECS, or right after
+#     invalidate_users() (user created/deleted, Users tab pulled by the sync)
+# Each startup phase is timed into `timings` (seconds) for the admin page.
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from storage import leads_worksheet
+
+USERS_TTL_SECS = 300
+
+
+class Bootstrap:
+    def __init__(self, connect, init_users, users_ttl=USERS_TTL_SECS):
+        # connect() -> spreadsheet, init_users(sh) -> Users worksheet (created if missing)
+        self.timings = {}
+        self.users_ttl = users_ttl
+        self._users = None
+        self._users_at = 0.0
+        self.users_version = 0  # bumped on every reload, for anything derived from the users table
+        self._lock = threading.Lock()
+        with self.phase("connect"): self.sh = connect()
+        with self.phase("users_ws"): self.users_ws = init_users(self.sh)
+        with self.phase("leads_ws"): self.leads_ws = leads_worksheet(self.sh)
+
+    @contextmanager
+    def phase(self, name):
+        t0 = time.perf_counter()
+        try: yield
+        finally: self.timings[name] = round(time.perf_counter() - t0, 3)
+
+    # --- USERS TABLE ---
+    def users(self):
+        # Shared across sessions: callers must not mutate the returned frame
+        if self._users is not None and time.time() - self._users_at < self.users_ttl: return self._users
+        with self._lock:
+            if self._users is None or time.time() - self._users_at >= self.users_ttl:
+                with self.phase("users"): self._users = pd.DataFrame(self.users_ws.get_all_records())
+                self._users_at = time.time()
+                self.users_version += 1
+        return self._users
+
+    def invalidate_users(self):
+        self._users_at = 0.0
@@ -0,0 +1,91 @@
+# --- BULK OPERATIONS (Assign / Tag / Delete) ---
+# Works off the shared lead store instead of re-downloading the sheet: selected
+# phones are matched against the cached frame in one vectorised pass, contiguous
+# sheet rows are merged into ranges, and each action goes out as a handful of
+# batched API calls. Failures are reported per lead.
+from gspread.utils import rowcol_to_a1
+
+from lead_store import merge_runs, phone_key
+
+CHUNK_RUNS = 200  # ranges per API call; a failed call only fails the leads in its chunk
+
+
+class BulkResult:
+    def __init__(self):
+        self.done = []
+        self.failed = {}  # phone -> reason
+        self.api_calls = 0
+
+    def fail(self, phones, reason):
+        for p in phones: self.failed.setdefault(p, reason)
+
+    def summary(self):
+        return f"{len(self.done)} done" + (f", {len(self.failed)} failed" if self.failed else "")
+
+
+def match_rows(store, phones):
+    # {phone_key: [sheet rows]} for every selected phone; duplicates in the sheet all match,
+    # same as the old row-by-row scan did.
+    wanted = {phone_key(p) for p in phones if phone_key(p)}
+    df = store.df
+    found = {}
+    if df is not None and 'Phone' in df.columns:
+        keys = df['Phone'].astype(str).str.replace(r'\D', '', regex=True).str[-10:]
+        hits = keys[keys.isin(wanted)]
+        for pos, k in zip(hits.index, hits.to_numpy()): found.setdefault(k, []).append(int(pos) + 2)
+    return wanted, found
+
+
+def _chunks(seq, n):
+    for i in range(0, len(seq), n): yield seq[i:i + n]
+
+
+def bulk_set(store, phones, value, *col_needles):
+    res = BulkResult()
+    col = store.col_num(*col_needles)
+    # Rows are resolved and written under the store's row_lock, so an archive run can't shift them in between
+    with store.row_lock:
+        wanted, found = match_rows(store, phones)
+        res.fail(wanted - set(found), "Not found")
+        if not col:
+            res.fail(found, f"Column {'/'.join(col_needles)} nahi mila"); return res
+        owner = {r: k for k, rows in found.items() for r in rows}
+        done_rows = []
+        for runs in _chunks(merge_runs(sorted(owner)), CHUNK_RUNS):
+            rows = [r for a, b in runs for r in range(a, b + 1)]
+            keys = {owner[r] for r in rows}
+            body = [{'range': f"{rowcol_to_a1(a, col)}:{rowcol_to_a1(b, col)}", 'values': [[value]] * (b - a + 1)} for a, b in runs]
+            try:
+                res.api_calls += 1
+                store.ws.batch_update(body)
+                res.done += sorted(keys); done_rows += rows
+            except Exception as e: res.fail(keys, str(e))
+        # By the rows actually written: the store's rows are what match_rows resolved the phones to
+        if done_rows: store.patch_rows([r - 2 for r in done_rows], {store.header[col - 1]: value})
+    return res
+
+
+def bulk_delete(store, phones):
+    res = BulkResult()
+    # Under row_lock from resolving the rows to drop_rows: the write-behind worker never addresses a shifted row
+    with store.row_lock:
+        wanted, found = match_rows(store, phones)
+        res.fail(wanted - set(found), "Not found")
+        owner = {r: k for k, rows in found.items() for r in rows}
+        # Bottom-up so earlier deletions never shift rows still waiting in a later request/chunk
+        runs = merge_runs(sorted(owner))[::-1]
+        sheet_id = store.ws.id
+        done_rows = []
+        for part in _chunks(runs, CHUNK_RUNS):
+            rows = [r for a, b in part for r in range(a, b + 1)]
+            keys = {owner[r] for r in rows}
+            reqs = [{'deleteDimension': {'range': {'sheetId': sheet_id, 'dimension': 'ROWS', 'startIndex': a - 1, 'endIndex': b}}}
+                    for a, b in part]
+            try:
+                res.api_calls += 1
+                store.ws.spreadsheet.batch_update({'requests': reqs})
+                res.done += sorted(keys); done_rows += rows
+            except Exception as e: res.fail(keys, str(e))
+        if done_rows: store.drop_rows([r - 2 for r in done_rows])
+    if res.failed and res.done: store.invalidate(full=True)  # partial delete: resync row positions
+    return res
@@ -0,0 +1,166 @@
+# --- LEAD CARDS ---
+# Cards are rendered a window at a time (the caller passes start/limit) and each
+# card fragment is memoised on the values it is built from, so on a 30-second
+# tick only cards whose lead actually changed are rebuilt. Column lookups for
+# Tag/Follow/Last Call happen once per frame, not once per row.
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from common import get_ist_date, format_datetime, format_date_only, get_status_icon
+from pipeline import status_label
+
+PAGE_SIZE = 30
+CACHE_MAX = 20000
+
+CARD_STYLE = """
+<style>
+    body { margin: 0; padding: 0; font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; }
+    a.card-link { text-decoration: none; color: inherit; display: block; }
+    
+    .lead-card {
+        background-color: var(--secondary-background-color);
+        border: 1px solid rgba(128, 128, 128, 0.2);
+        border-radius: 12px;
+        padding: 16px;
+        padding-left: 24px;
+        margin-bottom: 14px;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.05);
+        position: relative;
+        transition: transform 0.2s, box-shadow 0.2s;
+        overflow: hidden;
+    }
+    .lead-card:hover {
+        transform: translateY(-3px);
+        box-shadow: 0 6px 12px rgba(0,0,0,0.15);
+        border-color: rgba(128, 128, 128, 0.4);
+    }
+    
+    .status-strip {
+        position: absolute; left: 0; top: 0; bottom: 0; width: 6px;
+        border-top-left-radius: 12px; border-bottom-left-radius: 12px;
+    }
+    .strip-red { background-color: #FF5252; }
+    .strip-orange { background-color: #FFA726; }
+    .strip-green { background-color: #66BB6A; }
+    .strip-grey { background-color: #9E9E9E; }
+
+    .card-top { display: flex; justify-content: space-between; align-items: flex-start; margin-bottom: 6px; }
+    .card-name { font-size: 1.15rem; font-weight: 700; color: var(--text-color); line-height: 1.2; }
+    .card-subtext { font-size: 0.85rem; color: var(--text-color); opacity: 0.7; margin-top: 2px; display: flex; align-items: center; gap: 6px; }
+    
+    .pill-badge { font-size: 0.75rem; font-weight: 600; text-transform: uppercase; padding: 3px 8px; border-radius: 6px; background-color: rgba(255, 255, 255, 0.1); border: 1px solid rgba(128, 128, 128, 0.3); color: var(--text-color); white-space: nowrap; }
+    .source-badge { background-color: rgba(0, 123, 255, 0.1); color: #4287f5; border: none; }
+
+    .card-body { margin: 12px 0; display: flex; align-items: center; gap: 10px; }
+    .status-text { font-size: 1rem; color: var(--text-color); font-weight: 500; }
+
+    .card-footer { display: flex; justify-content: space-between; align-items: center; border-top: 1px solid rgba(128, 128, 128, 0.2); padding-top: 10px; font-size: 0.8rem; color: var(--text-color); opacity: 0.8; }
+    .footer-highlight { font-weight: 600; opacity: 1; display: flex; align-items: center; gap: 5px; }
+    
+    .txt-red { color: #FF5252; }
+    .txt-green { color: #66BB6A; }
+    .txt-orange { color: #FFA726; }
+    .txt-blue { color: #42A5F5; }
+</style>
+"""
+
+CARD_TMPL = """
+        <a href='#' id='{phone}' class='card-link'>
+            <div class='lead-card'>
+                <div class='status-strip {strip_class}'></div>
+                <div class='card-top'>
+                    <div>
+                        <div class='card-name'>{name}</div>
+                        <div class='card-subtext'>
+                            {src_html} <span>📞 {display_phone}</span>
+                        </div>
+                    </div>
+                    {tag_html}
+                </div>
+                <div class='card-body'>
+                    <span style='font-size:1.4rem;'>{icon}</span>
+                    <span class='status-text'>{display_status}</span>
+                </div>
+                <div class='card-footer'>
+                    {footer_html}
+                    <span>🕒 {last_update}</span>
+                </div>
+            </div>
+        </a>
+        """
+
+STRIPS = {"Action": "strip-red", "Future": "strip-green", "Recycle": "strip-orange"}
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+cache_stats = {'hits': 0, 'misses': 0}
+
+
+def resolve_cols(columns):
+    cols = list(columns)
+    tag_col = next((c for c in cols if "Tag" in c or "Label" in c), None)
+    f_col = next((c for c in cols if "Follow" in c), None)
+    t_col = next((c for c in cols if "Last Call" in c), None)
+    id_col = next((c for c in cols if "Lead ID" in c), cols[0] if cols else None)
+    return tag_col, f_col, t_col, id_col
+
+
+def _footer(context, f_val, today):
+    if context == "Action":
+        try:
+            d = datetime.strptime(str(f_val).strip(), "%Y-%m-%d").date()
+            if d < today: return "<span class='footer-highlight txt-red'>⚠️ Overdue</span>"
+            if d == today: return "<span class='footer-highlight txt-orange'>🔥 Aaj Karo</span>"
+        except: pass
+        return "<span class='footer-highlight txt-green'>⚡ Action</span>"
+    if context == "Future": return f"<span class='footer-highlight txt-blue'>📅 {format_date_only(f_val)}</span>"
+    if context == "Recycle": return "<span class='footer-highlight'>♻️ Recycle</span>"
+    if context == "Archive": return "<span>📦 Archive</span>"
+    return "<span>🔒 Closed</span>"
+
+
+def build_card(context, today, phone, name, icon, display_status, source, tag_val, f_val, t_val):
+    phone = phone.replace(',', '').replace('.', '')
+    tag_val, source, f_val = tag_val.strip(), source.strip(), f_val.strip()
+    return CARD_TMPL.format(
+        phone=phone, name=name, strip_class=STRIPS.get(context, "strip-grey"),
+        display_phone=phone if len(phone) < 11 else f"+91 {phone[-10:]}",
+        src_html=f"<span class='pill-badge source-badge'>{source}</span>" if source and source.lower() != "nan" else "",
+        tag_html=f"<span class='pill-badge'>{tag_val}</span>" if tag_val and tag_val.lower() != "nan" else "",
+        icon=icon, display_status=display_status,
+        footer_html=_footer(context, f_val, today),
+        last_update=format_datetime(t_val.strip()))
+
+
+def _cached_card(key):
+    # key = (context, today, lead id, *card fields): any change to the lead gives a new key
+    with _cache_lock:
+        html = _cache.get(key)
+        if html is not None:
+            _cache.move_to_end(key); cache_stats['hits'] += 1
+            return html
+    html = build_card(key[0], key[1], *key[3:])
+    with _cache_lock:
+        cache_stats['misses'] += 1
+        _cache[key] = html
+        while len(_cache) > CACHE_MAX: _cache.popitem(last=False)
+    return html
+
+
+def generate_cards_html(dframe, context, start=0, limit=None):
+    today = get_ist_date()
+    window = dframe.iloc[start:start + limit] if limit else dframe.iloc[start:]
+    tag_col, f_col, t_col, id_col = resolve_cols(window.columns)
+    n = len(window)
+    def col(c, default=''): return window[c].astype(str).tolist() if c in window.columns else [default] * n
+    # Icon/Display are precomputed by pipeline.classify on store frames; plain frames get them here
+    if 'Icon' in window.columns: icons, labels = col('Icon'), col('Display')
+    else:
+        statuses = col('Status')
+        icons, labels = [get_status_icon(s) for s in statuses], [status_label(s) for s in statuses]
+    parts = [CARD_STYLE]
+    for fields in zip(col(id_col), col('Phone'), col('Client Name', 'Unknown'), icons, labels, col('Source'),
+                      col(tag_col), col(f_col), col(t_col)):
+        parts.append(_cached_card((context, today) + fields))
+    return "".join(parts)
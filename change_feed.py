@@ -0,0 +1,64 @@
+# --- CHANGE FEED ---
+# The lead store's `version` is the shared data version: every local write path
+# (modal save, menu add, bulk ops, CSV upload) and every upstream change picked
+# up by a sync swaps in a new frame and bumps it; a sync that finds nothing new
+# leaves it alone. Sessions remember the version they last rendered and only
+# rerun when it moves (see watch_changes in app.py), so an idle dashboard does
+# a single integer compare per tick.
+#
+# Upstream polling is done here, once per process, instead of by whichever
+# session happens to render: a background thread keeps the store fresh (a
+# delta check every REFRESH_SECS, sooner after invalidate()) and notifies
+# waiters whenever the version changes.
+import threading
+import time
+
+POLL_SECS = 1.0
+BACKOFF_MAX = 60.0
+
+
+class ChangeFeed:
+    def __init__(self, store, poll_secs=POLL_SECS, start=True):
+        self.store = store
+        self.poll_secs = poll_secs
+        self.stats = {'polls': 0, 'changes': 0, 'errors': 0}
+        self.last_error = None
+        self.changed_at = None
+        self._cond = threading.Condition()
+        self._seen = store.version
+        self._worker = None
+        if start:
+            self._worker = threading.Thread(target=self._run, name="crm-change-feed", daemon=True)
+            self._worker.start()
+
+    @property
+    def version(self): return self.store.version
+
+    def wait(self, version, timeout=None):
+        # Blocks until the data version differs from `version` (or timeout); returns the current version
+        with self._cond:
+            self._cond.wait_for(lambda: self.store.version != version, timeout)
+            return self.store.version
+
+    def _run(self):
+        delay = self.poll_secs
+        while True:
+            try:
+                self.poll()
+                delay = self.poll_secs
+            except Exception as e:
+                self.last_error = str(e)
+                self.stats['errors'] += 1
+                delay = min(max(delay, 1.0) * 2, BACKOFF_MAX)
+            time.sleep(delay)
+
+    def poll(self):
+        # get() only hits the sheet when the store is stale; otherwise this is a version compare
+        self.stats['polls'] += 1
+        self.store.get()
+        v = self.store.version
+        if v != self._seen:
+            self._seen = v
+            self.stats['changes'] += 1
+            self.changed_at = time.time()
+            with self._cond: self._cond.notify_all()
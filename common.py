@@ -0,0 +1,60 @@
+# --- SHARED HELPERS ---
+# Plain (Streamlit-free) helpers used by app.py and the data/render modules.
+from datetime import datetime
+
+import pytz
+
+# --- TIMEZONE ---
+IST = pytz.timezone('Asia/Kolkata')
+def get_ist_time(): return datetime.now(IST).strftime("%Y-%m-%d %H:%M")
+def get_ist_date(): return datetime.now(IST).date()
+
+# --- HELPER: DATE FORMATTING ---
+def format_datetime(val_str):
+    if not val_str or len(str(val_str)) < 5: return "-"
+    try:
+        dt = datetime.strptime(str(val_str).strip(), "%Y-%m-%d %H:%M")
+        return dt.strftime("%d-%b %H:%M")
+    except: return "-"
+
+def format_date_only(val_str):
+    if not val_str or len(str(val_str)) < 5: return "-"
+    try:
+        d = datetime.strptime(str(val_str).strip(), "%Y-%m-%d").date()
+        if d == get_ist_date(): return "Aaj" # Hinglish
+        return d.strftime("%d-%b")
+    except: return "-"
+
+# --- SHEETS API ERRORS ---
+# A 429 / quota error, from gspread or the quota governor (quota.Throttled): retried, never dropped
+def is_quota_error(e):
+    code = getattr(getattr(e, 'response', None), 'status_code', None)
+    return code == 429 or "429" in str(e) or "quota" in str(e).lower()
+
+# --- LEADS SHEET LAYOUT ---
+# Column order every new row is written in (menu add / CSV upload); header is row 1
+LEADS_HEADER = [
+    "Lead ID", "Date", "Client Name", "Phone", "Source", "Project", "Assign", "Status",
+    "Budget", "Last Call", "Visit Date", "Notes", "Email", "Tag", "Follow-up Date"
+]
+
+# --- PIPELINE (HINGLISH) ---
+PIPELINE_OPTS = [
+    "Naya Lead", "Ringing (Phone nahi uthaya)", "Switch Off / Network Issue", "Call Back (Busy tha)",
+    "Interested (Details Bheji)", "Follow-up (Baat chal rahi hai)", "RNR (Phone uthana band)",
+    "Site Visit Scheduled (Date Fix)", "Visit Done (Rate ki baat)", "Visit Done (Pasand nahi aaya)",
+    "Visit No-Show (Gadi gayi par aaya nahi)", "Sale Closed (Booking)", "Lost (Mehenga / Location issue)", "Junk / Broker / Bekar"
+]
+
+def get_status_icon(status):
+    s = str(status).lower().strip()
+    if "naya" in s: return "⚡"
+    if "switch" in s: return "📴"
+    if "visit scheduled" in s: return "🗓️"
+    if "visit done" in s: return "✅"
+    if "no-show" in s: return "🚫"
+    if "rnr" in s or "uthana band" in s: return "😶"
+    if "lost" in s or "mehenga" in s: return "📉"
+    if "interest" in s or "baat" in s: return "🔥"
+    if "junk" in s or "bekar" in s: return "🗑️"
+    return "📞"
@@ -0,0 +1,77 @@
+# --- COMPACT LEAD TABLE ---
+# The shared store frame is the one copy of the lead data every session reads,
+# so it is kept lean:
+#   - low-cardinality text columns (Status, Source, Assign, Tag, Project) are
+#     categoricals: one small code per row instead of one Python string each
+#   - Phone is int64 when every value round-trips exactly (plain digits, no
+#     leading zero); otherwise it stays text so nothing is rewritten
+#   - Notes (the bulkiest column, only needed in the lead modal) lives outside
+#     the frame in a separate array, see LeadStore.notes
+# Every packed sheet column still gives the exact sheet string under
+# astype(str), which delta sync, search and card rendering rely on. Parsed
+# dates (PD for follow-ups) are datetime64 columns added by pipeline.classify;
+# the sheet's own date strings stay text because "Last Call" is the delta-sync
+# change marker and must compare equal to what the sheet returns.
+import sys
+
+import numpy as np
+import pandas as pd
+
+CATEGORY_WORDS = ("Status", "Source", "Assign", "Tag", "Label", "Project")
+SIDE_WORDS = ("Notes",)
+
+
+def _match(columns, words):
+    return [c for c in columns if any(w.lower() in str(c).lower() for w in words)]
+
+
+def side_col(header):
+    # Sheet column kept out of the frame (first header containing "Notes"), or None
+    cols = _match(header or [], SIDE_WORDS)
+    return cols[0] if cols else None
+
+
+def _is_cat(s): return isinstance(s.dtype, pd.CategoricalDtype)
+
+
+def _phones_int(s):
+    # int64 copy of a text phone column, or None when that would lose anything
+    if not len(s): return None
+    txt = s.astype(str)
+    if not txt.str.fullmatch(r'[1-9]\d{0,17}').all(): return None
+    return txt.astype(np.int64)
+
+
+def pack(df):
+    # Compacts the sheet columns in place and returns df
+    for c in _match(df.columns, CATEGORY_WORDS):
+        if not _is_cat(df[c]): df[c] = df[c].astype(str).astype('category')
+    if 'Phone' in df.columns and df['Phone'].dtype != np.int64:
+        ints = _phones_int(df['Phone'])
+        if ints is not None: df['Phone'] = ints
+    return df
+
+
+def put(df, positions, col, values):
+    # df.iloc[positions, col] = values on a packed frame (values: scalar or list of sheet strings).
+    # Categoricals gain any new categories; a value that doesn't fit an int64 Phone turns it back to text.
+    s = df[col]
+    vals = values if isinstance(values, list) else [values] * len(positions)
+    if _is_cat(s):
+        new = sorted({str(v) for v in vals} - set(s.cat.categories))
+        if new: df[col] = s = s.cat.add_categories(new)
+        vals = [str(v) for v in vals]
+    elif s.dtype == np.int64:
+        try:
+            ints = [int(v) for v in vals]
+            if [str(i) for i in ints] != [str(v) for v in vals]: raise ValueError
+            vals = ints
+        except ValueError: df[col] = s = s.astype(str)
+    df.iloc[positions, df.columns.get_loc(col)] = vals
+
+
+def memory(df, notes=None):
+    # Deep bytes per column (+ the notes array), largest first
+    out = {str(c): int(b) for c, b in df.memory_usage(deep=True, index=False).items()}
+    if notes is not None: out['Notes (separate)'] = int(notes.nbytes + sum(sys.getsizeof(n) for n in notes))
+    return dict(sorted(out.items(), key=lambda kv: -kv[1]))
@@ -0,0 +1,106 @@
+# --- STREAMING CSV IMPORT ---
+# Vendor dumps (Meta Ads / Canopy) run to 100k+ rows. Instead of parsing the whole
+# file and sending one giant append_rows, the file is read in chunks, phones are
+# cleaned/deduped with vectorised pandas ops, and each chunk is committed with its
+# own append_rows call. The job remembers the last committed chunk and the
+# round-robin position, so a failed upload can be resumed without duplicates.
+# Chunks go straight to the sheet, not through the write queue, so the caller
+# drains the queue first and resyncs the lead store after (app.py); otherwise
+# queued adds land between chunks and the store's row order no longer matches.
+import codecs
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 5000
+
+
+def detect_encoding(f, probe=65536):
+    f.seek(0); head = f.read(probe); f.seek(0)
+    if head.startswith(codecs.BOM_UTF8): return 'utf-8-sig'
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError: return 'ISO-8859-1'
+
+
+def _text(f, encoding):
+    # Our own text wrapper (detached afterwards) so pandas never closes the upload buffer
+    f.seek(0)
+    return io.TextIOWrapper(f, encoding=encoding, errors='replace', newline='')
+
+
+def clean_phones(s):
+    return s.astype(str).str.replace(r'\D', '', regex=True).str[-10:]
+
+
+class ImportJob:
+    def __init__(self, assignees):
+        self.assignees = list(assignees)
+        self.encoding = None
+        self.name_col = self.phone_col = None
+        self.chunks_done = 0  # resume point: chunks below this are already in the sheet
+        self.rr = 0           # round-robin position, carried across chunks and resumes
+        self.read = self.added = self.dupes = self.invalid = 0
+        self.api_calls = 0
+        self.secs = 0.0
+        self.error = None
+        self.finished = False
+
+    @property
+    def rows_per_sec(self): return self.read / self.secs if self.secs else 0.0
+
+    def stats(self):
+        return {'read': self.read, 'added': self.added, 'duplicates': self.dupes, 'invalid': self.invalid,
+                'chunks': self.chunks_done, 'api_calls': self.api_calls, 'secs': round(self.secs, 1),
+                'rows_per_sec': round(self.rows_per_sec)}
+
+    def prepare(self, f):
+        # Returns False when the file has no name/phone column
+        self.encoding = detect_encoding(f)
+        text = _text(f, self.encoding)
+        try: cols = list(pd.read_csv(text, nrows=0).columns)
+        finally: text.detach(); f.seek(0)
+        low = [str(c).lower() for c in cols]
+        n_i = next((i for i, c in enumerate(low) if "name" in c), -1)
+        p_i = next((i for i, c in enumerate(low) if "phone" in c or "mobile" in c), -1)
+        if n_i == -1 or p_i == -1: return False
+        self.name_col, self.phone_col = cols[n_i], cols[p_i]
+        return True
+
+    def run(self, f, ws, make_row, on_commit=None, on_progress=None):
+        # make_row(name, phone, assignee) -> sheet row; on_commit(rows) after each successful append
+        self.error = None
+        f.seek(0, 2); size = f.tell() or 1; f.seek(0)
+        ex_phones = set(clean_phones(pd.Series(ws.col_values(4))))  # refetched on resume: covers half-committed chunks
+        self.api_calls += 1
+        text = _text(f, self.encoding)
+        reader = pd.read_csv(text, dtype=str, usecols=[self.name_col, self.phone_col], chunksize=CHUNK_ROWS)
+        t0 = time.time()
+        try:
+            for i, chunk in enumerate(reader):
+                if i < self.chunks_done: continue
+                phones = clean_phones(chunk[self.phone_col])
+                valid = phones.str.len() == 10
+                fresh = valid & ~phones.isin(ex_phones) & ~phones.duplicated()
+                names, phones = chunk.loc[fresh, self.name_col].fillna('').tolist(), phones[fresh].tolist()
+                who = np.take(self.assignees, np.arange(self.rr, self.rr + len(phones)) % len(self.assignees)).tolist()
+                rows = [make_row(n, p, a) for n, p, a in zip(names, phones, who)]
+                if rows:
+                    ws.append_rows(rows)
+                    self.api_calls += 1
+                    if on_commit: on_commit(rows)
+                # Only advance the resume point once the chunk is safely in the sheet
+                ex_phones.update(phones)
+                self.rr += len(rows); self.chunks_done = i + 1
+                self.read += len(chunk); self.added += len(rows)
+                self.invalid += int((~valid).sum()); self.dupes += int((valid & ~fresh).sum())
+                if on_progress: on_progress(min(f.tell() / size, 1.0), self)
+            self.finished = True
+        except Exception as e: self.error = str(e)
+        finally:
+            self.secs += time.time() - t0
+            reader.close(); text.detach()
+        return self.finished
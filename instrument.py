@@ -0,0 +1,162 @@
+# --- REQUEST / LATENCY INSTRUMENTATION ---
+# One process-wide Recorder. Worksheets and spreadsheets handed to the app are
+# wrapped (recorder.wrap) so every storage call in OPS is timed, whoever makes it:
+# the script, a fragment, or a background worker. Stats are kept per (page, op):
+# count, total/max latency, a latency histogram (HIST_MS bucket upper bounds),
+# payload rows, errors and quota (429) errors.
+#
+# The page is thread-local: the script sets it once per rerun (set_page) and
+# fragments narrow it with `with recorder.scope(...)` / @recorder.scoped(...). Calls from worker
+# threads (write queue, sync daemon) land under "background". Non-storage work
+# (card rendering, frame filtering, whole reruns) is timed with recorder.timer(op).
+# Sessions also report the memory they hold (note_session) for the Stats page.
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from common import is_quota_error
+
+OPS = ("get_all_records", "get_all_values", "find", "row_values", "col_values", "batch_get",
+       "batch_update", "append_row", "append_rows", "delete_rows")
+# Methods whose result is itself a worksheet (or a list of them) and gets wrapped too
+HANDLE_OPS = ("worksheet", "worksheets", "get_worksheet", "add_worksheet")
+HIST_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)  # last bucket is "> 10000"
+BACKGROUND = "background"
+SESSION_TTL = 600  # a session that hasn't reported for this long is considered gone
+
+
+def _rows(op, args, result):
+    # Payload size in rows: what came back for reads, what was sent for writes
+    if op == "append_row": return 1
+    if op == "delete_rows": return (args[1] if len(args) > 1 and args[1] else args[0]) - args[0] + 1 if args else 0
+    if op == "batch_update":
+        body = args[0] if args else []
+        if isinstance(body, dict): return len(body.get('requests', []))
+        return sum(len(item.get('values', [])) for item in body)
+    if op == "append_rows": return len(args[0]) if args else 0
+    if op == "batch_get": return sum(len(vr) for vr in result or [])
+    if op == "find": return int(result is not None)
+    return len(result) if isinstance(result, list) else 0
+
+
+class Recorder:
+    def __init__(self):
+        self.started = time.time()
+        self.stats = {}  # (page, op) -> dict
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.sessions = {}  # session id -> {'user', 'bytes', 'at'}: per-session memory, see note_session
+
+    # --- CONTEXT ---
+    def page(self): return getattr(self._local, 'page', BACKGROUND)
+
+    def set_page(self, page): self._local.page = page
+
+    @contextmanager
+    def scope(self, page):
+        prev = self.page()
+        self._local.page = page
+        try: yield
+        finally: self._local.page = prev
+
+    # --- RECORDING ---
+    def record(self, op, secs, rows=0, error=None, page=None):
+        key = (page or self.page(), op)
+        ms = secs * 1000
+        with self._lock:
+            s = self.stats.get(key)
+            if s is None:
+                s = self.stats[key] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'errors': 0,
+                                       'quota_errors': 0, 'hist': [0] * (len(HIST_MS) + 1)}
+            s['count'] += 1; s['total_ms'] += ms; s['rows'] += rows
+            s['max_ms'] = max(s['max_ms'], ms)
+            s['hist'][next((i for i, b in enumerate(HIST_MS) if ms <= b), len(HIST_MS))] += 1
+            if error is not None:
+                s['errors'] += 1
+                if is_quota_error(error): s['quota_errors'] += 1
+
+    @contextmanager
+    def timer(self, op, rows=0):
+        t0, err = time.perf_counter(), None
+        try: yield
+        except Exception as e:
+            err = e; raise
+        finally: self.record(op, time.perf_counter() - t0, rows, err)
+
+    def scoped(self, page):
+        # Decorator form of scope(), for fragments
+        def deco(fn):
+            @functools.wraps(fn)
+            def run(*args, **kwargs):
+                with self.scope(page): return fn(*args, **kwargs)
+            return run
+        return deco
+
+    def call(self, op, fn, *args, **kwargs):
+        t0 = time.perf_counter()
+        try: result = fn(*args, **kwargs)
+        except Exception as e:
+            self.record(op, time.perf_counter() - t0, 0, e); raise
+        self.record(op, time.perf_counter() - t0, _rows(op, args, result))
+        return result
+
+    def note_session(self, sid, user, bytes):
+        self.sessions[sid] = {'user': user, 'bytes': int(bytes), 'at': time.time()}
+
+    def sessions_report(self):
+        # Sessions seen in the last SESSION_TTL seconds, biggest first
+        now = time.time()
+        for sid in [k for k, v in list(self.sessions.items()) if now - v['at'] > SESSION_TTL]: self.sessions.pop(sid, None)
+        rows = [{'session': sid, 'user': v['user'], 'KB': round(v['bytes'] / 1024, 1), 'bytes': v['bytes'],
+                 'age_secs': round(now - v['at'])} for sid, v in list(self.sessions.items())]
+        return sorted(rows, key=lambda r: -r['bytes'])
+
+    def wrap(self, obj): return obj if obj is None or isinstance(obj, Instrumented) else Instrumented(obj, self)
+
+    # --- REPORTING ---
+    def summary(self):
+        with self._lock: items = sorted((k, dict(v, hist=list(v['hist']))) for k, v in self.stats.items())
+        out = []
+        for (page, op), s in items:
+            out.append({'page': page, 'op': op, 'count': s['count'],
+                        'avg_ms': round(s['total_ms'] / s['count'], 1), 'p95_ms': self._p95(s),
+                        'max_ms': round(s['max_ms'], 1), 'rows': s['rows'],
+                        'errors': s['errors'], 'quota_errors': s['quota_errors'], 'hist': s['hist']})
+        return out
+
+    @staticmethod
+    def _p95(s):
+        # Upper bound of the histogram bucket holding the 95th percentile (max for the overflow bucket)
+        n, seen = sum(s['hist']), 0
+        for i, c in enumerate(s['hist']):
+            seen += c
+            if seen >= 0.95 * n: return HIST_MS[i] if i < len(HIST_MS) else round(s['max_ms'], 1)
+        return None
+
+    def to_json(self):
+        return json.dumps({'started': self.started, 'exported': time.time(), 'hist_ms': list(HIST_MS),
+                           'stats': self.summary(), 'sessions': self.sessions_report()}, indent=2)
+
+    def reset(self):
+        with self._lock: self.stats = {}
+        self.started = time.time()
+
+
+class Instrumented:
+    # Transparent proxy: OPS are timed, worksheet handles come back wrapped, everything else passes through
+    def __init__(self, obj, recorder):
+        self._obj, self._rec = obj, recorder
+
+    def __getattr__(self, name):
+        attr = getattr(self._obj, name)
+        if name == "spreadsheet": return self._rec.wrap(attr)
+        if not callable(attr): return attr
+        if name in OPS: return lambda *a, **kw: self._rec.call(name, attr, *a, **kw)
+        if name in HANDLE_OPS:
+            def handle(*a, **kw):
+                res = attr(*a, **kw)
+                return [self._rec.wrap(w) for w in res] if isinstance(res, list) else self._rec.wrap(res)
+            return handle
+        return attr
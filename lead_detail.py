@@ -0,0 +1,117 @@
+# --- LEAD DETAIL VIEWS ---
+# What the lead modal needs, prepared ahead of the click: a card click hands us
+# a phone, the store's row index turns it into a row position, and the view
+# model for that position is usually already built (the top of the Action tab
+# is prefetched on every feed render). A view model holds the row (Notes
+# included), the cleaned phone, the status dropdown index, the tag column and
+# every WhatsApp template for the lead's name.
+#   - follows the store's change log: touched positions are rebuilt on their
+#     next use, full loads and deletes start over
+#   - template texts are cached per client name (they only depend on the name
+#     and the office/project)
+#   - the Assign dropdown options are built once per users-table version
+import threading
+from functools import lru_cache
+
+from common import PIPELINE_OPTS
+
+PREFETCH = 30       # Action-tab leads prepared ahead of a click
+MAX_VIEWS = 2000    # oldest views are dropped beyond this
+MAX_TEMPLATES = 2000
+
+
+@lru_cache(maxsize=256)
+def status_index(val):
+    # Position of a sheet status in PIPELINE_OPTS (the modal's status dropdown), 0 when unknown
+    val = str(val).lower().strip()
+    for i, x in enumerate(PIPELINE_OPTS):
+        if x.lower() == val: return i
+    def first(word): return next((i for i, x in enumerate(PIPELINE_OPTS) if word in x), 0)
+    if "visit" in val and "schedule" in val: return first("Site Visit Scheduled")
+    if "no-show" in val: return first("No-Show")
+    if "ringing" in val: return first("Ringing")
+    return 0
+
+
+class LeadDetails:
+    def __init__(self, templates, max_views=MAX_VIEWS):
+        # templates(name) -> {template choice: message text}
+        self.templates = templates
+        self.max_views = max_views
+        self.version = -1
+        self.views = {}   # row position -> view model
+        self._tpl = {}    # client name -> templates
+        self._users = (None, [], {})  # (users version, usernames, username -> index)
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'prefetched': 0}
+
+    # --- SYNC ---
+    def _sync(self, store):
+        if store.version == self.version: return
+        touched = store.changes_since(self.version)
+        if touched is None: self.views = {}
+        else:
+            for p in touched: self.views.pop(p, None)
+        self.version = store.version
+
+    def _build(self, rec):
+        name = rec.get('Client Name', 'Unknown')
+        tpl = self._tpl.get(name)
+        if tpl is None:
+            if len(self._tpl) >= MAX_TEMPLATES: self._tpl.clear()
+            tpl = self._tpl[name] = self.templates(name)
+        status = rec.get('Status', 'Naya Lead')
+        tag_col = next((k for k in rec if "Tag" in k or "Label" in k), None)
+        return {
+            'row': rec,
+            'phone': str(rec.get('Phone', '')).replace(',', '').replace('.', ''),
+            'name': name,
+            'status': status,
+            'status_idx': status_index(status),
+            'notes': rec.get('Notes', ''),
+            'tag_col': tag_col,
+            'tag': str(rec.get(tag_col, '')) if tag_col else "",
+            'templates': tpl,
+        }
+
+    def _keep(self, pos, vm):
+        if len(self.views) >= self.max_views: self.views.pop(next(iter(self.views)))
+        self.views[pos] = vm
+
+    # --- QUERY ---
+    def view(self, store, phone=None, lead_id=None):
+        # View model for a clicked lead, or None when it isn't in the store
+        with self._lock:
+            self._sync(store)
+            r = store.row_for(phone, lead_id)
+            if not r: return None
+            vm = self.views.get(r - 2)
+            if vm is not None:
+                self.stats['hits'] += 1
+                return vm
+            rec = store.record(phone, lead_id)
+            if rec is None: return None
+            self.stats['misses'] += 1
+            vm = self._build(rec)
+            self._keep(r - 2, vm)
+            return vm
+
+    def prefetch(self, store, positions):
+        # Builds the views for positions (e.g. the first Action cards) that aren't prepared yet
+        with self._lock:
+            self._sync(store)
+            df, notes, col = store.df, store.notes, store.notes_col
+            if df is None: return
+            missing = [int(p) for p in positions if p < len(df) and int(p) not in self.views]
+            if not missing: return
+            for p, rec in zip(missing, df.iloc[missing].to_dict('records')):
+                if col and p < len(notes): rec[col] = notes[p]
+                self._keep(p, self._build(rec))
+            self.stats['prefetched'] += len(missing)
+
+    def user_opts(self, users_df, version):
+        # (usernames, username -> index) for the Assign dropdown, rebuilt only when the users table changes
+        if self._users[0] != version:
+            names = users_df['Username'].tolist()
+            self._users = (version, names, {u: i for i, u in reversed(list(enumerate(names)))})
+        return self._users[1], self._users[2]
@@ -0,0 +1,408 @@
+# --- SHARED LEAD STORE ---
+# One process-wide copy of the Leads worksheet. Every session/fragment reads from
+# here instead of calling get_all_records() itself, so the sheet is downloaded
+# at most once per refresh interval no matter how many telecallers are online.
+#
+# Refreshes are incremental: each tick reads only the header, Phone and the
+# DELTA_COLS columns (Last Call, plus Assign and Tag, which bulk actions change
+# without stamping Last Call), then pulls the rows where any of them changed
+# (plus any appended rows) with one ranged batch_get. A full get_all_values() is only done on cold start,
+# when rows were deleted/shifted upstream, when the header changed, or every
+# FULL_RESYNC_SECS to pick up edits made straight in the sheet.
+#
+# The published frame is packed (compact.py): categoricals, int64 phones, and
+# the Notes column kept aside in `notes` (same row positions). record() puts
+# the note back for the lead modal.
+#
+# A full fetch of a big sheet is split into FETCH_BLOCK_ROWS row ranges fetched
+# on a small thread pool. The first wave covers the whole grid (ws.row_count,
+# or the previous frame if longer), blank rows inside the sheet included; only
+# rows appended past it need more waves. Per-block timings are kept in
+# `last_fetch`.
+#
+# With a snapshot (snapshot.py) several server processes share one refresh:
+# the elected writer fetches and publishes, the others adopt its frames.
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+
+from compact import memory, pack, put, side_col
+from quota import carry
+
+REFRESH_SECS = 30
+FULL_RESYNC_SECS = 600
+DELTA_MAX_FRACTION = 0.25  # above this many changed rows a full fetch is cheaper
+DELTA_COLS = (("Last Call",), ("Assign",), ("Tag", "Label"))  # compared per row by the delta (find_col needles)
+FETCH_BLOCK_ROWS = 10000
+FETCH_WORKERS = int(os.environ.get("CRM_FETCH_WORKERS", 4))  # 1: one get_all_values per full fetch
+
+
+def digits(val): return re.sub(r'\D', '', str(val))
+
+
+def phone_key(val): return digits(val)[-10:]
+
+
+def col_letter(c): return re.sub(r'\d', '', rowcol_to_a1(1, c))
+
+
+def _flat(value_range): return [str(r[0]) if r else '' for r in value_range]
+
+
+def changes_after(log, version, current):
+    # Positions touched by the (version, positions) entries of `log` after `version`, up to `current`;
+    # None when the log doesn't reach back that far or a full rebuild happened in between
+    if version == current: return set()
+    log = [c for c in log if c[0] > version]
+    if not log or log[0][0] != version + 1: return None
+    out = set()
+    for _, touched in log:
+        if touched is None: return None
+        out |= touched
+    return out
+
+
+def merge_runs(positions):
+    runs = []
+    for p in positions:
+        if runs and p == runs[-1][1] + 1: runs[-1][1] = p
+        else: runs.append([p, p])
+    return runs
+
+
+class LeadStore:
+    def __init__(self, ws, refresh_secs=REFRESH_SECS, full_resync_secs=FULL_RESYNC_SECS, prepare=None, snapshot=None,
+                 fetch_workers=FETCH_WORKERS, block_rows=FETCH_BLOCK_ROWS):
+        self.ws = ws
+        self.fetch_workers = fetch_workers
+        self.block_rows = block_rows
+        self.last_fetch = []  # [{'rows', 'n', 'ms'}] per block of the last full fetch
+        self.prepare = prepare  # prepare(df, touched) -> df, adds derived columns after the sheet columns
+        self.hold = None  # hold() -> True while optimistic local writes are still queued for the sheet
+        self.snapshot = snapshot  # snapshot.SharedSnapshot shared with the other server processes, or None
+        self.wrote_at = 0.0  # last time one of our writes reached the sheet
+        self._adopted = None  # (writer token, writer version, our version, rows) of the last snapshot adopted
+        self.refresh_secs = refresh_secs
+        self.full_resync_secs = full_resync_secs
+        self.df = None
+        self.notes = None  # Notes column, outside the frame (object array aligned with df rows)
+        self.notes_col = None
+        self.header = None
+        self.version = 0
+        self.loaded_at = 0.0
+        self.fetched_at = 0.0  # when the fetch behind the current frame started (writes after it may be missing)
+        self.full_at = 0.0
+        self._full_sig = None  # hash of the last full fetch; cleared by local writes
+        self.stats = {'full': 0, 'delta': 0, 'rows_fetched': 0, 'blocks': 0}
+        # Row index: 10-digit phone / Lead ID -> sheet row number (header is row 1)
+        self.row_of_phone = {}
+        self.row_of_id = {}
+        self._col_cache = {}
+        # (version, positions touched) per swap; positions None = everything moved (full load / delete).
+        # Lets derived indexes (search, partitions, ...) catch up incrementally.
+        self.changes = deque(maxlen=256)
+        self._fetch_lock = threading.Lock()  # single-flight: one fetch at a time
+        self._write_lock = threading.Lock()  # serialises local patches
+        # Held from turning phones into sheet row numbers until the API call using them is sent,
+        # and by row deletes until the frame has caught up, so no write lands on a shifted row
+        self.row_lock = threading.Lock()
+
+    # --- READ ---
+    def is_stale(self):
+        return self.df is None or (time.time() - self.loaded_at) >= self.refresh_secs
+
+    def get(self):
+        if not self.is_stale(): return self.df
+        if self.df is not None and self.hold and self.hold(): return self.df
+        # Cold start: everyone waits for the first load. Warm: whoever gets the lock
+        # refreshes, the rest keep serving the previous frame instead of piling up.
+        if not self._fetch_lock.acquire(blocking=self.df is None): return self.df
+        try:
+            if self.is_stale(): self._load()
+        finally: self._fetch_lock.release()
+        return self.df
+
+    def refresh(self):
+        with self._fetch_lock: self._load()
+        return self.df
+
+    def invalidate(self, full=False):
+        self.loaded_at = 0.0
+        if full: self.full_at = 0.0
+
+    def find_col(self, *needles):
+        cols = [] if self.df is None else self.df.columns
+        return next((c for n in needles for c in cols if n.lower() in c.lower()), None)
+
+    # --- ROW INDEX ---
+    def col_num(self, *needles):
+        # 1-based sheet column of the first header containing any needle (same rule as the old get_idx)
+        if needles not in self._col_cache:
+            h = self.header or []
+            self._col_cache[needles] = next((i + 1 for n in needles for i, c in enumerate(h) if n.lower() in c.lower()), None)
+        return self._col_cache[needles]
+
+    @property
+    def id_col(self): return self.find_col("Lead ID") or (self.header[0] if self.header else None)
+
+    def row_for(self, phone=None, lead_id=None):
+        r = self.row_of_id.get(str(lead_id).strip()) if lead_id else None
+        return r or self.row_of_phone.get(phone_key(phone))
+
+    def record(self, phone=None, lead_id=None):
+        df, r = self.df, self.row_for(phone, lead_id)
+        if df is None or not r or r - 2 >= len(df): return None
+        rec = df.iloc[r - 2].to_dict()
+        if self.notes_col and r - 2 < len(self.notes): rec[self.notes_col] = self.notes[r - 2]
+        return rec
+
+    def sheet_rows(self, positions):
+        # Rows at positions as the sheet holds them (header order, Notes included)
+        df = self.df
+        cols = [self.notes[positions].tolist() if c == self.notes_col
+                else df[c].iloc[positions].astype(str).tolist() if c in df.columns
+                else [''] * len(positions) for c in self.header]
+        return [list(r) for r in zip(*cols)]
+
+    def memory_report(self):
+        # Bytes held by the shared table, per column (Notes counted separately)
+        if self.df is None: return {}
+        return memory(self.df, self.notes)
+
+    def _index(self, df, start=0):
+        if start == 0: self.row_of_phone, self.row_of_id = {}, {}
+        rows = range(start + 2, len(df) + 2)
+        # setdefault keeps the first occurrence, same row leads_sheet.find() would have returned
+        if 'Phone' in df.columns:
+            for k, r in zip(df['Phone'].iloc[start:].astype(str).str.replace(r'\D', '', regex=True).str[-10:], rows):
+                if k: self.row_of_phone.setdefault(k, r)
+        id_col = self.id_col
+        if id_col in df.columns:
+            for k, r in zip(df[id_col].iloc[start:].astype(str).str.strip(), rows):
+                if k: self.row_of_id.setdefault(k, r)
+
+    def _load(self):
+        snap = self.snapshot
+        if snap and (self.df is None or not snap.is_writer()) and self._follow(snap): return
+        started = time.time()
+        full_due = started - self.full_at >= self.full_resync_secs
+        if self.df is None or full_due or not self._delta(): self._full()
+        self.loaded_at, self.fetched_at = time.time(), started
+        if snap and snap.is_writer(): snap.publish(self)
+
+    # --- SHARED SNAPSHOT ---
+    def _follow(self, snap):
+        # Serves this refresh from the writer's snapshot; False when we should fetch the sheet ourselves
+        fresh = snap.fresh()
+        if self.df is not None and not fresh: return False  # writer gone quiet
+        data = snap.read()
+        if data is None:
+            if self.df is None: return False
+        elif data['fetched_at'] >= self.wrote_at: self._adopt(data)
+        # Cold start from an old snapshot: serve it now, catch up on the next get()
+        self.loaded_at = time.time() if fresh else data['fetched_at']
+        return True
+
+    def _adopt(self, data):
+        with self._write_lock:
+            df, old = data['df'], self.df
+            token, theirs_v, ours_v, rows = self._adopted or (None, None, None, None)
+            theirs = changes_after(data['changes'], theirs_v, data['version']) if token == data['token'] else None
+            ours = self.changes_since(ours_v) if ours_v is not None else None
+            touched = None
+            if theirs is not None and ours is not None and old is not None and len(df) >= len(old):
+                touched = theirs | ours | set(range(len(old), len(df)))
+            self.header, self.notes_col, self._col_cache = list(data['header']), data['notes_col'], {}
+            # Rows we appended locally may sit at other positions in the writer's frame
+            self._index(df, 0 if touched is None or len(old) != rows else rows)
+            self.df, self.notes = df, data['notes']
+            self.full_at, self.fetched_at, self._full_sig = data['full_at'], data['fetched_at'], None
+            self.version += 1
+            self.changes.append((self.version, touched))
+            self._adopted = (data['token'], data['version'], self.version, len(df))
+
+    def landed(self):
+        # Called once queued writes reached the sheet: snapshots taken before now may predate them
+        self.wrote_at = time.time()
+
+    def _frame(self, rows):
+        # Straight from the value lists; only ragged rows are copied
+        w = len(self.header)
+        return pd.DataFrame([r if len(r) == w else (list(r) + [''] * w)[:w] for r in rows], columns=self.header)
+
+    def _split(self, df):
+        # (frame without the notes column, notes array)
+        if self.notes_col in df.columns: return df.drop(columns=[self.notes_col]), df[self.notes_col].to_numpy(dtype=object)
+        return df, np.full(len(df), '', dtype=object)
+
+    def _block(self, a, b):
+        # Sheet rows a..b as value lists, padded to b - a + 1 rows (ranged reads drop trailing empty rows)
+        t0 = time.perf_counter()
+        got = self.ws.batch_get([f"{a}:{b}"])[0]
+        rows = got + [[]] * (b - a + 1 - len(got))
+        return rows, {'rows': f"{a}-{b}", 'n': len(got), 'ms': round((time.perf_counter() - t0) * 1000, 1)}
+
+    def _fetch_all(self):
+        # The whole sheet as value lists (header first)
+        if self.fetch_workers <= 1:
+            t0 = time.perf_counter()
+            vals = self.ws.get_all_values()
+            self.last_fetch = [{'rows': f"1-{len(vals)}", 'n': len(vals), 'ms': round((time.perf_counter() - t0) * 1000, 1)}]
+            return vals
+        size = self.block_rows
+        # First wave: every block up to the end of the grid (or of the last frame, if longer). Ranged reads drop
+        # trailing blank rows, so a short block inside the grid is just blank rows and the load goes on; only
+        # past that end does a short block mean the data ended. Rows appended since the grid size was read come
+        # in further waves, twice the previous one up to fetch_workers. A wave's last block asks for one row
+        # more, so a sheet ending right on a block boundary needs no wave that can only be empty.
+        end = max(getattr(self.ws, 'row_count', 0) or 0, len(self.df) + 1 if self.df is not None else 1)
+        n = -(-end // size)
+        vals, timings, a = [], [], 1
+        block = carry(self._block)  # the blocks spend the caller's quota lane (poll, bulk, ...), not the pool's
+        with ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix="crm-fetch") as pool:
+            while True:
+                spans = [(a + i * size, a + (i + 1) * size - (i < n - 1)) for i in range(n)]
+                for rows, t in pool.map(lambda s: block(*s), spans):
+                    vals += rows; timings.append(t)
+                if len(rows) > t['n']: break
+                a, n = spans[-1][1] + 1, min(n * 2, self.fetch_workers)
+        while vals and not any(vals[-1]): vals.pop()
+        self.last_fetch = timings
+        return vals
+
+    def _full(self):
+        vals = self._fetch_all()
+        # A periodic resync that finds the sheet exactly as last loaded (and no local writes since)
+        # keeps the current frame, so the data version only moves on real changes.
+        sig = hash(tuple(map(tuple, vals)))
+        self.stats['full'] += 1; self.stats['blocks'] += len(self.last_fetch); self.full_at = time.time()
+        if self.df is not None and sig == self._full_sig: return
+        self.header = [str(h).strip() for h in vals[0]] if vals else []
+        self._col_cache = {}
+        self.notes_col = side_col(self.header)
+        df, notes = self._split(self._frame(vals[1:]))
+        self.stats['rows_fetched'] += len(df)
+        self._swap(df, notes=notes)
+        self._full_sig = sig
+
+    # --- DELTA SYNC ---
+    # Returns False whenever the cached frame can't be patched safely; the caller
+    # then falls back to a full fetch.
+    def _delta(self):
+        h = self.header
+        p_i = next((i for i, c in enumerate(h) if c == 'Phone'), None)
+        watch = list(dict.fromkeys(c for c in (self.find_col(*n) for n in DELTA_COLS) if c))
+        if p_i is None or not self.find_col("Last Call"): return False
+        cols = [col_letter(i + 1) for i in [p_i] + [h.index(c) for c in watch]]
+        head, *vrs = self.ws.batch_get(['1:1'] + [f"{c}2:{c}" for c in cols])
+        if [str(x).strip() for x in (head[0] if head else [])] != h: return False
+
+        old = self.df
+        n_old = len(old)
+        vals = [_flat(vr) for vr in vrs]
+        n_new = max(map(len, vals))
+        if n_new < n_old: return False  # rows deleted upstream
+        p_vals, *w_vals = [v + [''] * (n_new - len(v)) for v in vals]
+        # Same phone at every cached position, otherwise rows were deleted/inserted mid-sheet
+        if (np.asarray(p_vals[:n_old], dtype=object) != old['Phone'].astype(str).to_numpy()).any(): return False
+
+        moved = np.zeros(n_old, bool)
+        for c, v in zip(watch, w_vals): moved |= np.asarray(v[:n_old], dtype=object) != old[c].astype(str).to_numpy()
+        changed = np.flatnonzero(moved).tolist()
+        positions = changed + list(range(n_old, n_new))
+        self.stats['delta'] += 1
+        if not positions: return True
+        if len(positions) > max(n_old, 1) * DELTA_MAX_FRACTION: return False
+
+        last = col_letter(len(h))
+        runs = merge_runs(positions)
+        blocks = self.ws.batch_get([f"A{a + 2}:{last}{b + 2}" for a, b in runs])
+        w = len(h)
+        updated, appended = {}, []
+        for (a, b), vr in zip(runs, blocks):
+            for k, pos in enumerate(range(a, b + 1)):
+                row = ([str(x) for x in vr[k]] if k < len(vr) else []) + [''] * w
+                if pos < n_old: updated[pos] = row[:w]
+                else: appended.append(row[:w])
+        self.stats['rows_fetched'] += len(positions)
+
+        with self._write_lock:
+            if self.df is not old: return True  # a local write landed meanwhile; catch up next tick
+            df, notes = old.copy(), self.notes.copy()
+            if updated:
+                pos, rows = list(updated), list(updated.values())
+                for j, c in enumerate(h):
+                    vals = [row[j] for row in rows]
+                    if c == self.notes_col: notes[pos] = vals
+                    elif c in df.columns: put(df, pos, c, vals)
+            if appended:
+                new, new_notes = self._split(self._frame(appended))
+                df = pd.concat([df, new], ignore_index=True)
+                notes = np.concatenate([notes, new_notes])
+            self._swap(df, reindex_from=n_old, changed=updated, notes=notes)  # phones of existing rows were verified unchanged
+        return True
+
+    def _swap(self, df, reindex_from=0, changed=(), notes=None):
+        # Readers keep whatever frame they already hold; we never mutate a published frame.
+        self._full_sig = None
+        df = pack(df)
+        if reindex_from is not None: self._index(df, reindex_from)
+        touched = None if reindex_from == 0 else set(changed) | set(range(reindex_from or len(df), len(df)))
+        # Same rows as the published frame (a patch, or a delta without appends): derive only what was touched
+        same = touched is not None and self.df is not None and len(df) == len(self.df)
+        if self.prepare: df = self.prepare(df, touched if same else None)
+        if notes is not None: self.notes = notes
+        self.df = df
+        self.version += 1
+        self.changes.append((self.version, touched))
+
+    def changes_since(self, version):
+        # Positions changed after `version`, or None when a full rebuild is needed
+        return changes_after(self.changes, version, self.version)
+
+    # --- LOCAL WRITE-THROUGH (after a successful sheet write) ---
+    def patch_row(self, row, values):
+        if self.df is None or not 2 <= row < len(self.df) + 2: return
+        self.patch_rows([row - 2], values)
+
+    def patch_rows(self, positions, values):
+        # values written into the rows at these positions (e.g. the rows a bulk write just hit)
+        if self.df is None: return
+        with self._write_lock:
+            self.wrote_at = time.time()
+            pos = sorted({int(p) for p in positions if 0 <= p < len(self.df)})
+            df = self.df.copy()
+            notes = self._patch(df, pos, values)
+            self._swap(df, reindex_from=None, changed=pos, notes=notes)
+
+    def _patch(self, df, positions, values):
+        # Writes values into df (a private copy) in place; returns the new notes array if Notes changed
+        notes = None
+        for col, val in values.items():
+            if col == self.notes_col:
+                notes = self.notes.copy(); notes[positions] = val
+            elif col in df.columns: put(df, positions, col, val)
+        return notes
+
+    def drop_rows(self, positions):
+        # By row position: another lead sharing a phone stays put
+        if self.df is None: return
+        with self._write_lock:
+            self.wrote_at = time.time()
+            keep = np.ones(len(self.df), bool); keep[list(positions)] = False
+            self._swap(self.df[keep].reset_index(drop=True), notes=self.notes[keep])
+
+    def append(self, rows):
+        if self.df is None: return
+        with self._write_lock:
+            self.wrote_at = time.time()
+            new, new_notes = self._split(self._frame(rows))
+            notes = np.concatenate([self.notes, new_notes])
+            self._swap(pd.concat([self.df, new], ignore_index=True), reindex_from=len(self.df), notes=notes)
@@ -0,0 +1,117 @@
+# --- NOTES LOG ---
+# Call notes live in an append-only "Notes Log" tab, one row per interaction
+# (who, when, status from -> to, note), instead of being prepended to the lead's
+# Notes cell on every save. The lead row keeps a one-line summary of the latest
+# note, so the Leads download and the cards stay small however long a lead's
+# history grows.
+#   - writes are queued on the write-behind queue (op 'log') and land as one
+#     append_rows per flush, journaled like every other queued write
+#   - reads are lazy: nothing is fetched until a lead modal opens; then the
+#     Lead ID column (at most once per REFRESH_SECS) and only the rows of the
+#     entries being shown, newest first
+#   - a Notes cell written before the log existed is logged once as the lead's
+#     first entry the first time the lead is saved, so no history is lost
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from common import get_ist_time
+from lead_store import col_letter, merge_runs
+
+LOG_TAB = "Notes Log"
+LOG_HEADER = ["Entry ID", "Lead ID", "Time", "Author", "From Status", "To Status", "Note"]
+PAGE_SIZE = 10
+SUMMARY_CHARS = 120
+REFRESH_SECS = 60
+LEGACY_AUTHOR = "(purane notes)"
+
+
+def log_worksheet(sh):
+    # The log tab, created with its header on first use
+    try: return sh.worksheet(LOG_TAB)
+    except Exception:
+        ws = sh.add_worksheet(title=LOG_TAB, rows=1000, cols=len(LOG_HEADER))
+        ws.append_row(LOG_HEADER)
+        return ws
+
+
+def summary(note, ts=None):
+    # What the lead's Notes cell keeps: "[17-Oct] first line of the latest note"
+    try: day = datetime.strptime(ts or get_ist_time(), "%Y-%m-%d %H:%M").strftime('%d-%b')
+    except ValueError: day = ''
+    text = f"[{day}] {' '.join(str(note).split())}"
+    return text if len(text) <= SUMMARY_CHARS else text[:SUMMARY_CHARS - 1] + "…"
+
+
+def _entry(row): return dict(zip(LOG_HEADER, list(row) + [''] * (len(LOG_HEADER) - len(row))))
+
+
+class NotesLog:
+    def __init__(self, open_ws, refresh_secs=REFRESH_SECS):
+        # open_ws() -> the log worksheet; only called once something needs it
+        self._open = open_ws
+        self._ws = None
+        self.refresh_secs = refresh_secs
+        self.rows_of = {}   # lead key -> sheet row numbers, oldest first
+        self.loaded_at = 0.0
+        self._cache = {}    # sheet row -> entry (rows are never rewritten)
+        self.pending = {}   # lead key -> entries queued here and not yet in the sheet, oldest first
+        self._lock = threading.Lock()
+        self.stats = {'index_loads': 0, 'page_reads': 0, 'rows_read': 0, 'logged': 0}
+
+    @property
+    def ws(self):
+        if self._ws is None: self._ws = self._open()
+        return self._ws
+
+    # --- WRITE ---
+    def entry(self, lead_key, author, old_status, new_status, note, ts=None):
+        # The sheet row for one interaction (queue it with WriteQueue.log); shown in the modal right away
+        row = [uuid.uuid4().hex[:12], str(lead_key), ts if ts is not None else get_ist_time(), author,
+               old_status, new_status, str(note)]
+        with self._lock: self.pending.setdefault(str(lead_key), []).append(_entry(row))
+        self.stats['logged'] += 1
+        return row
+
+    def landed(self, rows):
+        # Called by the write queue once rows are in the sheet: they're read back from there from now on
+        ids = {r[0] for r in rows}
+        with self._lock:
+            for k in list(self.pending):
+                self.pending[k] = [e for e in self.pending[k] if e['Entry ID'] not in ids]
+                if not self.pending[k]: del self.pending[k]
+            self.loaded_at = 0.0
+
+    # --- READ ---
+    def _index(self):
+        if time.time() - self.loaded_at < self.refresh_secs: return
+        col = self.ws.col_values(LOG_HEADER.index("Lead ID") + 1)
+        rows_of = {}
+        for r, k in enumerate(col[1:], 2):
+            if k: rows_of.setdefault(str(k).strip(), []).append(r)
+        self.rows_of, self.loaded_at = rows_of, time.time()
+        self.stats['index_loads'] += 1
+
+    def count(self, lead_key):
+        with self._lock:
+            self._index()
+            return len(self.rows_of.get(str(lead_key), ())) + len(self.pending.get(str(lead_key), ()))
+
+    def recent(self, lead_key, limit=PAGE_SIZE):
+        # (newest `limit` entries, newest first; total entries for the lead)
+        k = str(lead_key)
+        with self._lock:
+            self._index()
+            pending = self.pending.get(k, [])[::-1]
+            rows = self.rows_of.get(k, [])[::-1]
+            want = rows[:max(limit - len(pending), 0)]
+            missing = sorted(r for r in want if r not in self._cache)
+            if missing:
+                last = col_letter(len(LOG_HEADER))
+                runs = merge_runs(missing)
+                blocks = self.ws.batch_get([f"A{a}:{last}{b}" for a, b in runs])
+                for (a, b), vr in zip(runs, blocks):
+                    for i, r in enumerate(range(a, b + 1)): self._cache[r] = _entry(vr[i] if i < len(vr) else [])
+                self.stats['page_reads'] += 1; self.stats['rows_read'] += len(missing)
+            return (pending + [self._cache[r] for r in want])[:limit], len(pending) + len(rows)
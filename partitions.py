@@ -0,0 +1,70 @@
+# --- ASSIGNMENT PARTITIONS ---
+# Assignee -> row positions in the shared lead store, so a telecaller's feed,
+# tabs and search only ever touch their own rows instead of scanning the whole
+# frame for `Assign == me`. Like the search index it follows the store's change
+# log: a modal "Assign Kisko?" save or a bulk Assign patches a few positions,
+# and only those rows move between partitions. Full loads, deletes and long
+# gaps rebuild the whole thing with one groupby.
+import threading
+
+import numpy as np
+import pandas as pd
+
+EMPTY = np.zeros(0, np.int64)
+
+
+class AssignIndex:
+    def __init__(self):
+        self.version = -1
+        self.col = None
+        self.owner = np.zeros(0, dtype=object)  # position -> assignee
+        self.parts = {}                          # assignee -> sorted positions
+        self._lock = threading.Lock()
+        self.builds = self.moves = 0
+
+    # --- BUILD / SYNC ---
+    def sync(self, store):
+        if store.version == self.version or store.df is None: return
+        with self._lock:
+            df, version = store.df, store.version
+            col = store.find_col("Assign")
+            touched = store.changes_since(self.version)
+            if col is None: self.col, self.owner, self.parts = None, np.zeros(0, dtype=object), {}
+            elif touched is None or col != self.col: self._build(df, col)
+            elif touched: self._move(df, sorted(touched))
+            self.version = version
+
+    def _build(self, df, col):
+        owner = df[col].astype(str).str.strip().to_numpy(dtype=object)
+        groups = pd.Series(np.arange(len(owner))).groupby(owner).indices
+        self.col, self.owner = col, owner
+        self.parts = {k: np.asarray(v, np.int64) for k, v in groups.items() if k}
+        self.builds += 1
+
+    def _move(self, df, positions):
+        pos = np.asarray(positions, np.int64)
+        new = df[self.col].iloc[pos].astype(str).str.strip().to_numpy(dtype=object)
+        if len(df) > len(self.owner):  # appended rows start out unowned
+            self.owner = np.concatenate([self.owner, np.full(len(df) - len(self.owner), '', dtype=object)])
+        old = self.owner[pos]
+        moved = old != new
+        if not moved.any(): return
+        pos, old, new = pos[moved], old[moved], new[moved]
+        for name in set(old) - {''}:
+            self.parts[name] = np.setdiff1d(self.parts.get(name, EMPTY), pos[old == name], assume_unique=True)
+            if not len(self.parts[name]): del self.parts[name]
+        for name in set(new) - {''}:
+            self.parts[name] = np.union1d(self.parts.get(name, EMPTY), pos[new == name])
+        self.owner = self.owner.copy(); self.owner[pos] = new
+        self.moves += len(pos)
+
+    # --- QUERY ---
+    def positions(self, *names):
+        # Sorted positions owned by any of names (a user can be assigned by username or by full name)
+        with self._lock:
+            arrays = [self.parts[n] for n in {str(n).strip() for n in names} if n in self.parts]
+        if not arrays: return EMPTY
+        return arrays[0] if len(arrays) == 1 else np.unique(np.concatenate(arrays))
+
+    def sizes(self):
+        with self._lock: return {k: len(v) for k, v in self.parts.items()}
@@ -0,0 +1,80 @@
+# --- PIPELINE CLASSIFICATION ---
+# Runs once whenever the lead store publishes a new frame. Follow-up dates are
+# parsed vectorised and every distinct Status is classified once through a lookup
+# table (seeded from PIPELINE_OPTS), so the CRM tabs become plain boolean masks
+# over precomputed columns instead of regex passes on every refresh. Local
+# patches and deltas that only edit rows reclassify just those rows.
+import re
+
+import numpy as np
+import pandas as pd
+
+from common import PIPELINE_OPTS, get_status_icon
+from compact import put
+
+DEAD_RE = re.compile("Closed|Booked|Junk|Invalid|Agent", re.I)
+RECYCLE_RE = re.compile("Lost|Price|Location|Not Interest", re.I)
+NEW_RE = re.compile("Naya|New", re.I)
+
+BUCKETS = ["Live", "Recycle", "Closed"]
+DERIVED_COLS = ['PD', 'Bucket', 'Naya', 'Icon', 'Display']
+
+
+def status_label(status): return "Lost" if "Lost" in status else status.split(" /")[0]
+
+
+def status_info(status):
+    s = str(status)
+    bucket = "Closed" if DEAD_RE.search(s) else "Recycle" if RECYCLE_RE.search(s) else "Live"
+    return bucket, bool(NEW_RE.search(s)), get_status_icon(s), status_label(s)
+
+
+STATUS_TABLE = {s: status_info(s) for s in PIPELINE_OPTS}
+_EMPTY = status_info("")
+
+
+def _follow_col(df): return next((c for c in df.columns if "Follow" in c), None)
+
+
+def classify(df, touched=None):
+    # Adds PD (datetime64 follow-up), Bucket (Live/Recycle/Closed), Naya, Icon and Display.
+    # touched: positions edited in a frame that was already classified; only those rows are redone.
+    if touched is not None and all(c in df.columns for c in DERIVED_COLS): return _reclassify(df, sorted(touched))
+    f_col = _follow_col(df)
+    if f_col: df['PD'] = pd.to_datetime(df[f_col].astype(str).str.strip(), format="%Y-%m-%d", errors='coerce')
+    else: df['PD'] = pd.NaT
+
+    status = df['Status'] if 'Status' in df.columns else pd.Series('', index=df.index)
+    # Store frames already hold Status as a categorical (compact.pack); don't rebuild it
+    cat = status if isinstance(status.dtype, pd.CategoricalDtype) else status.astype(str).astype('category')
+    # One lookup per distinct status (a few dozen), then broadcast by category code;
+    # code -1 (missing) picks the trailing _EMPTY entry.
+    info = [STATUS_TABLE.get(c) or status_info(c) for c in cat.cat.categories] + [_EMPTY]
+    codes = cat.cat.codes.to_numpy()
+    def pick(k): return np.array([i[k] for i in info], dtype=object)[codes]
+    df['Bucket'] = pd.Categorical(pick(0), categories=BUCKETS)
+    df['Naya'] = pick(1).astype(bool)
+    df['Icon'] = pd.Categorical(pick(2))
+    df['Display'] = pd.Categorical(pick(3))
+    return df
+
+
+def _reclassify(df, pos):
+    if not pos: return df
+    f_col = _follow_col(df)
+    if f_col:
+        pd_ = pd.to_datetime(df[f_col].iloc[pos].astype(str).str.strip(), format="%Y-%m-%d", errors='coerce')
+        df.iloc[pos, df.columns.get_loc('PD')] = pd_.to_numpy()
+    status = df['Status'].iloc[pos].astype(str) if 'Status' in df.columns else [''] * len(pos)
+    info = [STATUS_TABLE.get(s) or status_info(s) for s in status]
+    for k, col in enumerate(('Bucket', 'Naya', 'Icon', 'Display')):
+        vals = [i[k] for i in info]
+        if col == 'Naya': df.iloc[pos, df.columns.get_loc(col)] = vals
+        else: put(df, pos, col, vals)
+    return df
+
+
+def bucket_positions(df, bucket, within=None):
+    # Positions (optionally restricted to `within`) whose Bucket is `bucket`
+    pos = np.arange(len(df)) if within is None else np.asarray(within, dtype=np.int64)
+    return pos[df['Bucket'].cat.codes.to_numpy()[pos] == BUCKETS.index(bucket)]
@@ -0,0 +1,170 @@
+# --- SHEETS QUOTA GOVERNOR ---
+# Google meters Sheets API requests per minute per service account, separately
+# for reads and writes. Every storage call the app makes (script, fragments,
+# write-behind worker, change feed, sync daemon, archiver, CSV import) goes
+# through one governor that wraps the spreadsheet handle (governor.wrap), like
+# the instrumentation proxy does:
+#   - one token bucket per kind (read / write), sized to the per-minute quota
+#     and refilled continuously; one token per request (a batch_get of many
+#     ranges is one request)
+#   - lanes, highest priority first: save (lead edits, adds, bulk actions),
+#     read (what a user is waiting to see), poll (change feed, sync daemon),
+#     bulk (CSV import, archiving). A lane may not dip into the share of the
+#     bucket RESERVE keeps for the lanes above it, and waits while a higher
+#     lane is waiting on the same bucket
+#   - near the limit, polls are shed at once (their callers back off and try
+#     again), bulk work waits up to MAX_WAIT and the others queue. A caller
+#     that runs out of wait gets Throttled, which reads as a quota error
+#     everywhere (common.is_quota_error), so it's retried like a 429
+#   - a real 429 (another client on the same account) empties the bucket
+# The lane comes from `with governor.priority(lane)`, else the worker thread's
+# name (THREAD_LANES), else save for writes and read for reads. Work handed to
+# a thread pool (the store's block fetches) keeps its caller's lane via carry().
+# Buckets are per process: with several server processes, give each its share
+# of the quota (CRM_READS_PER_MIN / CRM_WRITES_PER_MIN).
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from common import is_quota_error
+
+READS_PER_MIN = int(os.environ.get("CRM_READS_PER_MIN", 60))
+WRITES_PER_MIN = int(os.environ.get("CRM_WRITES_PER_MIN", 60))
+
+SAVE, READ, POLL, BULK = range(4)
+LANES = ("save", "read", "poll", "bulk")
+RESERVE = (0.0, 0.1, 0.3, 0.5)       # share of the bucket a lane leaves to the lanes above it
+MAX_WAIT = (60.0, 20.0, 0.0, 120.0)  # seconds a lane waits for a token before giving up
+THREAD_LANES = {"crm-write-behind": SAVE, "crm-change-feed": POLL, "crm-sync": POLL, "crm-archive": BULK}
+
+READ_OPS = ("get_all_records", "get_all_values", "find", "row_values", "col_values", "batch_get",
+            "worksheet", "worksheets", "get_worksheet")
+WRITE_OPS = ("batch_update", "append_row", "append_rows", "delete_rows", "add_worksheet")
+HANDLE_OPS = ("worksheet", "worksheets", "get_worksheet", "add_worksheet")
+
+_lane = ContextVar("crm_lane", default=None)  # set by priority() / carry()
+
+
+def carry(fn):
+    # fn to run on a pool thread under the calling thread's lane (the pool's thread names map to none)
+    lane = _lane.get()
+    if lane is None: lane = THREAD_LANES.get(threading.current_thread().name)
+    if lane is None: return fn
+    def run(*a, **kw):
+        token = _lane.set(lane)
+        try: return fn(*a, **kw)
+        finally: _lane.reset(token)
+    return run
+
+
+class Throttled(Exception):
+    def __init__(self, lane, kind, waited):
+        super().__init__(f"Sheets quota: {LANES[lane]} {kind} request not sent after {waited:.1f}s")
+        self.lane, self.kind = lane, kind
+
+
+class _Bucket:
+    def __init__(self, per_min):
+        self.capacity = float(per_min)
+        self.rate = per_min / 60.0
+        self.tokens = self.capacity
+        self.at = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.at) * self.rate)
+        self.at = now
+
+
+class QuotaGovernor:
+    def __init__(self, reads_per_min=READS_PER_MIN, writes_per_min=WRITES_PER_MIN, max_wait=MAX_WAIT):
+        self.buckets = {'read': _Bucket(reads_per_min), 'write': _Bucket(writes_per_min)}
+        self.max_wait = max_wait
+        self.waiting = {k: [0] * len(LANES) for k in self.buckets}  # kind -> callers queued per lane
+        self.stats = {l: {'calls': 0, 'waited': 0, 'wait_ms': 0.0, 'max_wait_ms': 0.0, 'shed': 0} for l in LANES}
+        self.quota_errors = 0
+        self._cond = threading.Condition()
+
+    # --- LANES ---
+    def lane(self, kind):
+        lane = _lane.get()
+        if lane is not None: return lane
+        return THREAD_LANES.get(threading.current_thread().name, SAVE if kind == 'write' else READ)
+
+    @contextmanager
+    def priority(self, lane):
+        token = _lane.set(lane)
+        try: yield
+        finally: _lane.reset(token)
+
+    # --- TOKENS ---
+    def acquire(self, kind, lane=None):
+        lane = self.lane(kind) if lane is None else lane
+        b, queued = self.buckets[kind], self.waiting[kind]
+        floor = b.capacity * RESERVE[lane]
+        t0 = time.monotonic()
+        deadline = t0 + self.max_wait[lane]
+        with self._cond:
+            queued[lane] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    b.refill(now)
+                    if not any(queued[:lane]) and b.tokens - 1 >= floor:
+                        b.tokens -= 1
+                        break
+                    if now >= deadline:
+                        self.stats[LANES[lane]]['shed'] += 1
+                        raise Throttled(lane, kind, now - t0)
+                    self._cond.wait(min(max((floor + 1 - b.tokens) / b.rate, 0.01), deadline - now))
+            finally:
+                queued[lane] -= 1
+                self._cond.notify_all()
+            s, ms = self.stats[LANES[lane]], (time.monotonic() - t0) * 1000
+            s['calls'] += 1
+            if ms >= 1:
+                s['waited'] += 1; s['wait_ms'] += ms
+                s['max_wait_ms'] = max(s['max_wait_ms'], ms)
+
+    def throttle(self, kind):
+        # The API said 429 anyway (someone else on the same account): nothing left this minute
+        with self._cond:
+            self.buckets[kind].tokens = 0.0
+            self.buckets[kind].at = time.monotonic()
+            self.quota_errors += 1
+
+    # --- METRICS ---
+    def metrics(self):
+        now = time.monotonic()
+        with self._cond:
+            for b in self.buckets.values(): b.refill(now)
+            kinds = {k: {'tokens': round(b.tokens, 1), 'per_min': int(b.capacity), 'queued': sum(self.waiting[k])}
+                     for k, b in self.buckets.items()}
+            lanes = [{'lane': l, 'queued': sum(self.waiting[k][i] for k in self.buckets), **self.stats[l],
+                      'wait_ms': round(self.stats[l]['wait_ms'], 1), 'max_wait_ms': round(self.stats[l]['max_wait_ms'], 1)}
+                     for i, l in enumerate(LANES)]
+        return {'kinds': kinds, 'lanes': lanes, 'quota_errors': self.quota_errors}
+
+    def wrap(self, obj): return obj if obj is None or isinstance(obj, Governed) else Governed(obj, self)
+
+
+class Governed:
+    # Proxy: every API call takes a token first; worksheet handles come back governed too
+    def __init__(self, obj, governor):
+        self._obj, self._gov = obj, governor
+
+    def __getattr__(self, name):
+        attr = getattr(self._obj, name)
+        if name == "spreadsheet": return self._gov.wrap(attr)
+        kind = 'write' if name in WRITE_OPS else 'read' if name in READ_OPS else None
+        if kind is None or not callable(attr): return attr
+        def call(*a, **kw):
+            self._gov.acquire(kind)
+            try: res = attr(*a, **kw)
+            except Exception as e:
+                if is_quota_error(e): self._gov.throttle(kind)
+                raise
+            if name not in HANDLE_OPS: return res
+            return [self._gov.wrap(w) for w in res] if isinstance(res, list) else self._gov.wrap(res)
+        return call
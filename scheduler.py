@@ -0,0 +1,166 @@
+# --- FOLLOW-UP SCHEDULER ---
+# Date-ordered follow-up index over the shared lead store, so the Action and
+# Future tabs are slices instead of a date comparison + sort per render.
+#   - per assignee (and ALL, for managers): a sorted int64 array of keys
+#     (follow-up day << 32 | row position) for Live leads with a follow-up
+#     date, plus the sorted positions of Live "Naya" leads
+#   - follows the store's change log like the search / assignment indexes, so
+#     a modal save with "Kal (Tom)" / "3 Din" / Custom moves just that lead
+#   - each assignee's day (Overdue / Aaj / Action / Future) is materialised
+#     when the IST date rolls over, and redone only for assignees whose leads
+#     changed since
+# Action keeps the sheet order the tab always had (Overdue ∪ Aaj ∪ Naya);
+# Future is in follow-up date order.
+import threading
+
+import numpy as np
+import pandas as pd
+
+from pipeline import BUCKETS, bucket_positions
+
+ALL = None  # owner key for the whole store
+EMPTY = np.zeros(0, np.int64)
+_LOW = (1 << 32) - 1
+NO_KEY = -1
+
+
+def _day(d): return int(np.datetime64(pd.Timestamp(d).date(), 'D').astype(np.int64))
+
+
+def _pos(keys): return keys & _LOW
+
+
+class FollowUpSchedule:
+    def __init__(self):
+        self.version = -1
+        self.col = None
+        self.owner = np.zeros(0, dtype=object)  # position -> assignee
+        self.key = np.zeros(0, np.int64)         # position -> key, NO_KEY when not scheduled
+        self.naya = np.zeros(0, bool)            # position -> Live & Naya
+        self.keys = {}   # owner -> sorted keys
+        self.new = {}    # owner -> sorted Naya positions
+        self.day = None
+        self.daily = {}  # owner -> {'Overdue', 'Aaj', 'Action', 'Future'} for self.day
+        self._lock = threading.Lock()
+        self.builds = self.moves = self.materialized = 0
+
+    # --- BUILD / SYNC ---
+    def sync(self, store):
+        if store.version == self.version or store.df is None: return
+        with self._lock:
+            df, version = store.df, store.version
+            col = store.find_col("Assign")
+            touched = store.changes_since(self.version)
+            if touched is None or col != self.col: self._build(df, col)
+            elif touched: self._move(df, sorted(touched))
+            self.version = version
+
+    def _rows(self, df, pos=None):
+        # (owner, key, naya) arrays for the given positions (all rows when None)
+        sub = df if pos is None else df.iloc[pos]
+        n = len(sub)
+        at = np.arange(n, dtype=np.int64) if pos is None else np.asarray(pos, np.int64)
+        owner = (sub[self.col].astype(str).str.strip().to_numpy(dtype=object) if self.col
+                 else np.full(n, '', dtype=object))
+        live = sub['Bucket'].cat.codes.to_numpy() == BUCKETS.index("Live")
+        pd_ = sub['PD'].to_numpy().astype('datetime64[D]')
+        has = live & ~np.isnat(pd_)
+        key = np.full(n, NO_KEY, np.int64)
+        key[has] = (pd_[has].astype(np.int64) << 32) | at[has]
+        return owner, key, live & sub['Naya'].to_numpy()
+
+    def _build(self, df, col):
+        self.col = col
+        self.owner, self.key, self.naya = self._rows(df)
+        pos = np.arange(len(df), dtype=np.int64)
+        sched = self.key != NO_KEY
+        order = np.argsort(self.key[sched], kind='stable')
+        k_sorted, k_owner = self.key[sched][order], self.owner[sched][order]
+        self.keys = {ALL: k_sorted}
+        self.keys.update({o: k_sorted[ix] for o, ix in pd.Series(k_owner).groupby(k_owner).indices.items() if o})
+        n_pos, n_owner = pos[self.naya], self.owner[self.naya]
+        self.new = {ALL: n_pos}
+        self.new.update({o: n_pos[ix] for o, ix in pd.Series(n_owner).groupby(n_owner).indices.items() if o})
+        self.day, self.daily = None, {}
+        self.builds += 1
+
+    def _move(self, df, positions):
+        pos = np.asarray(positions, np.int64)
+        n = len(df)
+        if n > len(self.owner):  # appended rows start out unscheduled and unowned
+            grow = n - len(self.owner)
+            self.owner = np.concatenate([self.owner, np.full(grow, '', dtype=object)])
+            self.key = np.concatenate([self.key, np.full(grow, NO_KEY, np.int64)])
+            self.naya = np.concatenate([self.naya, np.zeros(grow, bool)])
+        owner, key, naya = self._rows(df, pos)
+        o_owner, o_key, o_naya = self.owner[pos], self.key[pos], self.naya[pos]
+        moved = (owner != o_owner) | (key != o_key) | (naya != o_naya)
+        if not moved.any(): return
+        pos, owner, key, naya = pos[moved], owner[moved], key[moved], naya[moved]
+        o_owner, o_key, o_naya = o_owner[moved], o_key[moved], o_naya[moved]
+        touched = set()
+        for o in set(o_owner) | set(owner) | {ALL}:
+            was, now = (o_owner == o, owner == o) if o is not ALL else (np.ones(len(pos), bool),) * 2
+            drop_k, add_k = o_key[was & (o_key != NO_KEY)], key[now & (key != NO_KEY)]
+            drop_n, add_n = pos[was & o_naya], pos[now & naya]
+            if not (len(drop_k) or len(add_k) or len(drop_n) or len(add_n)) or o == '': continue
+            self.keys[o] = np.union1d(np.setdiff1d(self.keys.get(o, EMPTY), drop_k, assume_unique=True), add_k)
+            self.new[o] = np.union1d(np.setdiff1d(self.new.get(o, EMPTY), drop_n, assume_unique=True), add_n)
+            touched.add(o)
+        self.owner, self.key, self.naya = self.owner.copy(), self.key.copy(), self.naya.copy()
+        self.owner[pos], self.key[pos], self.naya[pos] = owner, key, naya
+        for o in touched: self.daily.pop(o, None)
+        self.moves += len(pos)
+
+    # --- DAILY QUEUES ---
+    def _materialize(self, o):
+        keys = self.keys.get(o, EMPTY)
+        t = _day(self.day)
+        a, b = np.searchsorted(keys, [t << 32, (t + 1) << 32])
+        q = {'Overdue': _pos(keys[:a]), 'Aaj': _pos(keys[a:b]), 'Future': _pos(keys[b:])}
+        q['Action'] = np.union1d(_pos(keys[:b]), self.new.get(o, EMPTY))
+        self.daily[o] = q
+        self.materialized += 1
+        return q
+
+    def _roll(self, today):
+        # IST midnight: every owner's queue is rebuilt once for the new day
+        if today != self.day:
+            self.day, self.daily = today, {}
+            for o in list(self.keys): self._materialize(o)
+
+    def queues(self, today, owners=None):
+        # owners: assignee names to merge (a telecaller), or None for everyone
+        with self._lock:
+            self._roll(today)
+            if owners is None: return self.daily.get(ALL) or self._materialize(ALL)
+            qs = [self.daily.get(o) or self._materialize(o) for o in {str(o).strip() for o in owners} if o]
+        if len(qs) == 1: return qs[0]
+        out = {k: np.unique(np.concatenate([q[k] for q in qs] or [EMPTY])) for k in ('Overdue', 'Aaj', 'Action')}
+        # Future across owners: back to date order
+        with self._lock:
+            fut = np.concatenate([self.key[q['Future']] for q in qs] or [EMPTY])
+        out['Future'] = _pos(np.sort(fut))
+        return out
+
+    # --- CAPACITY ---
+    def capacity(self, today, days=7):
+        # Day-ahead load per assignee: follow-ups overdue / today / tomorrow / within `days`, plus open Naya leads
+        t = _day(today)
+        edges = [t << 32, (t + 1) << 32, (t + 2) << 32, (t + days + 1) << 32]
+        with self._lock:
+            owners = (set(self.keys) | set(self.new)) - {ALL}
+            rows = []
+            for o in owners:
+                a, b, c, d = np.searchsorted(self.keys.get(o, EMPTY), edges)
+                rows.append({'Assign': o, 'Overdue': int(a), 'Aaj': int(b - a), 'Kal': int(c - b),
+                             f'Agle {days} din': int(d - b), 'Naya': len(self.new.get(o, EMPTY))})
+        return sorted(rows, key=lambda r: (-(r['Overdue'] + r['Aaj'] + r['Kal']), r['Assign']))
+
+
+def tab_positions(sched, df, today, owners=None, view=None):
+    # The Leads page's tabs as row positions into df: Action/Future are slices of the (synced) schedule's queues,
+    # Recycle/Closed read the precomputed Bucket, restricted to `view` (a telecaller's partition) if given
+    tabs = {k: v[v < len(df)] for k, v in sched.queues(today, owners).items() if k in ("Action", "Future")}
+    tabs.update(Recycle=bucket_positions(df, "Recycle", view), History=bucket_positions(df, "Closed", view))
+    return tabs
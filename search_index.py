@@ -0,0 +1,174 @@
+# --- LEAD SEARCH INDEX ---
+# In-memory index over the shared lead store, so the search box no longer
+# regex-scans every cell of the frame on each rerun. Positions are row positions
+# in the store frame. Supported matches:
+#   - name: word prefix ("ram" -> "Ramesh Kumar"), via a sorted token list
+#   - phone: any digit run of MIN_DIGITS+ inside the last 10 digits, via one
+#     fixed-width digit blob searched with str.find
+#   - tag / source: substring over the (few) distinct values
+#   - Lead ID: exact
+# Query terms are ANDed; results are ranked by score, newest lead first on ties.
+#
+# The bulk of the index is a compiled "base" (numpy posting arrays). Rows that
+# change afterwards go into a small overlay that is scored row by row and masks
+# their stale base entries; the base is recompiled once the overlay gets big.
+import bisect
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+MIN_DIGITS = 3
+SEARCH_LIMIT = 200
+REBUILD_AT = 2000  # overlay rows before the base is recompiled
+_W = 11  # 10 digits + separator per row in the phone blob
+_HI = '\U0010ffff'
+
+# Scores per kind of hit; a term keeps its best hit per lead
+S_PHONE_EXACT, S_PHONE_END, S_PHONE_ANY = 100, 60, 30
+S_ID, S_NAME_EXACT, S_NAME_PREFIX = 100, 40, 20
+S_TAG, S_SOURCE = 15, 5
+
+
+def _tokens(name): return [t for t in re.split(r'\W+', str(name).lower()) if t]
+
+
+def _phone_score(off, n):
+    end = off + n == 10
+    return S_PHONE_EXACT if end and n == 10 else S_PHONE_END if end else S_PHONE_ANY
+
+
+def lead_fields(df):
+    # (name, phone10, lead id, tag, source) column lists for a frame
+    cols = list(df.columns)
+    tag = next((c for c in cols if "Tag" in c or "Label" in c), None)
+    id_col = next((c for c in cols if "Lead ID" in c), cols[0] if cols else None)
+    def col(c): return df[c].astype(str).fillna('').tolist() if c in df.columns else [''] * len(df)
+    phones = (df['Phone'].astype(str).fillna('').str.replace(r'\D', '', regex=True).str[-10:].tolist()
+              if 'Phone' in df.columns else [''] * len(df))
+    return col('Client Name'), phones, col(id_col), col(tag), col('Source')
+
+
+def _clean(v):
+    v = v.strip().lower()
+    return '' if v == 'nan' else v
+
+
+class SearchIndex:
+    def __init__(self):
+        self.version = -1
+        self.n = 0
+        self._lock = threading.Lock()
+        self.tokens, self.tok_pos = [], np.zeros(0, np.int64)
+        self.blob = ""
+        self.ids = {}
+        self.fields = {'tag': {}, 'source': {}}  # value -> np.array(positions)
+        self.overlay = {}  # pos -> (tokens, phone, id, tag, source) for rows changed since the base build
+        self.builds = 0
+
+    # --- BUILD / SYNC ---
+    def sync(self, store):
+        if store.version == self.version or store.df is None: return
+        with self._lock:
+            df, version = store.df, store.version
+            touched = store.changes_since(self.version)
+            if touched is None or len(self.overlay) + len(touched) > REBUILD_AT: self._build(df)
+            else:
+                fields = lead_fields(df.iloc[sorted(touched)])
+                for pos, n, p, i, t, s in zip(sorted(touched), *fields):
+                    self.overlay[pos] = (_tokens(n), p, i.strip(), _clean(t), _clean(s))
+            self.version = version
+
+    def _build(self, df):
+        names, phones, ids, tags, sources = lead_fields(df)
+        n = len(df)
+        toks = pd.Series(names).str.lower().str.split(r'\W+', regex=True).explode()
+        toks = toks[toks.notna() & (toks != '')]
+        order = np.argsort(toks.to_numpy(dtype=object), kind='stable')
+        self.tokens = toks.to_numpy(dtype=object)[order].tolist()
+        self.tok_pos = toks.index.to_numpy()[order]
+        self.blob = "".join(p.rjust(10) + "\n" for p in phones)
+        self.ids = {}
+        for pos, i in enumerate(ids):
+            i = i.strip()
+            if i: self.ids.setdefault(i, pos)
+        for k, vals in (('tag', tags), ('source', sources)):
+            groups = pd.Series(np.arange(n)).groupby([_clean(v) for v in vals]).indices
+            self.fields[k] = {v: a for v, a in groups.items() if v}
+        self.n, self.overlay = n, {}
+        self.builds += 1
+
+    # --- QUERY ---
+    def _base_scores(self, term, digits):
+        sc = np.zeros(self.n, np.int16)
+        def hit(pos, score): sc[pos] = np.maximum(sc[pos], score)
+        if digits:
+            i, blob, d = 0, self.blob, len(digits)
+            while True:
+                i = blob.find(digits, i)
+                if i < 0: break
+                pos, off = divmod(i, _W)
+                if off + d <= 10: hit(pos, _phone_score(off, d))  # never match across two rows
+                i += 1
+            return sc
+        lead = self.ids.get(term, self.ids.get(term.upper()))
+        if lead is not None: hit(lead, S_ID)
+        t = term.lower()
+        lo = bisect.bisect_left(self.tokens, t)
+        ex = bisect.bisect_right(self.tokens, t, lo)
+        hi = bisect.bisect_left(self.tokens, t + _HI, ex)
+        hit(self.tok_pos[ex:hi], S_NAME_PREFIX); hit(self.tok_pos[lo:ex], S_NAME_EXACT)
+        for field, score in (('tag', S_TAG), ('source', S_SOURCE)):
+            for v, positions in self.fields[field].items():
+                if t in v: hit(positions, score)
+        return sc
+
+    def _row_score(self, row, term, digits):
+        toks, phone, lead_id, tag, source = row
+        if digits:
+            i, best = phone.rjust(10).find(digits), 0
+            while i >= 0:
+                best = max(best, _phone_score(i, len(digits)))
+                i = phone.rjust(10).find(digits, i + 1)
+            return best
+        t, best = term.lower(), 0
+        if lead_id and lead_id in (term, term.upper()): best = S_ID
+        for tok in toks:
+            if tok == t: best = max(best, S_NAME_EXACT)
+            elif tok.startswith(t): best = max(best, S_NAME_PREFIX)
+        if tag and t in tag: best = max(best, S_TAG)
+        if source and t in source: best = max(best, S_SOURCE)
+        return best
+
+    def query(self, q, limit=SEARCH_LIMIT, within=None):
+        # within: optional array of positions to restrict to (e.g. a telecaller's own leads)
+        terms = [t for t in re.split(r'\s+', q.strip()) if t] if q else []
+        if not terms: return []
+        # "98765 43210" style phones are one term
+        if all(re.fullmatch(r'[\d+\-()]+', t) for t in terms): terms = ["".join(terms)]
+        with self._lock:
+            total, alive = np.zeros(self.n, np.int32), np.ones(self.n, bool)
+            extra = {p: 0 for p in self.overlay}
+            for term in terms:
+                digits = re.sub(r'\D', '', term)
+                digits = digits[-10:] if len(digits) >= MIN_DIGITS and len(digits) >= len(re.sub(r'[\s+\-()]', '', term)) else ''
+                sc = self._base_scores(term, digits)
+                alive &= sc > 0; total += sc
+                for p in list(extra):
+                    s = self._row_score(self.overlay[p], term, digits)
+                    if s: extra[p] += s
+                    else: del extra[p]
+            if self.overlay: alive[[p for p in self.overlay if p < self.n]] = False
+        if within is not None:
+            w = np.zeros(self.n, bool); within = np.asarray(within)
+            w[within[within < self.n]] = True; alive &= w
+            allowed = set(within.tolist())
+            extra = {p: s for p, s in extra.items() if p in allowed}
+        cand = np.flatnonzero(alive)
+        keys = (total[cand].astype(np.int64) << 32) | cand  # score first, then newest row
+        if len(cand) > limit: keys = keys[np.argpartition(keys, -limit)[-limit:]]
+        ranked = [(int(k >> 32), int(k & 0xFFFFFFFF)) for k in np.sort(keys)[::-1]]
+        ranked += [(s, p) for p, s in extra.items()]
+        ranked.sort(reverse=True)
+        return [p for _, p in ranked[:limit]]
@@ -0,0 +1,94 @@
+# --- SHARED LEAD SNAPSHOT ---
+# Several Streamlit server processes behind a load balancer each hold their own
+# lead store (st.cache_resource is per process). Instead of every process
+# downloading and parsing the Leads tab, one elected writer publishes its
+# prepared frame as a versioned snapshot file on local disk and the others
+# load that:
+#   - election: whoever holds an exclusive flock on "<path>.lock" is the
+#     writer. The lock goes away with the process, so when the writer exits the
+#     next worker to refresh takes over. The writer touches the lock file on
+#     every refresh tick (heartbeat).
+#   - publish: after a refresh that moved the data version, the writer pickles
+#     the packed, classified frame + Notes + its row-change log to a temp file
+#     and os.replace()s it over the snapshot, so a reader sees the old file or
+#     the new one, never half of one
+#   - follow: readers stat the file on their refresh tick and only load a new
+#     one. Rows the writer's change log says moved (plus the reader's own local
+#     writes) are all the derived indexes redo, like after a delta.
+#   - warm restart: a process starting with an empty store serves the last
+#     snapshot straight away and catches up with its next refresh
+# A reader whose own writes landed after the snapshot was taken keeps its
+# frame until a newer one arrives. With no heartbeat for STALE_SECS a reader
+# fetches from the sheet itself.
+# Only the lead table is shared: each process keeps its own write queue and
+# journal ("<CRM_WRITE_JOURNAL>.<pid>", see write_queue.py), so the processes
+# need a local disk they can all flock, and no two may share a journal file.
+import os
+import pickle
+import time
+import uuid
+
+try: import fcntl
+except ImportError: fcntl = None  # no flock (Windows): every process refreshes itself, and still publishes for restarts
+
+SNAPSHOT_PATH = os.environ.get("CRM_SNAPSHOT_PATH", "leads_snapshot.pkl")
+STALE_SECS = 180
+
+
+class SharedSnapshot:
+    def __init__(self, path=SNAPSHOT_PATH, stale_secs=STALE_SECS):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self.stale_secs = stale_secs
+        self.token = uuid.uuid4().hex  # tells this process's versions apart from another writer's
+        self.published = None  # store version last written
+        self.seen = None       # (mtime_ns, size) of the last file read
+        self._fd = None
+        self.stats = {'published': 0, 'loaded': 0, 'publish_ms': 0.0, 'load_ms': 0.0}
+
+    # --- ELECTION ---
+    def is_writer(self):
+        if fcntl is None or self._fd is not None: return True
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try: fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def fresh(self):
+        # True while the writer's heartbeat is recent
+        try: return time.time() - os.stat(self.lock_path).st_mtime < self.stale_secs
+        except OSError: return False
+
+    # --- WRITE ---
+    def publish(self, store):
+        # Heartbeat, plus a new snapshot when the store's version moved since the last one
+        with open(self.lock_path, 'a'): os.utime(self.lock_path)
+        if store.df is None or store.version == self.published: return False
+        t0 = time.perf_counter()
+        snap = {'token': self.token, 'version': store.version, 'changes': list(store.changes),
+                'fetched_at': store.fetched_at, 'full_at': store.full_at, 'header': list(store.header),
+                'notes_col': store.notes_col, 'df': store.df, 'notes': store.notes}
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f: pickle.dump(snap, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+        self.published = store.version
+        self.stats['published'] += 1; self.stats['publish_ms'] = round((time.perf_counter() - t0) * 1000, 1)
+        return True
+
+    # --- READ ---
+    def read(self):
+        # The snapshot when the file changed since the last read, else None
+        try: st = os.stat(self.path)
+        except OSError: return None
+        mark = (st.st_mtime_ns, st.st_size)
+        if mark == self.seen: return None
+        t0 = time.perf_counter()
+        try:
+            with open(self.path, 'rb') as f: snap = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError): return None
+        self.seen = mark
+        self.stats['loaded'] += 1; self.stats['load_ms'] = round((time.perf_counter() - t0) * 1000, 1)
+        return snap
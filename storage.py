@@ -0,0 +1,217 @@
+# --- STORAGE BACKENDS ---
+# The app and its data modules only use a small slice of gspread, so that slice is
+# the storage API. Any backend returned by open_storage() provides:
+#   spreadsheet: worksheet(title), worksheets(), get_worksheet(i), add_worksheet(title, rows, cols),
+#                batch_update({'requests': [deleteDimension...]})
+#   worksheet:   title, id, spreadsheet, get_all_values(), get_all_records(), row_values(r),
+#                col_values(c), batch_get(ranges), find(value), batch_update([{'range', 'values'}]),
+#                append_row(row), append_rows(rows), delete_rows(start, end=None)
+# "sheets" is the real Google spreadsheet (gspread). "sqlite" keeps every worksheet
+# as a table in a local SQLite file, with the same row numbering as the sheet
+# (header = row 1), so the UI can run at local-disk speed or fully offline.
+import os
+import sqlite3
+import threading
+
+import gspread
+from gspread.cell import Cell
+from gspread.utils import a1_range_to_grid_range
+
+from common import LEADS_HEADER
+
+# sheets | sqlite | mirror (UI on local SQLite, kept in sync with the Google sheet by sync_daemon)
+STORAGE_BACKEND = os.environ.get("CRM_STORAGE", "sheets")
+SQLITE_PATH = os.environ.get("CRM_SQLITE_PATH", "crm.db")
+# Spreadsheet key for the "sheets" backend. Without CRM_SHEET_KEY the first file the
+# service account can see is used, and its key is cached so restarts skip the Drive listing.
+SHEET_KEY = os.environ.get("CRM_SHEET_KEY")
+SHEET_KEY_CACHE = os.environ.get("CRM_SHEET_KEY_CACHE", "sheet_key.txt")
+
+# Header words that get an SQLite index on the Leads table
+INDEXED_COLS = ("Phone", "Assign", "Status", "Follow")
+
+
+class SqliteSpreadsheet:
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.RLock()  # the write-behind worker shares this connection
+        with self.lock, self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS sheets (id INTEGER PRIMARY KEY, title TEXT UNIQUE, width INTEGER)")
+
+    def _q(self, sql, args=()):
+        with self.lock: return self.conn.execute(sql, args).fetchall()
+
+    def worksheets(self):
+        rows = self._q("SELECT id, title FROM sheets ORDER BY id")
+        return [SqliteWorksheet(self, i, t) for i, t in rows]
+
+    def worksheet(self, title):
+        rows = self._q("SELECT id FROM sheets WHERE title = ?", (title,))
+        if not rows: raise gspread.WorksheetNotFound(title)
+        return SqliteWorksheet(self, rows[0][0], title)
+
+    def get_worksheet(self, index):
+        ws = self.worksheets()
+        return ws[index] if index < len(ws) else None
+
+    def add_worksheet(self, title, rows=100, cols=26):
+        with self.lock, self.conn:
+            cur = self.conn.execute("INSERT INTO sheets (title, width) VALUES (?, 0)", (title,))
+            sid = cur.lastrowid
+            self.conn.execute(f"CREATE TABLE ws_{sid} (rn INTEGER NOT NULL)")
+            self.conn.execute(f"CREATE INDEX ix_{sid}_rn ON ws_{sid}(rn)")
+        return SqliteWorksheet(self, sid, title)
+
+    def batch_update(self, body):
+        # Only the request type the app sends: deleteDimension on ROWS (0-based, end exclusive)
+        for req in body.get('requests', []):
+            rng = req['deleteDimension']['range']
+            ws = next(w for w in self.worksheets() if w.id == rng['sheetId'])
+            ws.delete_rows(rng['startIndex'] + 1, rng['endIndex'])
+        return {}
+
+
+class SqliteWorksheet:
+    def __init__(self, sh, sheet_id, title):
+        self.spreadsheet, self.id, self.title = sh, sheet_id, title
+        self.table = f"ws_{sheet_id}"
+
+    @property
+    def _conn(self): return self.spreadsheet.conn
+
+    def _width(self):
+        return self.spreadsheet._q("SELECT width FROM sheets WHERE id = ?", (self.id,))[0][0]
+
+    def _widen(self, n):
+        w = self._width()
+        if n <= w: return
+        for c in range(w + 1, n + 1): self._conn.execute(f"ALTER TABLE {self.table} ADD COLUMN c{c} TEXT DEFAULT ''")
+        self._conn.execute("UPDATE sheets SET width = ? WHERE id = ?", (n, self.id))
+
+    def _ensure_indexes(self):
+        header = self.row_values(1)
+        for word in INDEXED_COLS:
+            c = next((i + 1 for i, h in enumerate(header) if word.lower() in str(h).lower()), None)
+            if c: self._conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.id}_c{c} ON {self.table}(c{c})")
+
+    def _rows(self, r0=1, r1=None, c0=1, c1=None):
+        w = self._width()
+        c1 = min(c1 or w, w)
+        if c1 < c0: return []
+        cols = ", ".join(f"c{c}" for c in range(c0, c1 + 1))
+        sql = f"SELECT {cols} FROM {self.table} WHERE rn >= ?" + (" AND rn <= ?" if r1 else "") + " ORDER BY rn"
+        return [list(r) for r in self.spreadsheet._q(sql, (r0, r1) if r1 else (r0,))]
+
+    # --- READS ---
+    def get_all_values(self): return self._rows()
+
+    def get_all_records(self):
+        vals = self._rows()
+        if not vals: return []
+        return [dict(zip(vals[0], r)) for r in vals[1:]]
+
+    def row_values(self, r):
+        rows = self._rows(r, r)
+        return _trim(rows[0]) if rows else []
+
+    def col_values(self, c):
+        if c > self._width(): return []
+        vals = [r[0] for r in self._rows(c0=c, c1=c)]
+        while vals and vals[-1] == '': vals.pop()
+        return vals
+
+    def batch_get(self, ranges):
+        out = []
+        for rng in ranges:
+            g = a1_range_to_grid_range(rng)
+            rows = self._rows(g.get('startRowIndex', 0) + 1, g.get('endRowIndex'), g.get('startColumnIndex', 0) + 1, g.get('endColumnIndex'))
+            # Like the Sheets API: trailing empty cells and rows are left out
+            rows = [_trim(r) for r in rows]
+            while rows and not rows[-1]: rows.pop()
+            out.append(rows)
+        return out
+
+    def find(self, query):
+        w = self._width()
+        if not w: return None
+        where = " OR ".join(f"c{c} = ?" for c in range(1, w + 1))
+        rows = self.spreadsheet._q(f"SELECT rn, * FROM {self.table} WHERE {where} ORDER BY rn LIMIT 1", (str(query),) * w)
+        if not rows: return None
+        row = rows[0]
+        col = next(i for i, v in enumerate(row[2:], 1) if v == str(query))
+        return Cell(row[0], col, str(query))
+
+    # --- WRITES ---
+    def append_rows(self, rows, **kwargs):
+        if not rows: return
+        with self.spreadsheet.lock, self._conn:
+            self._widen(max(len(r) for r in rows))
+            w = self._width()
+            start = (self._conn.execute(f"SELECT MAX(rn) FROM {self.table}").fetchone()[0] or 0) + 1
+            cols = ", ".join(["rn"] + [f"c{c}" for c in range(1, w + 1)])
+            marks = ", ".join("?" * (w + 1))
+            data = [[start + i] + [str(v) for v in r] + [''] * (w - len(r)) for i, r in enumerate(rows)]
+            self._conn.executemany(f"INSERT INTO {self.table} ({cols}) VALUES ({marks})", data)
+            if start == 1: self._ensure_indexes()
+
+    def append_row(self, row, **kwargs): self.append_rows([row])
+
+    def batch_update(self, data, **kwargs):
+        with self.spreadsheet.lock, self._conn:
+            for item in data:
+                g = a1_range_to_grid_range(item['range'])
+                r0, c0 = g.get('startRowIndex', 0) + 1, g.get('startColumnIndex', 0) + 1
+                for dr, vals in enumerate(item['values']):
+                    self._widen(c0 + len(vals) - 1)
+                    for dc, v in enumerate(vals):
+                        self._conn.execute(f"UPDATE {self.table} SET c{c0 + dc} = ? WHERE rn = ?", (str(v), r0 + dr))
+            if any(a1_range_to_grid_range(i['range']).get('startRowIndex', 0) == 0 for i in data): self._ensure_indexes()
+        return {}
+
+    def delete_rows(self, start, end=None):
+        end = end or start
+        with self.spreadsheet.lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE rn BETWEEN ? AND ?", (start, end))
+            self._conn.execute(f"UPDATE {self.table} SET rn = rn - ? WHERE rn > ?", (end - start + 1, end))
+        return {}
+
+
+def _trim(row):
+    row = list(row)
+    while row and row[-1] == '': row.pop()
+    return row
+
+
+def leads_worksheet(sh):
+    # First tab with "lead" in its title, else the first tab (same rule as the login block always used)
+    return next((ws for ws in sh.worksheets() if "lead" in ws.title.lower()), None) or sh.get_worksheet(0)
+
+
+def _cached_key():
+    try:
+        with open(SHEET_KEY_CACHE) as f: return f.read().strip() or None
+    except OSError: return None
+
+
+def _save_key(key):
+    try:
+        with open(SHEET_KEY_CACHE, "w") as f: f.write(key)
+    except OSError: pass  # read-only disk: just list again next start
+
+
+def open_storage(backend=STORAGE_BACKEND, client=None, path=SQLITE_PATH, key=SHEET_KEY):
+    # client: authorised gspread client, only needed for the "sheets" backend
+    if backend in ("sqlite", "mirror"):
+        sh = SqliteSpreadsheet(path)
+        # A fresh local database still needs a Leads tab for the app's worksheet discovery
+        if not any("lead" in ws.title.lower() for ws in sh.worksheets()): sh.add_worksheet("Leads").append_row(LEADS_HEADER)
+        return sh
+    key = key or _cached_key()
+    if key:
+        try: return client.open_by_key(key)
+        except gspread.SpreadsheetNotFound: pass  # stale cache (sheet deleted/unshared): list again
+    files = client.list_spreadsheet_files()
+    if not files: return None
+    _save_key(files[0]['id'])
+    return client.open_by_key(files[0]['id'])
@@ -0,0 +1,228 @@
+# --- SHEETS <-> SQLITE SYNC ---
+# CRM_STORAGE=mirror: the app reads and writes a local SQLite copy (storage.py),
+# while managers keep editing the Google sheet directly. This daemon mirrors the
+# Leads, Users and Notes Log tabs both ways every SYNC_SECS.
+#
+# Each cycle reads the remote tab once (get_all_values) and the local tab, and
+# merges row by row (keyed by Lead ID / Username) against the last synced copy
+# of that row (the "base", kept in the same SQLite file):
+#   - field changed on one side only  -> copied to the other side
+#   - field changed on both sides     -> conflict: the side with the newer
+#     "Last Call" wins (remote on ties), and it is written to sync_conflicts
+#   - row new on one side             -> appended to the other
+#   - row deleted on one side         -> deleted on the other (logged as a
+#     conflict if the other side had edited it)
+# Remote writes per tab are at most one batch_update, one deleteDimension
+# batch and one append_rows, so a cycle costs 1-4 API calls per tab.
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from gspread.utils import rowcol_to_a1
+
+from notes_log import LOG_TAB, log_worksheet
+from storage import leads_worksheet
+
+SYNC_SECS = float(os.environ.get("CRM_SYNC_SECS", 15))
+BACKOFF_MAX = 300.0
+HISTORY = 100  # cycles kept for the metrics panel
+
+# tab -> (key column words, tie-break column words)
+TABS = {"Leads": (("Lead ID",), ("Last Call",)), "Users": (("Username",), ()), LOG_TAB: (("Entry ID",), ())}
+
+
+def _col(header, words):
+    return next((i for w in words for i, h in enumerate(header) if w.lower() in str(h).lower()), None)
+
+
+def _keyed(vals, key_i):
+    # key -> (sheet row number, {header: value}); first occurrence wins, blank keys are skipped
+    if not vals: return {}
+    header, out = vals[0], {}
+    for r, row in enumerate(vals[1:], 2):
+        key = str(row[key_i]).strip() if key_i is not None and key_i < len(row) else ''
+        if key and key not in out: out[key] = (r, {h: str(row[i]) if i < len(row) else '' for i, h in enumerate(header) if h})
+    return out
+
+
+class SyncService:
+    def __init__(self, remote, local, interval=SYNC_SECS, on_pull=None, start=True):
+        # remote: gspread Spreadsheet, local: storage.SqliteSpreadsheet
+        # on_pull(tab): called after upstream changes landed locally (e.g. to resync the lead store)
+        self.remote, self.local = remote, local
+        self.interval = interval
+        self.on_pull = on_pull
+        self.history = deque(maxlen=HISTORY)
+        self.totals = {'cycles': 0, 'pulled': 0, 'pushed': 0, 'conflicts': 0, 'api_calls': 0, 'errors': 0}
+        self.last_ok = None
+        self.last_error = None
+        self._ws = {}
+        self._lock = threading.Lock()  # one cycle at a time (worker vs. "Sync now")
+        local._q("CREATE TABLE IF NOT EXISTS sync_base (tab TEXT, key TEXT, row TEXT, PRIMARY KEY (tab, key))")
+        local._q("CREATE TABLE IF NOT EXISTS sync_conflicts (ts REAL, tab TEXT, key TEXT, field TEXT, "
+                 "local TEXT, remote TEXT, base TEXT, winner TEXT)")
+        self._worker = None
+        if start:
+            self._worker = threading.Thread(target=self._run, name="crm-sync", daemon=True)
+            self._worker.start()
+
+    # --- METRICS ---
+    def lag(self):
+        # Seconds since both sides were last known to agree
+        return time.time() - self.last_ok if self.last_ok else None
+
+    def metrics(self):
+        return {**self.totals, 'lag_secs': round(self.lag(), 1) if self.last_ok else None,
+                'last_cycle': self.history[-1] if self.history else None, 'last_error': self.last_error}
+
+    def conflicts(self, limit=50):
+        rows = self.local._q("SELECT ts, tab, key, field, local, remote, base, winner FROM sync_conflicts "
+                             "ORDER BY ts DESC LIMIT ?", (limit,))
+        return [dict(zip(("ts", "tab", "key", "field", "local", "remote", "base", "winner"), r)) for r in rows]
+
+    # --- WORKER ---
+    def _run(self):
+        backoff = self.interval
+        while True:
+            try:
+                self.cycle()
+                backoff = self.interval
+            except Exception as e:
+                self.last_error = str(e)
+                self.totals['errors'] += 1
+                backoff = min(backoff * 2, BACKOFF_MAX)
+            time.sleep(backoff)
+
+    def _pair(self, tab):
+        # Worksheet handles are looked up once; the Leads tab uses the login block's discovery rule
+        if tab not in self._ws:
+            if tab == "Leads": r, l = leads_worksheet(self.remote), leads_worksheet(self.local)
+            elif tab == LOG_TAB: r, l = log_worksheet(self.remote), log_worksheet(self.local)
+            else:
+                r = self.remote.worksheet(tab)
+                try: l = self.local.worksheet(tab)
+                except Exception: l = self.local.add_worksheet(tab)
+            self._ws[tab] = (r, l)
+        return self._ws[tab]
+
+    def cycle(self):
+        with self._lock:
+            t0 = time.time()
+            m = {'at': t0, 'pulled': 0, 'pushed': 0, 'conflicts': 0, 'api_calls': 0}
+            for tab in TABS:
+                pulled = self._sync_tab(tab, m)
+                if pulled and self.on_pull: self.on_pull(tab)
+            m['secs'] = round(time.time() - t0, 3)
+            self.history.append(m)
+            self.totals['cycles'] += 1
+            for k in ('pulled', 'pushed', 'conflicts', 'api_calls'): self.totals[k] += m[k]
+            self.last_ok, self.last_error = t0, None
+            return m
+
+    # --- MERGE ---
+    def _base(self, tab):
+        return {k: json.loads(r) for k, r in self.local._q("SELECT key, row FROM sync_base WHERE tab = ?", (tab,))}
+
+    def _save_base(self, tab, rows):
+        with self.local.lock, self.local.conn:
+            self.local.conn.execute("DELETE FROM sync_base WHERE tab = ?", (tab,))
+            self.local.conn.executemany("INSERT INTO sync_base VALUES (?, ?, ?)",
+                                        [(tab, k, json.dumps(v)) for k, v in rows.items()])
+
+    def _log(self, tab, key, field, lv, rv, bv, winner):
+        self.local._q("INSERT INTO sync_conflicts VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                      (time.time(), tab, key, field, lv, rv, bv, winner))
+
+    def _sync_tab(self, tab, m):
+        r_ws, l_ws = self._pair(tab)
+        r_vals = r_ws.get_all_values(); m['api_calls'] += 1
+        if not r_vals: return False
+        # The local side is read, merged and written under its lock so app writes
+        # can't shift row numbers in between; remote writes happen after, lock-free.
+        with self.local.lock:
+            pushes, pulled = self._merge_local(tab, r_vals, l_ws.get_all_values(), l_ws, m)
+        self._apply(r_ws, *pushes, remote=True, m=m)
+        return pulled
+
+    def _merge_local(self, tab, r_vals, l_vals, l_ws, m):
+        key_words, tie_words = TABS[tab]
+        r_head = [str(h).strip() for h in r_vals[0]]
+        # A local tab with no data rows yet takes the sheet's header as-is
+        if len(l_vals) <= 1 and (l_vals[0] if l_vals else []) != r_head:
+            if l_vals: l_ws.batch_update([{'range': 'A1', 'values': [r_head]}])
+            else: l_ws.append_row(r_head)
+            l_vals = [r_head]
+        l_head = [str(h).strip() for h in l_vals[0]]
+        r_vals[0], l_vals[0] = r_head, l_head
+        remote, local = _keyed(r_vals, _col(r_head, key_words)), _keyed(l_vals, _col(l_head, key_words))
+        base = self._base(tab)
+        tie = _col(r_head, tie_words) if tie_words else None
+        tie = r_head[tie] if tie is not None else None
+
+        push_cells, pull_cells = [], []  # (row, header, value)
+        push_new, pull_new, push_del, pull_del = [], [], [], []
+        synced = {}
+        for key in sorted(set(remote) | set(local) | set(base)):
+            rr, lr, b = remote.get(key), local.get(key), base.get(key)
+            if rr is None and lr is None: continue
+            if rr is None or lr is None:
+                if b is None:  # new on one side
+                    if rr: pull_new.append(rr[1])
+                    else: push_new.append(lr[1])
+                    synced[key] = (rr or lr)[1]
+                    continue
+                # deleted on one side; the delete wins, but edits made on the other side are logged
+                other = lr if rr is None else rr
+                if any(other[1].get(f, '') != v for f, v in b.items()):
+                    self._log(tab, key, "*row*", json.dumps(lr[1]) if lr else None, json.dumps(rr[1]) if rr else None,
+                              json.dumps(b), "delete")
+                    m['conflicts'] += 1
+                if rr is None: pull_del.append(lr[0])
+                else: push_del.append(rr[0])
+                continue
+            (r_row, rv), (l_row, lv) = rr, lr
+            b = b or {}
+            newer_local = tie is not None and lv.get(tie, '') > rv.get(tie, '')
+            merged = dict(lv)
+            for f in r_head:
+                if not f: continue
+                L, R = lv.get(f, ''), rv.get(f, '')
+                if L == R: merged[f] = L; continue
+                B = b.get(f, L if not b else '')
+                if L == B: merged[f] = R
+                elif R == B: merged[f] = L
+                else:
+                    merged[f] = L if newer_local else R
+                    self._log(tab, key, f, L, R, B, "local" if newer_local else "remote")
+                    m['conflicts'] += 1
+                if merged[f] != R: push_cells.append((r_row, f, merged[f]))
+                if merged[f] != L: pull_cells.append((l_row, f, merged[f]))
+            synced[key] = merged
+
+        self._apply(l_ws, l_head, pull_cells, pull_del, pull_new, remote=False, m=m)
+        self._save_base(tab, synced)
+        m['pushed'] += len({r for r, _, _ in push_cells}) + len(push_new) + len(push_del)
+        m['pulled'] += len({r for r, _, _ in pull_cells}) + len(pull_new) + len(pull_del)
+        return (r_head, push_cells, push_del, push_new), bool(pull_cells or pull_new or pull_del)
+
+    def _apply(self, ws, header, cells, deletes, new_rows, remote, m):
+        # Order matters: cell edits and deletes use row numbers from this cycle's read,
+        # appends go last so they never shift them.
+        if cells:
+            extra = [h for h in {f for _, f, _ in cells} if h not in header]
+            if extra and not remote:  # column added in the sheet: extend the local header
+                header = header + extra
+                ws.batch_update([{'range': 'A1', 'values': [header]}])
+            ws.batch_update([{'range': rowcol_to_a1(r, header.index(f) + 1), 'values': [[v]]}
+                             for r, f, v in cells if f in header])
+            m['api_calls'] += remote
+        if deletes:
+            reqs = [{'deleteDimension': {'range': {'sheetId': ws.id, 'dimension': 'ROWS', 'startIndex': r - 1, 'endIndex': r}}}
+                    for r in sorted(deletes, reverse=True)]
+            ws.spreadsheet.batch_update({'requests': reqs})
+            m['api_calls'] += remote
+        if new_rows:
+            ws.append_rows([[row.get(h, '') for h in header] for row in new_rows])
+            m['api_calls'] += remote
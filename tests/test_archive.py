@@ -0,0 +1,89 @@
+# Archiving deletes rows while other writers (write-behind worker, bulk actions) may be moving them
+import threading
+
+from archive import Archive, cold_positions
+from bench.fake_gspread import FakeSpreadsheet
+from bench.synth import leads_sheet
+from bulk_ops import bulk_delete
+from common import get_ist_date
+from lead_store import LeadStore
+from pipeline import classify
+from write_queue import WriteQueue
+
+ASSIGN = 6  # LEADS_HEADER position of Assign
+
+
+def test_flush_during_archive_hits_the_right_row():
+    sh = FakeSpreadsheet()
+    ws = leads_sheet(sh, 200)
+    store = LeadStore(ws, prepare=classify)
+    store.get()
+    today = get_ist_date()
+    cold = cold_positions(store, today)
+    warm = next(p for p in range(len(store.df)) if p > cold[0] and p not in set(cold))
+    lead_id, phone = store.df['Lead ID'].iloc[warm], store.df['Phone'].iloc[warm]
+    q = WriteQueue(store, journal_path=None, start=False)
+    q.update(lead_id, phone, {'Assign': 'tc-late'})
+    resolved, deleted = threading.Event(), threading.Event()
+    send, delete = ws.batch_update, sh.batch_update
+    def slow_send(body, **kw):
+        resolved.set()
+        deleted.wait(0.5)  # the archive's delete may land while our rows are resolved but not yet sent
+        return send(body, **kw)
+    def mark_delete(body):
+        res = delete(body); deleted.set()
+        return res
+    ws.batch_update, sh.batch_update = slow_send, mark_delete
+    worker = threading.Thread(target=q.flush)
+    worker.start(); resolved.wait(2)
+    assert Archive(sh, prepare=classify).run(store, today) == len(cold)
+    worker.join()
+    row = next(r for r in ws.rows[1:] if r[0] == lead_id)
+    assert row[ASSIGN] == 'tc-late'
+    assert sum(r[ASSIGN] == 'tc-late' for r in ws.rows) == 1
+
+
+def _archive_with(store, sh, during):
+    # Archive whose first archive-tab append runs `during()` (a concurrent edit) right after it lands
+    archive = Archive(sh, prepare=classify)
+    tab, fired = archive._tab, []
+    def tab_then_edit(existing, title, header):
+        ws, tab_h = tab(existing, title, header)
+        append = ws.append_rows
+        def append_then_edit(rows, **kw):
+            res = append(rows, **kw)
+            if not fired: fired.append(1); during()
+            return res
+        ws.append_rows = append_then_edit
+        return ws, tab_h
+    archive._tab = tab_then_edit
+    return archive
+
+
+def test_rows_shift_during_run():
+    sh = FakeSpreadsheet()
+    ws = leads_sheet(sh, 200)
+    store = LeadStore(ws, prepare=classify)
+    store.get()
+    today = get_ist_date()
+    cold = set(store.df['Lead ID'].iloc[cold_positions(store, today)])
+    warm = [p for p in range(len(store.df)) if store.df['Lead ID'].iloc[p] not in cold]
+    gone = set(store.df['Lead ID'].iloc[warm[:3]])
+    before = [r[0] for r in ws.rows[1:]]
+    archive = _archive_with(store, sh, lambda: bulk_delete(store, [str(store.df['Phone'].iloc[p]) for p in warm[:3]]))
+    assert archive.run(store, today) == len(cold)
+    assert [r[0] for r in ws.rows[1:]] == [i for i in before if i not in cold | gone]
+    assert list(store.df['Lead ID']) == [r[0] for r in ws.rows[1:]]
+
+
+def test_cold_lead_edited_during_run_stays():
+    sh = FakeSpreadsheet()
+    ws = leads_sheet(sh, 200)
+    store = LeadStore(ws, prepare=classify)
+    store.get()
+    today = get_ist_date()
+    first = int(cold_positions(store, today)[0])
+    before = [list(r) for r in ws.rows]
+    archive = _archive_with(store, sh, lambda: store.patch_rows([first], {'Status': 'Call Back (Busy tha)'}))
+    assert archive.run(store, today) == 0
+    assert ws.rows == before  # copied to the archive tab, but nothing deleted from Leads
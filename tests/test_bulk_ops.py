@@ -0,0 +1,79 @@
+# Bulk actions on leads whose Phone cell carries a country code / formatting
+import threading
+
+from bench.fake_gspread import FakeSpreadsheet
+from bench.synth import leads_sheet
+from bulk_ops import bulk_delete, bulk_set
+from lead_store import LeadStore
+from pipeline import classify
+from write_queue import WriteQueue
+
+PHONE = 3  # LEADS_HEADER position of Phone
+
+
+def _store(n=20):
+    ws = leads_sheet(FakeSpreadsheet(), n)
+    ws.rows[3][PHONE] = "919876500001"
+    ws.rows[5][PHONE] = "+91 98765 00002"
+    store = LeadStore(ws, prepare=classify)
+    store.get()
+    return ws, store
+
+
+def _sheet_frame(ws):
+    fresh = LeadStore(ws, prepare=classify)
+    fresh.get()
+    return fresh
+
+
+def test_bulk_set_prefixed_phones():
+    ws, store = _store()
+    res = bulk_set(store, ["9876500001", "9876500002"], "tc9", "Assign")
+    assert sorted(res.done) == ["9876500001", "9876500002"] and not res.failed
+    assert ws.rows[3][6] == ws.rows[5][6] == "tc9"
+    assert store.df['Assign'].astype(str).tolist() == _sheet_frame(ws).df['Assign'].astype(str).tolist()
+
+
+def test_bulk_delete_prefixed_phones():
+    ws, store = _store()
+    res = bulk_delete(store, ["9876500001", "+91 9876500002"])
+    assert sorted(res.done) == ["9876500001", "9876500002"]
+    fresh = _sheet_frame(ws)
+    assert store.df['Phone'].astype(str).tolist() == fresh.df['Phone'].astype(str).tolist()
+    assert store.row_of_phone == fresh.row_of_phone
+
+
+def test_bulk_delete_waits_for_write_behind():
+    ws, store = _store()
+    lead_id, phone = store.df['Lead ID'].iloc[10], store.df['Phone'].iloc[10]
+    q = WriteQueue(store, journal_path=None, start=False)
+    q.update(lead_id, phone, {'Assign': 'tc-late'})
+    resolved, deleted = threading.Event(), threading.Event()
+    send, delete = ws.batch_update, ws.spreadsheet.batch_update
+    def slow_send(body, **kw):
+        resolved.set()
+        deleted.wait(0.5)  # a bulk delete may land while our rows are resolved but not yet sent
+        return send(body, **kw)
+    def mark_delete(body):
+        res = delete(body); deleted.set()
+        return res
+    ws.batch_update, ws.spreadsheet.batch_update = slow_send, mark_delete
+    worker = threading.Thread(target=q.flush)
+    worker.start(); resolved.wait(2)
+    bulk_delete(store, [str(p) for p in store.df['Phone'].iloc[:3]])
+    worker.join()
+    assert [r[6] for r in ws.rows if r[0] == lead_id] == ['tc-late']
+    assert sum(r[6] == 'tc-late' for r in ws.rows) == 1
+
+
+def test_other_store_sees_bulk_assign_by_delta():
+    ws, store = _store()
+    other = _sheet_frame(ws)
+    other.invalidate(); other.get()
+    assert other.stats['full'] == 1 and other.stats['rows_fetched'] == len(other.df)  # nothing moved: no rows pulled
+    bulk_set(store, [str(p) for p in store.df['Phone'].iloc[:4]], "tc-new", "Assign")
+    bulk_set(store, [str(store.df['Phone'].iloc[9])], "Hot", "Tag", "Label")
+    other.invalidate(); other.get()
+    assert other.stats['full'] == 1 and other.stats['rows_fetched'] == len(other.df) + 5
+    assert other.df['Assign'].astype(str).tolist()[:4] == ["tc-new"] * 4
+    assert other.df['Tag'].astype(str).iloc[9] == "Hot"
@@ -0,0 +1,23 @@
+# A CSV upload after an optimistic add: the store's rows keep the sheet's order
+from bench.fake_gspread import FakeSpreadsheet
+from bench.synth import leads_sheet, lead_rows, vendor_csv
+from csv_import import ImportJob
+from lead_store import LeadStore
+from pipeline import classify
+from write_queue import WriteQueue
+
+
+def test_upload_after_queued_add(tmp_path):
+    ws = leads_sheet(FakeSpreadsheet(), 20)
+    store = LeadStore(ws, prepare=classify)
+    store.get()
+    q = WriteQueue(store, journal_path=str(tmp_path / "journal.jsonl"))
+    mine = lead_rows(1, seed=7)[0]; mine[0] = "L-MINE"
+    q.append(mine); store.append([mine])
+    assert q.drain(5) and ws.rows[-1][0] == "L-MINE"
+    job = ImportJob(["tc1"])
+    f = vendor_csv(30)
+    assert job.prepare(f)
+    job.run(f, ws, lambda n, p, a: [f"L-{p[-8:]}", "", n, p, "Upload", "", a, "Naya Lead"], on_commit=store.append)
+    assert q.drain(5)
+    assert list(store.df['Lead ID']) == [r[0] for r in ws.rows[1:]]
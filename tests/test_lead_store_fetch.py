@@ -0,0 +1,49 @@
+# Full fetches in row blocks: requests per load, cold and warm, and blank rows inside the sheet
+from bench.fake_gspread import FakeSpreadsheet
+from bench.synth import leads_sheet, lead_rows
+from lead_store import LeadStore
+from pipeline import classify
+
+
+def _store(n, workers=4):
+    sh = FakeSpreadsheet()
+    ws = leads_sheet(sh, n)
+    return sh, ws, LeadStore(ws, prepare=classify, fetch_workers=workers, block_rows=10)
+
+
+def _resync(sh, store):
+    sh.reset_calls()
+    store.invalidate(full=True); store.refresh()
+    return sh.calls['batch_get']
+
+
+def test_cold_small_sheet_one_request():
+    sh, ws, store = _store(5)
+    store.get()
+    assert sh.calls['batch_get'] == 1 and len(store.df) == 5
+
+
+def test_cold_big_sheet_one_wave():
+    sh, ws, store = _store(45)
+    store.get()
+    assert len(store.df) == 45
+    assert sh.calls['batch_get'] == 5  # 1-10 ... 41-51, all in the first wave
+
+
+def test_resync_on_block_boundary_no_empty_wave():
+    sh, ws, store = _store(19)  # 20 sheet rows: exactly two blocks
+    store.get()
+    assert _resync(sh, store) == 2
+    ws.append_rows(lead_rows(30, seed=3))  # past the grid size the handle knows
+    assert _resync(sh, store) == 2 + 4 and len(store.df) == 49
+    assert list(store.df['Lead ID']) == [r[0] for r in ws.rows[1:]]
+
+
+def test_blank_rows_inside_sheet():
+    loads = []
+    for workers in (4, 1):
+        sh, ws, store = _store(45, workers)
+        for r in range(9, 13): ws.rows[r - 1] = [''] * len(ws.rows[0])  # sheet rows 9-12 cleared
+        store.get(); store.invalidate(full=True); store.refresh()
+        loads.append(list(store.df['Lead ID']))
+    assert loads[0] == loads[1] and len([i for i in loads[0] if i]) == 41
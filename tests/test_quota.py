@@ -0,0 +1,30 @@
+# Quota lanes follow a full load into the store's fetch pool
+import threading
+
+from bench.fake_gspread import FakeSpreadsheet
+from bench.synth import leads_sheet
+from lead_store import LeadStore
+from pipeline import classify
+from quota import BULK, QuotaGovernor
+
+
+def _load(gov):
+    ws = leads_sheet(FakeSpreadsheet(), 45)
+    store = LeadStore(gov.wrap(ws), prepare=classify, fetch_workers=4, block_rows=10)
+    store.get()
+    return {l['lane']: l['calls'] for l in gov.metrics()['lanes']}
+
+
+def test_fetch_blocks_keep_thread_lane():
+    gov = QuotaGovernor(reads_per_min=600)
+    t = threading.Thread(target=_load, args=(gov,), name="crm-change-feed")
+    t.start(); t.join()
+    calls = {l['lane']: l['calls'] for l in gov.metrics()['lanes']}
+    assert calls['poll'] == 5 and calls['read'] == 0
+
+
+def test_fetch_blocks_keep_priority_lane():
+    gov = QuotaGovernor(reads_per_min=600)
+    with gov.priority(BULK): calls = _load(gov)
+    assert calls['bulk'] == 5 and calls['read'] == 0
+    assert _load(QuotaGovernor(reads_per_min=600))['read'] == 5  # a page's own load stays on read
@@ -0,0 +1,27 @@
+# Shared snapshot: a reader's write that lands while the writer is fetching isn't overwritten by that fetch
+from bench.fake_gspread import FakeSpreadsheet
+from bench.synth import leads_sheet
+from lead_store import LeadStore
+from pipeline import classify
+from snapshot import SharedSnapshot
+
+
+def test_write_during_writer_fetch_kept(tmp_path):
+    ws = leads_sheet(FakeSpreadsheet(), 20)
+    path = str(tmp_path / "leads.pkl")
+    writer = LeadStore(ws, prepare=classify, snapshot=SharedSnapshot(path))
+    reader = LeadStore(ws, prepare=classify, snapshot=SharedSnapshot(path))
+    writer.get(); reader.get()
+    assert writer.snapshot.is_writer() and not reader.snapshot.is_writer()
+    fetch = writer._fetch_all
+    def fetch_then_write():
+        vals = fetch()
+        reader.landed()  # the reader's write reaches the sheet after the writer read it
+        return vals
+    writer._fetch_all = fetch_then_write
+    ws.rows[4][2] = "Renamed"
+    writer.invalidate(full=True); writer.refresh()
+    before = reader.df
+    assert writer.snapshot.published == writer.version
+    reader.invalidate(); reader.get()
+    assert reader.df is before
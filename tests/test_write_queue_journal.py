@@ -0,0 +1,33 @@
+# Per-process write journals: a live queue's journal is left alone, a dead one's is adopted once
+import os
+
+from write_queue import WriteQueue
+
+
+class _Store:
+    df = None
+
+
+def _queue(base):
+    return WriteQueue(_Store(), journal_path=str(base), start=False)
+
+
+def test_journal_per_process(tmp_path):
+    base = tmp_path / "journal.jsonl"
+    a = _queue(base)
+    a.append(["L-1", "2026-10-17 10:00", "Ramesh", "9876500001"])
+    b = _queue(base)  # another live process: a's pending append isn't its business
+    assert a.journal_path != b.journal_path and not b.appends
+    b.append(["L-2", "2026-10-17 10:01", "Suresh", "9876500002"])
+    os.close(a._journal_fd)  # a's process dies with its append still queued
+    c = _queue(base)
+    assert [r[0] for r in c.appends] == ["L-1"]
+    assert not _queue(base).appends  # adopted once, not replayed again
+
+
+def test_legacy_shared_journal_adopted(tmp_path):
+    base = tmp_path / "journal.jsonl"
+    base.write_text('{"op": "append", "row": ["L-9"]}\n')
+    q = _queue(base)
+    assert q.appends == [["L-9"]] and not base.exists()
+    with open(q.journal_path) as f: assert "L-9" in f.read()
@@ -0,0 +1,37 @@
+# Queued edits land on their own lead even when the sheet's rows differ from the store's
+from bench.fake_gspread import FakeSpreadsheet
+from bench.synth import leads_sheet, lead_rows
+from lead_store import LeadStore
+from pipeline import classify
+from write_queue import WriteQueue
+
+STATUS = 7  # LEADS_HEADER position of Status
+
+
+def test_save_on_new_lead_after_foreign_append():
+    ws = leads_sheet(FakeSpreadsheet(), 20)
+    store = LeadStore(ws, prepare=classify)
+    store.get()
+    q = WriteQueue(store, journal_path=None, start=False)
+    mine = lead_rows(1, seed=7)[0]; mine[0] = "L-MINE"
+    q.append(mine); store.append([mine])
+    other = lead_rows(1, seed=8)[0]; other[0] = "L-OTHER"
+    ws.append_rows([other])  # another process / a manager adds a row first
+    q.update("L-MINE", mine[3], {'Status': "Interested"})
+    q.flush()
+    by_id = {r[0]: r for r in ws.rows[1:]}
+    assert by_id["L-MINE"][STATUS] == "Interested"
+    assert by_id["L-OTHER"][STATUS] == other[STATUS]
+    assert q.stats['relocated'] == 1
+
+
+def test_save_checks_one_read():
+    ws = leads_sheet(FakeSpreadsheet(), 20)
+    store = LeadStore(ws, prepare=classify)
+    store.get()
+    q = WriteQueue(store, journal_path=None, start=False)
+    q.update(store.df['Lead ID'].iloc[4], store.df['Phone'].iloc[4], {'Status': "Interested"})
+    ws.spreadsheet.reset_calls()
+    q.flush()
+    assert ws.rows[5][STATUS] == "Interested"
+    assert dict(ws.spreadsheet.calls) == {'batch_get': 1, 'batch_update': 1} and not q.stats['relocated']
@@ -0,0 +1,277 @@
+# --- WRITE-BEHIND QUEUE ---
+# Lead saves and "Naya Lead" adds return immediately: the UI patches the shared
+# lead store optimistically and the write is queued here. A background worker
+# drains the queue every FLUSH_SECS, coalescing all pending cell edits per lead
+# into one batch_update and all new rows into one append_rows, across sessions.
+# Notes log entries (notes_log.py) ride the same queue: one append_rows on the
+# log tab per flush.
+# Edits are written to the row the store maps the lead to, after one read of
+# the Lead ID / Phone cells there confirms the sheet agrees; a lead the sheet
+# holds elsewhere (rows added outside this queue) is looked up in the sheet.
+# Once a flush lands the store is told (LeadStore.landed), so it won't adopt
+# a shared snapshot taken before these writes reached the sheet.
+# Quota errors (429) are retried with exponential backoff. Every queued op is
+# also appended to a local JSONL journal, so pending writes survive a restart.
+# Each server process journals to its own "<journal>.<pid>" file, held with a
+# flock; on startup a queue adopts the journals no live process holds (a
+# crashed or restarted worker's, or the old shared file), so nothing is lost
+# or replayed twice.
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+try: import fcntl
+except ImportError: fcntl = None  # no flock (Windows): one shared journal, run a single server process
+
+from gspread.utils import rowcol_to_a1
+
+from common import is_quota_error
+from lead_store import col_letter, phone_key
+
+FLUSH_SECS = 0.5
+BACKOFF_START, BACKOFF_MAX = 1.0, 60.0
+MAX_ATTEMPTS = 5  # for non-quota errors; quota errors retry until they succeed
+MAX_HOLD_SECS = 60  # never keep the store from re-syncing longer than this
+JOURNAL_PATH = os.environ.get("CRM_WRITE_JOURNAL", "write_journal.jsonl")
+
+
+def _mtime(path):
+    try: return os.path.getmtime(path)
+    except OSError: return 0.0
+
+
+def _flock(path):
+    # Open fd holding an exclusive flock on `path` (created if missing), or None when another process holds it
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try: fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+class WriteQueue:
+    def __init__(self, store, journal_path=JOURNAL_PATH, start=True, log=None):
+        self.store = store
+        self.log = log  # NotesLog receiving 'log' ops, or None
+        self.journal_base = journal_path
+        self.journal_path, self._journal_fd = self._claim(journal_path) if journal_path and fcntl else (journal_path, None)
+        self.updates = {}  # (lead_id, phone) -> {header name: value}
+        self.appends = []  # full sheet rows
+        self.logs = []     # notes log rows
+        self.stats = {'queued': 0, 'flushes': 0, 'api_calls': 0, 'retries': 0, 'dropped': 0, 'relocated': 0}
+        self.last_error = None
+        self.held_since = None
+        self.inflight = 0
+        self._cond = threading.Condition()
+        self._replay()
+        self._worker = None
+        if start:
+            self._worker = threading.Thread(target=self._run, name="crm-write-behind", daemon=True)
+            self._worker.start()
+
+    # --- ENQUEUE ---
+    def update(self, lead_id, phone, values):
+        self._enqueue({'op': 'update', 'key': [str(lead_id or ''), str(phone)], 'values': values})
+
+    def append(self, row):
+        self._enqueue({'op': 'append', 'row': row})
+
+    def log_entry(self, row):
+        self._enqueue({'op': 'log', 'row': row})
+
+    def pending(self):
+        # Journaled log rows wait for a queue that has a NotesLog to write them to
+        return len(self.updates) + len(self.appends) + (len(self.logs) if self.log is not None else 0)
+
+    def busy(self):
+        # True while lead writes are queued; the store holds off re-syncing so it doesn't
+        # overwrite optimistic edits with the sheet's older values. Log rows don't hold it.
+        held = self.held_since
+        return len(self.updates) + len(self.appends) + self.inflight > 0 and held is not None and time.time() - held < MAX_HOLD_SECS
+
+    def drain(self, timeout=MAX_HOLD_SECS):
+        # Waits until everything queued so far reached the sheet (False after `timeout` seconds), e.g. so
+        # a CSV upload's rows go in after the optimistic adds the store already shows
+        deadline = time.time() + timeout
+        while len(self.updates) + len(self.appends) + self.inflight and time.time() < deadline: time.sleep(FLUSH_SECS / 5)
+        return not len(self.updates) + len(self.appends) + self.inflight
+
+    def _enqueue(self, op):
+        with self._cond:
+            self._merge(op)
+            self._journal(op)
+            self.stats['queued'] += 1
+            if self.held_since is None: self.held_since = time.time()
+            self._cond.notify()
+
+    def _merge(self, op, older=False):
+        if op['op'] in ('append', 'log'):
+            rows = self.appends if op['op'] == 'append' else self.logs
+            rows.insert(0, op['row']) if older else rows.append(op['row'])
+        else:
+            cur = self.updates.setdefault(tuple(op['key']), {})
+            # Later edits of the same cell win; an older batch put back after a failure never overrides them
+            if older: cur.update({k: v for k, v in op['values'].items() if k not in cur})
+            else: cur.update(op['values'])
+
+    # --- JOURNAL ---
+    def _journal(self, op):
+        if not self.journal_path: return
+        with open(self.journal_path, 'a', encoding='utf-8') as f: f.write(json.dumps(op) + "\n")
+
+    def _rewrite_journal(self, inflight=None, inflight_logs=()):
+        if not self.journal_path: return
+        ops = [{'op': 'append', 'row': r} for r in self.appends]
+        ops += [{'op': 'log', 'row': r} for r in list(inflight_logs) + self.logs]
+        ops += [{'op': 'update', 'key': list(k), 'values': v} for k, v in (inflight or {}).items()]
+        ops += [{'op': 'update', 'key': list(k), 'values': v} for k, v in self.updates.items()]
+        tmp = self.journal_path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f: f.writelines(json.dumps(op) + "\n" for op in ops)
+        os.replace(tmp, self.journal_path)
+
+    def _claim(self, base):
+        # (this process's journal, fd holding its lock); the pid can be taken on a disk shared between containers
+        for path in (f"{base}.{os.getpid()}", f"{base}.{os.getpid()}-{uuid.uuid4().hex[:8]}"):
+            fd = _flock(path + ".lock")
+            if fd is not None: return path, fd
+        raise RuntimeError(f"write journal {base}: no free journal file")
+
+    def _orphans(self):
+        # [(journal, lock fd)] of journals no live process holds, oldest first
+        base = self.journal_base
+        out = []
+        for path in sorted({base, *glob.glob(glob.escape(base) + ".*")} - {self.journal_path}, key=_mtime):
+            if path.endswith((".lock", ".tmp")) or not os.path.exists(path): continue
+            fd = _flock(path + ".lock")
+            if fd is None: continue  # its process is alive
+            if os.path.exists(path): out.append((path, fd))
+            else: os.close(fd)
+        return out
+
+    def _replay(self):
+        if not self.journal_path: return
+        orphans = self._orphans() if fcntl else []
+        for path in [self.journal_path] + [p for p, _ in orphans]:
+            if not os.path.exists(path): continue
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try: self._merge(json.loads(line))
+                    except ValueError: pass  # torn last line from a crash mid-write
+        if orphans:
+            self._rewrite_journal()  # adopted ops are in our own journal before theirs go
+            for path, fd in orphans:
+                for p in (path, path + ".lock"):
+                    try: os.remove(p)
+                    except OSError: pass
+                os.close(fd)
+        if self.pending(): self.held_since = time.time()
+
+    # --- WORKER ---
+    def _run(self):
+        backoff = BACKOFF_START
+        attempts = 0
+        while True:
+            with self._cond:
+                while not self.pending(): self._cond.wait()
+            time.sleep(FLUSH_SECS)  # let edits from other sessions pile into the same batch
+            try:
+                self.flush()
+                backoff, attempts = BACKOFF_START, 0
+            except Exception as e:
+                self.last_error = str(e)
+                self.stats['retries'] += 1
+                attempts += 1
+                if not is_quota_error(e) and attempts >= MAX_ATTEMPTS:
+                    self._drop()
+                    attempts = 0
+                time.sleep(backoff)
+                backoff = min(backoff * 2, BACKOFF_MAX)
+
+    def _rows_for(self, updates):
+        # Sheet row per update key, checked against the sheet's Lead ID / Phone cells (one read). The store
+        # puts its own appends after its last row, which isn't where they land when rows were added to the
+        # sheet elsewhere (another process, a manager, a CSV upload); those are looked up in the sheet instead.
+        store, h = self.store, self.store.header or []
+        rows = {k: r for k in updates for r in [store.row_for(k[1], k[0])] if r}
+        i_i, p_i = (h.index(c) if c in h else None for c in (store.id_col, 'Phone'))
+        cols = [i for i in (i_i, p_i) if i is not None]
+        if not rows or not cols: return rows
+        lo, hi = min(cols), max(cols)
+        a, b = col_letter(lo + 1), col_letter(hi + 1)
+        def holds(cells, key):
+            cells = list(cells) + [''] * (hi - lo + 1)
+            if key[0] and i_i is not None: return str(cells[i_i - lo]).strip() == key[0]
+            return p_i is not None and phone_key(cells[p_i - lo]) == phone_key(key[1])
+        got = store.ws.batch_get([f"{a}{r}:{b}{r}" for r in rows.values()])
+        self.stats['api_calls'] += 1
+        moved = [k for k, vr in zip(list(rows), got) if not holds(vr[0] if vr else [], k)]
+        if moved:
+            sheet = store.ws.batch_get([f"{a}2:{b}"])[0]
+            self.stats['api_calls'] += 1
+            for k in moved: rows[k] = next((i + 2 for i, cells in enumerate(sheet) if holds(cells, k)), None)
+            self.stats['relocated'] += len(moved)
+            store.invalidate(full=True)  # the frame's rows don't match the sheet's: resync once the queue drains
+        return rows
+
+    def _drop(self):
+        # Give up on a batch the API keeps rejecting; resync so the optimistic edits disappear
+        with self._cond:
+            self.stats['dropped'] += self.pending()
+            self.updates, self.appends, self.logs = {}, [], []
+            self._rewrite_journal()
+            self.held_since = None
+        self.store.invalidate(full=True)
+
+    def flush(self):
+        with self._cond:
+            updates, appends = self.updates, self.appends
+            logs = self.logs if self.log is not None else []
+            self.updates, self.appends = {}, []
+            if self.log is not None: self.logs = []
+            self.inflight = len(updates) + len(appends)
+        if not updates and not appends and not logs: return
+        if self.store.df is None: self.store.get()  # journal replayed at startup: need the row index first
+        ws = self.store.ws
+        try:
+            if appends:
+                ws.append_rows(appends)
+                self.stats['api_calls'] += 1
+                appends = []
+                with self._cond: self._rewrite_journal(inflight=updates, inflight_logs=logs)  # a crash now must not re-append them
+            if logs:
+                self.log.ws.append_rows(logs)
+                self.stats['api_calls'] += 1
+                self.log.landed(logs)
+                logs = []
+                with self._cond: self._rewrite_journal(inflight=updates)
+            # Rows are resolved now, not at enqueue time, so appends/deletes in between can't misdirect edits
+            with self.store.row_lock:
+                h = self.store.header or []
+                body = []
+                rows = self._rows_for(updates)
+                for key, values in updates.items():
+                    r = rows.get(key)
+                    if not r: continue
+                    for name, val in values.items():
+                        if name in h: body.append({'range': rowcol_to_a1(r, h.index(name) + 1), 'values': [[val]]})
+                if body:
+                    ws.batch_update(body)
+                    self.stats['api_calls'] += 1
+        except Exception:
+            with self._cond:
+                for row in reversed(appends): self._merge({'op': 'append', 'row': row}, older=True)
+                for row in reversed(logs): self._merge({'op': 'log', 'row': row}, older=True)
+                for k, v in updates.items(): self._merge({'op': 'update', 'key': k, 'values': v}, older=True)
+                self.inflight = 0
+            raise
+        self.store.landed()
+        with self._cond:
+            self.stats['flushes'] += 1
+            self.last_error = None
+            self.inflight = 0
+            self._rewrite_journal()
+            if not self.pending(): self.held_since = None